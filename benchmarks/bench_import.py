@@ -0,0 +1,69 @@
+"""
+Cold-start import benchmark.
+
+Imports a module in fresh interpreters and reports the wall time, which is
+what a new container or autoscaled worker pays before serving its first
+request. Run from the project root:
+
+    python -m benchmarks.bench_import --module server --runs 5
+    python -m benchmarks.bench_import --module server --top 15   # slowest imports (-X importtime)
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def time_import(module: str) -> float:
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-c", f"import {module}"],
+        cwd=PROJECT_ROOT,
+        check=True,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    return time.perf_counter() - start
+
+
+def slowest_imports(module: str, top: int) -> list:
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT,
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    rows = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line.replace("import time:", "").split("|"))
+        rows.append((int(cumulative_us), int(self_us), name))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Cold-start import benchmark")
+    parser.add_argument("--module", default="server")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=0, help="also list the N slowest imports")
+    args = parser.parse_args()
+
+    timings = [time_import(args.module) for _ in range(args.runs)]
+    print(
+        f"import {args.module}: runs={args.runs} median={statistics.median(timings) * 1000:.0f}ms "
+        f"min={min(timings) * 1000:.0f}ms max={max(timings) * 1000:.0f}ms"
+    )
+    if args.top:
+        for cumulative_us, self_us, name in slowest_imports(args.module, args.top):
+            print(f"  {cumulative_us / 1000:9.1f}ms cumulative {self_us / 1000:8.1f}ms self  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Hot-path logging benchmark.
+
+Measures the per-call cost of ``Logger.info`` as seen by the request thread.
+Run from the project root (stderr carries the log lines themselves):
+
+    python -m benchmarks.bench_logging --calls 20000 2>/dev/null
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.log import get_logger, shutdown_logging  # noqa: E402
+
+
+def run(calls: int) -> tuple:
+    with tempfile.TemporaryDirectory() as log_dir:
+        logger = get_logger("bench_logging", log_dir=log_dir)
+        start = time.perf_counter()
+        for idx in range(calls):
+            logger.info(
+                status="info",
+                url="https://www.figma.com/file/BENCH/benchmark",
+                message=f"產生摘要與問答成功 #{idx}",
+            )
+        elapsed = time.perf_counter() - start
+        # 等待背景 listener 寫完，量測總吞吐
+        shutdown_logging()
+        drained = time.perf_counter() - start
+    return elapsed, drained
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=20000)
+    args = parser.parse_args()
+
+    elapsed, drained = run(args.calls)
+    print(
+        f"calls={args.calls} caller={elapsed:.4f}s "
+        f"per_call={elapsed / args.calls * 1e6:.2f}us drained={drained:.4f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
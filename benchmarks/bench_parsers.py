@@ -0,0 +1,158 @@
+"""
+Parser and extraction benchmarks.
+
+Measures wall time (min / median over repeats) and peak traced memory of the
+Figma and Confluence extraction functions on synthetic documents.
+Run from the project root:
+
+    python -m benchmarks.bench_parsers                      # print results
+    python -m benchmarks.bench_parsers --save benchmarks/baselines/parsers.json
+    python -m benchmarks.bench_parsers --compare benchmarks/baselines/parsers.json
+
+``--compare`` exits with status 1 when any case's best (min) time or peak
+memory grows by more than ``--tolerance`` (default 25%) over the baseline.
+The minimum is compared rather than the median because it is far less
+sensitive to noisy neighbours on shared CI runners.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.generators import generate_confluence_page, generate_figma_file  # noqa: E402
+from modules.confluence_parser import aggregate_confluence_content, extract_text_from_html  # noqa: E402
+from modules.figma_index import FigmaFileIndex  # noqa: E402
+from modules.figma_parser import aggregate_figma_content, collapse_text_nodes, find_node_by_names  # noqa: E402
+
+
+FIGMA_SIZES = {"figma_1k": 1_000, "figma_10k": 10_000, "figma_100k": 100_000}
+CONFLUENCE_SIZES = {"confluence_100kb": 100_000, "confluence_1mb": 1_000_000, "confluence_5mb": 5_000_000}
+QUICK_FIGMA_SIZES = {"figma_1k": 1_000, "figma_10k": 10_000}
+QUICK_CONFLUENCE_SIZES = {"confluence_100kb": 100_000, "confluence_1mb": 1_000_000}
+
+
+def build_cases(quick: bool = False) -> List[Tuple[str, Callable[[], Any]]]:
+    figma_sizes = QUICK_FIGMA_SIZES if quick else FIGMA_SIZES
+    confluence_sizes = QUICK_CONFLUENCE_SIZES if quick else CONFLUENCE_SIZES
+    cases: List[Tuple[str, Callable[[], Any]]] = []
+
+    for label, node_count in figma_sizes.items():
+        figma_json = generate_figma_file(node_count=node_count, depth=10)
+        document = figma_json["document"]
+        cases.append((f"collapse_text_nodes[{label}]", lambda d=document: collapse_text_nodes(d, [])))
+        cases.append((f"find_node_by_names[{label}]", lambda d=document: find_node_by_names(d, ["活動說明"])))
+        cases.append((f"aggregate_figma_content[{label}]", lambda f=figma_json: aggregate_figma_content(f)))
+        index = FigmaFileIndex.build("bench", figma_json)
+        serialized = json.dumps(index.to_dict(), ensure_ascii=False)
+        cases.append((f"figma_index_build[{label}]", lambda f=figma_json: FigmaFileIndex.build("bench", f)))
+        cases.append((f"figma_index_load[{label}]", lambda s=serialized: FigmaFileIndex.from_dict(json.loads(s))))
+        cases.append(
+            (
+                f"figma_index_target_text[{label}]",
+                lambda i=index: i.subtree_text(i.find_by_names(["活動說明"])),
+            )
+        )
+        cases.append((f"figma_index_dedup_text[{label}]", lambda i=index: i.deduplicated_text(i.root)))
+
+    for label, size in confluence_sizes.items():
+        page = generate_confluence_page(target_bytes=size)
+        storage = page["body"]["storage"]["value"]
+        cases.append((f"extract_text_from_html[{label}]", lambda s=storage: extract_text_from_html(s)))
+        cases.append((f"aggregate_confluence_content[{label}]", lambda p=page: aggregate_confluence_content(p)))
+    return cases
+
+
+def measure(func: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    # 記憶體另外量測一次，避免 tracemalloc 的額外成本影響計時
+    gc.collect()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "min_s": min(timings),
+        "median_s": statistics.median(timings),
+        "peak_bytes": peak,
+    }
+
+
+def run(quick: bool = False, repeat: int = 5) -> Dict[str, Any]:
+    results = {}
+    for name, func in build_cases(quick):
+        results[name] = measure(func, repeat)
+        print(
+            f"{name:<48} median={results[name]['median_s'] * 1000:9.2f}ms "
+            f"peak={results[name]['peak_bytes'] / 1024:10.1f}KiB"
+        )
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "repeat": repeat,
+            "quick": quick,
+        },
+        "results": results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Return a description of every case that regressed beyond ``tolerance``."""
+    regressions = []
+    for name, base in baseline.get("results", {}).items():
+        now = current["results"].get(name)
+        if not now:
+            continue
+        for key in ("min_s", "peak_bytes"):
+            if base[key] and now[key] > base[key] * (1 + tolerance):
+                regressions.append(f"{name} {key}: {base[key]:.6g} -> {now[key]:.6g} (+{now[key] / base[key] - 1:.0%})")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Parser and extraction benchmarks")
+    parser.add_argument("--quick", action="store_true", help="skip the largest documents")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save", help="write results as a JSON baseline to this path")
+    parser.add_argument("--compare", help="compare against a JSON baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    current = run(quick=args.quick, repeat=args.repeat)
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.save) or ".", exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2, ensure_ascii=False)
+        print(f"baseline saved to {args.save}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.tolerance)
+        if regressions:
+            print("Regressions:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("No regressions against baseline.")
+
+
+if __name__ == "__main__":
+    main()
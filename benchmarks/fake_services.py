@@ -0,0 +1,266 @@
+"""
+Local stand-ins for the Figma files API, the Confluence content API and the
+OpenAI chat completions API, used by the load-test harness.
+
+Each fake runs a ``ThreadingHTTPServer`` on 127.0.0.1 and supports injected
+latency, jitter and error responses through ``FakeServiceConfig``.
+"""
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+from typing import Any, Callable, Dict, List, Optional, Pattern, Tuple
+
+from benchmarks.generators import generate_confluence_page, generate_figma_file
+
+
+@dataclass
+class FakeServiceConfig:
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    error_status: int = 500
+
+
+Responder = Callable[[re.Match, bytes, Dict[str, str]], Tuple[int, bytes]]
+
+
+class FakeService:
+    """Minimal threaded HTTP server that dispatches on (method, path regex)."""
+
+    def __init__(self, config: FakeServiceConfig, prefix: str = ""):
+        self.config = config
+        self.prefix = prefix
+        self.routes: List[Tuple[str, Pattern[str], Responder]] = []
+        self.request_count = 0
+        self._count_lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def route(self, method: str, pattern: str, responder: Responder) -> None:
+        self.routes.append((method, re.compile(f"^{pattern}$"), responder))
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}{self.prefix}"
+
+    def start(self) -> "FakeService":
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):  # noqa: A002 - 靜音預設存取紀錄
+                pass
+
+            def _dispatch(self, method: str) -> None:
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                status, payload = service.handle(method, self.path, body)
+                self.send_response(status)
+                # 串流回應（SSE）以 "data:" 開頭
+                content_type = "text/event-stream" if payload.startswith(b"data:") else "application/json"
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                self._dispatch("GET")
+
+            def do_POST(self):
+                self._dispatch("POST")
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def handle(self, method: str, raw_path: str, body: bytes) -> Tuple[int, bytes]:
+        with self._count_lock:
+            self.request_count += 1
+        config = self.config
+        delay = config.latency_ms + random.uniform(0, config.jitter_ms)
+        if delay:
+            time.sleep(delay / 1000)
+        if config.error_rate and random.random() < config.error_rate:
+            return config.error_status, json.dumps({"error": "injected failure"}).encode()
+
+        path, _, raw_query = raw_path.partition("?")
+        query = dict(parse_qsl(raw_query))
+        if self.prefix and path.startswith(self.prefix):
+            path = path[len(self.prefix):]
+        for route_method, pattern, responder in self.routes:
+            match = pattern.match(path)
+            if route_method == method and match:
+                return responder(match, body, query)
+        return 404, json.dumps({"error": f"no fake route for {method} {path}"}).encode()
+
+
+def start_fake_figma(config: FakeServiceConfig, node_count: int = 10000) -> FakeService:
+    """
+    Serve ``GET /v1/files/{key}`` with a synthetic file of ``node_count`` nodes.
+
+    ``?depth=1`` returns only the file metadata and pages, as Figma does.
+    """
+    figma_file = generate_figma_file(node_count=node_count, depth=10)
+    payload = json.dumps(figma_file, ensure_ascii=False).encode()
+    pages = [
+        {key: value for key, value in page.items() if key != "children"}
+        for page in figma_file["document"]["children"]
+    ]
+    shallow = dict(figma_file, document=dict(figma_file["document"], children=pages))
+    shallow_payload = json.dumps(shallow, ensure_ascii=False).encode()
+    service = FakeService(config, prefix="/v1")
+
+    def get_file(match: re.Match, body: bytes, query: Dict[str, str]) -> Tuple[int, bytes]:
+        return 200, shallow_payload if query.get("depth") == "1" else payload
+
+    service.route("GET", r"/files/(?P<key>[A-Za-z0-9]+)", get_file)
+    return service.start()
+
+
+def start_fake_confluence(config: FakeServiceConfig, page_bytes: int = 200_000) -> FakeService:
+    """Serve page fetch, CQL ``id in (...)`` search, folder lookup and page creation under ``/wiki``."""
+    page = generate_confluence_page(target_bytes=page_bytes)
+    service = FakeService(config, prefix="/wiki")
+    created = {"count": 0}
+    created_lock = threading.Lock()
+
+    def get_content(match: re.Match, body: bytes, query: Dict[str, str]) -> Tuple[int, bytes]:
+        return 200, json.dumps(dict(page, id=match.group("page_id")), ensure_ascii=False).encode()
+
+    def search_content(match: re.Match, body: bytes, query: Dict[str, str]) -> Tuple[int, bytes]:
+        ids = re.findall(r"\d+", query.get("cql", ""))
+        results = [dict(page, id=page_id) for page_id in ids]
+        return 200, json.dumps({"results": results, "size": len(results)}, ensure_ascii=False).encode()
+
+    def create_page(match: re.Match, body: bytes, query: Dict[str, str]) -> Tuple[int, bytes]:
+        with created_lock:
+            created["count"] += 1
+            page_id = 900000 + created["count"]
+        data = {
+            "id": str(page_id),
+            "_links": {"base": service.base_url, "webui": f"/spaces/ACS/pages/{page_id}"},
+        }
+        return 200, json.dumps(data).encode()
+
+    service.route("GET", r"/rest/api/content/search$", search_content)
+    service.route("GET", r"/rest/api/content/(?P<page_id>\d+)", get_content)
+    service.route("POST", r"/rest/api/content", create_page)
+    return service.start()
+
+
+def fake_summary_payload() -> Dict[str, Any]:
+    """A FigmaSummaryResult-shaped answer that passes validation."""
+    return {
+        "title": "壓力測試活動摘要",
+        "plan": ["確認活動期間", "整理獎勵規則", "彙整常見問題"],
+        "summary": [f"活動規則第 {idx} 條說明參加資格與獎勵發放方式。" for idx in range(1, 11)],
+        "qa": [{"question": f"常見問題 {idx}？", "answer": f"對應答案 {idx}。"} for idx in range(1, 6)],
+    }
+
+
+def stream_events(
+    request: Dict[str, Any],
+    message: Dict[str, Any],
+    finish_reason: str,
+    usage: Dict[str, int],
+    piece_chars: int = 64,
+) -> bytes:
+    """Server-sent ``chat.completion.chunk`` events carrying ``message`` in pieces."""
+    base = {
+        "id": f"chatcmpl-fake-{random.getrandbits(32):08x}",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": request.get("model", "fake-model"),
+    }
+    tool_call = (message.get("tool_calls") or [None])[0]
+    text = tool_call["function"]["arguments"] if tool_call else message["content"]
+    deltas: List[Dict[str, Any]] = [{"role": "assistant", "content": "" if not tool_call else None}]
+    for start in range(0, len(text), piece_chars):
+        piece = text[start:start + piece_chars]
+        if tool_call:
+            call: Dict[str, Any] = {"index": 0, "function": {"arguments": piece}}
+            if start == 0:
+                call.update(id=tool_call["id"], type="function")
+                call["function"]["name"] = tool_call["function"]["name"]
+            deltas.append({"tool_calls": [call]})
+        else:
+            deltas.append({"content": piece})
+    chunks = [dict(base, choices=[{"index": 0, "delta": delta, "finish_reason": None}]) for delta in deltas]
+    chunks.append(dict(base, choices=[{"index": 0, "delta": {}, "finish_reason": finish_reason}]))
+    if (request.get("stream_options") or {}).get("include_usage"):
+        chunks.append(dict(base, choices=[], usage=usage))
+    events = [f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n" for chunk in chunks]
+    events.append("data: [DONE]\n\n")
+    return "".join(events).encode()
+
+
+def start_fake_openai(config: FakeServiceConfig) -> FakeService:
+    """
+    Serve ``POST /v1/chat/completions`` with a valid summary JSON answer.
+
+    Requests carrying ``tools`` get the answer as a tool call (function_calling
+    mode); all others get it as message content (parser / json_schema modes).
+    ``"stream": true`` requests get the same answer as server-sent chunks.
+    """
+    content = json.dumps(fake_summary_payload(), ensure_ascii=False)
+    service = FakeService(config, prefix="/v1")
+
+    def chat_completions(match: re.Match, body: bytes, query: Dict[str, str]) -> Tuple[int, bytes]:
+        request = json.loads(body or b"{}")
+        prompt_tokens = max(1, len(body) // 4)
+        completion_tokens = max(1, len(content) // 2)
+        message: Dict[str, Any] = {"role": "assistant", "content": content}
+        finish_reason = "stop"
+        if request.get("tools"):
+            tool_name = request["tools"][0]["function"]["name"]
+            message = {
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [
+                    {
+                        "id": f"call_{random.getrandbits(32):08x}",
+                        "type": "function",
+                        "function": {"name": tool_name, "arguments": content},
+                    }
+                ],
+            }
+            finish_reason = "tool_calls"
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        if request.get("stream"):
+            return 200, stream_events(request, message, finish_reason, usage)
+        data = {
+            "id": f"chatcmpl-fake-{random.getrandbits(32):08x}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "fake-model"),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": message,
+                    "finish_reason": finish_reason,
+                }
+            ],
+            "usage": usage,
+        }
+        return 200, json.dumps(data, ensure_ascii=False).encode()
+
+    service.route("POST", r"/chat/completions", chat_completions)
+    return service.start()
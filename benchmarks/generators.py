@@ -0,0 +1,189 @@
+"""
+Synthetic document generators for benchmarks.
+
+``generate_figma_file`` returns a dict shaped like the Figma ``GET /files/:key``
+response; ``generate_confluence_page`` returns a dict shaped like the Confluence
+``GET /rest/api/content/:id?expand=body.storage`` response. Both are
+deterministic for a given ``seed``.
+"""
+import random
+from collections import deque
+from typing import Any, Dict, List
+
+
+WORDS = [
+    "活動", "期間", "獎勵", "會員", "儲值", "點數", "兌換", "抽獎", "資格", "說明",
+    "每日", "任務", "完成", "領取", "上限", "名額", "公告", "注意事項", "客服", "帳號",
+    "2025/01/01", "NT$500", "100 點", "VIP", "APP", "Bonus", "Event", "Reward",
+]
+
+CONTAINER_TYPES = ["FRAME", "GROUP", "INSTANCE", "COMPONENT"]
+
+
+def _sentence(rng: random.Random, min_words: int = 4, max_words: int = 16) -> str:
+    return "".join(rng.choice(WORDS) for _ in range(rng.randint(min_words, max_words))) + "。"
+
+
+def generate_figma_file(
+    node_count: int = 10000,
+    depth: int = 8,
+    fan_out: int = 6,
+    text_density: float = 0.4,
+    target_name: str = "活動說明",
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """
+    Build a Figma file JSON with up to ``node_count`` nodes.
+
+    Nodes are created breadth-first, so the tree stops short of ``node_count``
+    when ``depth`` and ``fan_out`` cannot hold that many nodes.
+
+    Args:
+        node_count: Total number of nodes below the document root
+        depth: Maximum tree depth (pages are depth 1)
+        fan_out: Children per container node
+        text_density: Probability that a generated child is a TEXT node
+        target_name: Name given to the last container created, so name lookups
+            have to walk most of the tree; pass "" to omit it
+        seed: Random seed
+    """
+    rng = random.Random(seed)
+    document: Dict[str, Any] = {"id": "0:0", "name": "Document", "type": "DOCUMENT", "children": []}
+    queue = deque([(document, 0)])
+    created = 0
+    last_container = document
+
+    while queue and created < node_count:
+        parent, level = queue.popleft()
+        for _ in range(fan_out):
+            if created >= node_count:
+                break
+            created += 1
+            node_id = f"{level + 1}:{created}"
+            if level == 0:
+                child = {"id": node_id, "name": f"Page {created}", "type": "CANVAS", "children": []}
+            elif rng.random() < text_density or level + 1 >= depth:
+                child = {
+                    "id": node_id,
+                    "name": rng.choice(["標題", "內文", "按鈕文字", "備註", ""]),
+                    "type": "TEXT",
+                    "characters": _sentence(rng),
+                }
+            else:
+                child = {
+                    "id": node_id,
+                    "name": f"{rng.choice(['Card', 'Section', 'Button', 'Footer'])} {created}",
+                    "type": rng.choice(CONTAINER_TYPES),
+                    "children": [],
+                }
+            parent["children"].append(child)
+            if "children" in child:
+                queue.append((child, level + 1))
+                last_container = child
+
+    if target_name and last_container is not document:
+        last_container["name"] = target_name
+
+    components = {
+        f"C:{idx}": {"key": f"c{idx}", "name": f"Component {idx}", "description": ""}
+        for idx in range(max(1, node_count // 200))
+    }
+    styles = {
+        f"S:{idx}": {"key": f"s{idx}", "name": f"Style {idx}", "styleType": rng.choice(["FILL", "TEXT", "EFFECT"])}
+        for idx in range(max(1, node_count // 500))
+    }
+    return {
+        "name": f"Synthetic {node_count}",
+        "version": str(seed),
+        "document": document,
+        "components": components,
+        "styles": styles,
+    }
+
+
+def count_figma_nodes(node: Dict[str, Any]) -> int:
+    """Count nodes below ``node`` (excluding ``node`` itself)."""
+    total = 0
+    stack: List[Dict[str, Any]] = [node]
+    while stack:
+        current = stack.pop()
+        children = current.get("children") or []
+        total += len(children)
+        stack.extend(children)
+    return total
+
+
+def _table(rng: random.Random) -> str:
+    rows = []
+    for _ in range(rng.randint(3, 12)):
+        cells = "".join(f"<td><p>{_sentence(rng, 1, 4)}</p></td>" for _ in range(rng.randint(2, 6)))
+        rows.append(f"<tr>{cells}</tr>")
+    return f'<table data-layout="default"><colgroup><col /></colgroup><tbody>{"".join(rows)}</tbody></table>'
+
+
+def _macro(rng: random.Random) -> str:
+    name = rng.choice(["info", "note", "warning", "expand", "code"])
+    if name == "code":
+        return (
+            '<ac:structured-macro ac:name="code" ac:schema-version="1">'
+            '<ac:parameter ac:name="language">json</ac:parameter>'
+            f'<ac:plain-text-body><![CDATA[{{"reward": {rng.randint(1, 999)}}}]]></ac:plain-text-body>'
+            "</ac:structured-macro>"
+        )
+    return (
+        f'<ac:structured-macro ac:name="{name}" ac:schema-version="1">'
+        f"<ac:rich-text-body><p>{_sentence(rng)}</p></ac:rich-text-body>"
+        "</ac:structured-macro>"
+    )
+
+
+def generate_confluence_storage(
+    target_bytes: int = 1_000_000,
+    table_ratio: float = 0.2,
+    macro_ratio: float = 0.15,
+    seed: int = 0,
+) -> str:
+    """Build a Confluence storage-format body of at least ``target_bytes`` UTF-8 bytes."""
+    rng = random.Random(seed)
+    parts: List[str] = []
+    size = 0
+    section = 0
+    while size < target_bytes:
+        roll = rng.random()
+        if roll < table_ratio:
+            part = _table(rng)
+        elif roll < table_ratio + macro_ratio:
+            part = _macro(rng)
+        elif roll < table_ratio + macro_ratio + 0.1:
+            section += 1
+            part = f"<h2>第 {section} 節 {_sentence(rng, 1, 3)}</h2>"
+        elif roll < table_ratio + macro_ratio + 0.15:
+            items = "".join(f"<li>{_sentence(rng)}</li>" for _ in range(rng.randint(2, 8)))
+            part = f"<ul>{items}</ul>"
+        else:
+            part = f"<p>{_sentence(rng)}<strong>{rng.choice(WORDS)}</strong>{_sentence(rng)}</p>"
+        parts.append(part)
+        size += len(part.encode("utf-8"))
+    return "".join(parts)
+
+
+def generate_confluence_page(
+    target_bytes: int = 1_000_000,
+    table_ratio: float = 0.2,
+    macro_ratio: float = 0.15,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """Wrap a synthetic storage body in a Confluence content API response."""
+    return {
+        "id": str(100000 + seed),
+        "type": "page",
+        "title": f"Synthetic page {target_bytes}",
+        "space": {"key": "ACS", "name": "Synthetic Space"},
+        "version": {"number": 1},
+        "body": {
+            "storage": {
+                "value": generate_confluence_storage(target_bytes, table_ratio, macro_ratio, seed),
+                "representation": "storage",
+            }
+        },
+    }
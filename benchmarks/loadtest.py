@@ -0,0 +1,214 @@
+"""
+End-to-end load test against local fake Figma, Confluence and OpenAI servers.
+
+Starts the fakes, launches ``uvicorn server:app`` with the config base URLs
+pointed at them, drives ``/figma/parse`` and ``/confluence/parse`` at the
+requested concurrency and reports throughput, latency percentiles and error
+rates. No real API quota is used. Run from the project root:
+
+    python -m benchmarks.loadtest --concurrency 8 --requests 50
+    python -m benchmarks.loadtest --openai-latency-ms 3000 --error-rate 0.05 --json report.json
+"""
+import argparse
+import json
+import math
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_services import (  # noqa: E402
+    FakeServiceConfig,
+    start_fake_confluence,
+    start_fake_figma,
+    start_fake_openai,
+)
+
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIGMA_URL = "https://www.figma.com/design/LOADTEST{idx}/loadtest"
+CONFLUENCE_URL = "https://lang.atlassian.net/wiki/spaces/ACS/pages/{page_id}/loadtest"
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    # nearest-rank
+    index = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(env_overrides: Dict[str, str], port: int) -> subprocess.Popen:
+    env = dict(os.environ, **env_overrides)
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=PROJECT_ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("uvicorn 啟動失敗")
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/healthcheck", timeout=1).ok:
+                return process
+        except requests.RequestException:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("uvicorn 未在 30 秒內就緒")
+
+
+def build_jobs(endpoints: List[str], count: int, publish: bool) -> List[Tuple[str, Dict[str, Any]]]:
+    jobs = []
+    for idx in range(count):
+        if "figma" in endpoints:
+            jobs.append(("figma", {"url": FIGMA_URL.format(idx=idx), "publish_confluence": publish}))
+        if "confluence" in endpoints:
+            jobs.append(
+                ("confluence", {"url": CONFLUENCE_URL.format(page_id=100000 + idx), "publish_confluence": publish})
+            )
+    return jobs
+
+
+def run_load(
+    target: str, jobs: List[Tuple[str, Dict[str, Any]]], concurrency: int, timeout: float
+) -> Tuple[Dict[str, List[Tuple[float, Optional[int]]]], float]:
+    results: Dict[str, List[Tuple[float, Optional[int]]]] = {}
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+    session.mount("http://", adapter)
+
+    def call(job: Tuple[str, Dict[str, Any]]) -> Tuple[str, float, Optional[int]]:
+        endpoint, body = job
+        start = time.perf_counter()
+        try:
+            status = session.post(f"{target}/{endpoint}/parse", json=body, timeout=timeout).status_code
+        except requests.RequestException:
+            status = None
+        return endpoint, time.perf_counter() - start, status
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for endpoint, elapsed, status in pool.map(call, jobs):
+            results.setdefault(endpoint, []).append((elapsed, status))
+    return results, time.perf_counter() - start
+
+
+def summarize(results: Dict[str, List[Tuple[float, Optional[int]]]], wall_time: float) -> Dict[str, Any]:
+    report: Dict[str, Any] = {"wall_time_s": wall_time, "endpoints": {}}
+    total = 0
+    for endpoint, samples in results.items():
+        latencies = [elapsed for elapsed, _ in samples]
+        errors = [status for _, status in samples if status != 200]
+        total += len(samples)
+        report["endpoints"][endpoint] = {
+            "requests": len(samples),
+            "throughput_rps": len(samples) / wall_time if wall_time else 0.0,
+            "p50_s": percentile(latencies, 50),
+            "p95_s": percentile(latencies, 95),
+            "p99_s": percentile(latencies, 99),
+            "max_s": max(latencies) if latencies else 0.0,
+            "error_rate": len(errors) / len(samples) if samples else 0.0,
+            "errors_by_status": {str(s): errors.count(s) for s in sorted(set(errors), key=str)},
+        }
+    report["throughput_rps"] = total / wall_time if wall_time else 0.0
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="End-to-end load test with fake upstream services")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=40, help="requests per endpoint")
+    parser.add_argument("--endpoints", default="figma,confluence")
+    parser.add_argument("--publish", action="store_true", help="also publish results to the fake Confluence")
+    parser.add_argument("--figma-nodes", type=int, default=10000)
+    parser.add_argument("--confluence-bytes", type=int, default=200_000)
+    parser.add_argument("--figma-latency-ms", type=float, default=200)
+    parser.add_argument("--confluence-latency-ms", type=float, default=150)
+    parser.add_argument("--openai-latency-ms", type=float, default=1500)
+    parser.add_argument("--jitter-ms", type=float, default=100)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="injected upstream error rate (all fakes)")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--target", help="use an already running service instead of spawning one")
+    parser.add_argument("--json", help="write the report to this path")
+    args = parser.parse_args()
+
+    def service_config(latency: float) -> FakeServiceConfig:
+        return FakeServiceConfig(latency_ms=latency, jitter_ms=args.jitter_ms, error_rate=args.error_rate)
+
+    figma = start_fake_figma(service_config(args.figma_latency_ms), node_count=args.figma_nodes)
+    confluence = start_fake_confluence(service_config(args.confluence_latency_ms), page_bytes=args.confluence_bytes)
+    openai = start_fake_openai(service_config(args.openai_latency_ms))
+    process = None
+    log_dir = tempfile.mkdtemp(prefix="loadtest-logs-")
+    try:
+        target = args.target
+        if not target:
+            port = _free_port()
+            process = start_server(
+                {
+                    "FIGMA_ACCESS_TOKEN": "loadtest",
+                    "FIGMA_BASE_URL": figma.base_url,
+                    "CONFLUENCE_USERNAME": "loadtest",
+                    "CONFLUENCE_API_KEY": "loadtest",
+                    "CONFLUENCE_BASE_URL": confluence.base_url,
+                    "OPENAI_API_KEY": "loadtest",
+                    "OPENAI_BASE_URL": openai.base_url,
+                    "LOG_DIR": log_dir,
+                    "FIGMA_INDEX_DIR": os.path.join(log_dir, "figma_index"),
+                    "CONFLUENCE_OUTBOX_PATH": os.path.join(log_dir, "publish_outbox.sqlite3"),
+                    # 每個請求都要走完 LLM 流程，不沿用上一版摘要
+                    "FIGMA_INCREMENTAL_SUMMARY": "false",
+                    "SIMILARITY_ENABLED": "false",
+                },
+                port,
+            )
+            target = f"http://127.0.0.1:{port}"
+
+        jobs = build_jobs(args.endpoints.split(","), args.requests, args.publish)
+        results, wall_time = run_load(target, jobs, args.concurrency, args.timeout)
+        report = summarize(results, wall_time)
+        report["upstream_requests"] = {
+            "figma": figma.request_count,
+            "confluence": confluence.request_count,
+            "openai": openai.request_count,
+        }
+        report["config"] = vars(args)
+    finally:
+        if process:
+            process.terminate()
+            process.wait(timeout=10)
+        for service in (figma, confluence, openai):
+            service.stop()
+
+    print(f"concurrency={args.concurrency} wall={report['wall_time_s']:.2f}s total={report['throughput_rps']:.2f} req/s")
+    for endpoint, stats in report["endpoints"].items():
+        print(
+            f"{endpoint:<11} n={stats['requests']:<5} {stats['throughput_rps']:7.2f} req/s "
+            f"p50={stats['p50_s'] * 1000:8.1f}ms p95={stats['p95_s'] * 1000:8.1f}ms "
+            f"p99={stats['p99_s'] * 1000:8.1f}ms errors={stats['error_rate']:.1%} {stats['errors_by_status']}"
+        )
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,8 @@
 from pydantic_settings import BaseSettings
-from config.loader import load_env_json
+from config.loader import get_config_data
 
-# Load configuration from JSON
-_config_data = load_env_json()
+# Shared configuration, parsed once per process
+_config_data = get_config_data()
 
 class ConfluenceSettings(BaseSettings):
     username: str = ""
@@ -10,6 +10,15 @@ class ConfluenceSettings(BaseSettings):
     base_url: str = "https://lang.atlassian.net/wiki"
     space_key: str = "ACS"
     folder_id: str = "3412262946"
+    # include_linked_figma 時最多一併擷取幾個頁面中連結的 Figma 檔案
+    linked_figma_max_files: int = 3
+    # 批次處理多個頁面時，一次 CQL 搜尋最多取回的頁面數（含 body 展開時 API 上限較低）
+    bulk_fetch_limit: int = 25
+    # 發佈佇列（outbox）：解析回應不等待頁面建立，由背景執行緒重試發佈
+    outbox_path: str = "./cache/publish_outbox.sqlite3"
+    publish_batch_size: int = 10
+    publish_max_attempts: int = 5
+    publish_retry_base_seconds: float = 5.0
     
     class Config:
         # Allow extra fields to be ignored
@@ -21,5 +30,11 @@ settings = ConfluenceSettings(
     api_key=_config_data.get("CONFLUENCE_API_KEY", ""),
     base_url=_config_data.get("CONFLUENCE_BASE_URL", "https://lang.atlassian.net/wiki"),
     space_key=_config_data.get("CONFLUENCE_SPACE_KEY", "ACS"),
-    folder_id=_config_data.get("CONFLUENCE_FOLDER_ID", "3412262946")
+    folder_id=_config_data.get("CONFLUENCE_FOLDER_ID", "3412262946"),
+    linked_figma_max_files=_config_data.get("CONFLUENCE_LINKED_FIGMA_MAX_FILES", 3),
+    bulk_fetch_limit=_config_data.get("CONFLUENCE_BULK_FETCH_LIMIT", 25),
+    outbox_path=_config_data.get("CONFLUENCE_OUTBOX_PATH", "./cache/publish_outbox.sqlite3"),
+    publish_batch_size=_config_data.get("CONFLUENCE_PUBLISH_BATCH_SIZE", 10),
+    publish_max_attempts=_config_data.get("CONFLUENCE_PUBLISH_MAX_ATTEMPTS", 5),
+    publish_retry_base_seconds=_config_data.get("CONFLUENCE_PUBLISH_RETRY_BASE_SECONDS", 5.0)
 )
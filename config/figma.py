@@ -1,12 +1,24 @@
 from pydantic_settings import BaseSettings
-from config.loader import load_env_json
+from config.loader import get_config_data
 
-# Load configuration from JSON
-_config_data = load_env_json()
+# Shared configuration, parsed once per process
+_config_data = get_config_data()
 
 class FigmaSettings(BaseSettings):
     access_token: str = ""
     base_url: str = "https://api.figma.com/v1"
+    # 依檔案版本持久化的文字索引目錄，空字串表示只放記憶體
+    index_dir: str = "./cache/figma_index"
+    # 版本確認後的秒數內直接使用記憶體中的索引，不再向 Figma 查詢版本；0 表示每次都查詢
+    index_fresh_seconds: float = 30.0
+    # 以上一版摘要加上文字節點差異做增量更新；變更比例超過門檻時重新產生完整摘要（預設關閉）
+    incremental_summary: bool = False
+    summary_dir: str = "./cache/figma_summaries"
+    incremental_max_change_ratio: float = 0.2
+    incremental_max_changed_nodes: int = 50
+    # 重複的元件實例（按鈕、注意事項、獎項卡）只送一次文字給 LLM，並標示重複次數（預設關閉）
+    deduplicate_subtrees: bool = False
+    subtree_cache_size: int = 4096
     
     class Config:
         # Allow extra fields to be ignored
@@ -15,5 +27,13 @@ class FigmaSettings(BaseSettings):
 # Initialize settings with values from env.json
 settings = FigmaSettings(
     access_token=_config_data.get("FIGMA_ACCESS_TOKEN", ""),
-    base_url=_config_data.get("FIGMA_BASE_URL", "https://api.figma.com/v1")
+    base_url=_config_data.get("FIGMA_BASE_URL", "https://api.figma.com/v1"),
+    index_dir=_config_data.get("FIGMA_INDEX_DIR", "./cache/figma_index"),
+    index_fresh_seconds=_config_data.get("FIGMA_INDEX_FRESH_SECONDS", 30.0),
+    incremental_summary=_config_data.get("FIGMA_INCREMENTAL_SUMMARY", False),
+    summary_dir=_config_data.get("FIGMA_SUMMARY_DIR", "./cache/figma_summaries"),
+    incremental_max_change_ratio=_config_data.get("FIGMA_INCREMENTAL_MAX_CHANGE_RATIO", 0.2),
+    incremental_max_changed_nodes=_config_data.get("FIGMA_INCREMENTAL_MAX_CHANGED_NODES", 50),
+    deduplicate_subtrees=_config_data.get("FIGMA_DEDUPLICATE_SUBTREES", False),
+    subtree_cache_size=_config_data.get("FIGMA_SUBTREE_CACHE_SIZE", 4096)
 )
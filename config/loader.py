@@ -1,5 +1,6 @@
 import json
 import os
+from functools import lru_cache
 from pathlib import Path
 
 def load_env_json():
@@ -36,3 +37,12 @@ def load_env_json():
             merged_config[key] = value
             
     return merged_config
+
+
+@lru_cache(maxsize=1)
+def get_config_data():
+    """
+    Return the merged env.json / os.environ configuration, loaded once per process.
+    All config modules share this dict; treat it as read-only.
+    """
+    return load_env_json()
@@ -1,11 +1,56 @@
 from pydantic_settings import BaseSettings
-from config.loader import load_env_json
+from config.loader import get_config_data
 
-# Load configuration from JSON
-_config_data = load_env_json()
+# Shared configuration, parsed once per process
+_config_data = get_config_data()
 
 class MiscSettings(BaseSettings):
     log_dir: str = "./logs"
+    # 效能剖析：admin token 為空時停用 header 觸發與 admin 路由
+    profiling_admin_token: str = ""
+    profiling_sample_rate: float = 0.0
+    # 完成的摘要以內容雜湊為 id 保存，供 GET /results/{id} 重複讀取
+    results_dir: str = "./cache/results"
+    results_cache_control: str = "public, max-age=31536000, immutable"
+    # 解析請求的准入控制：估算記憶體與 LLM 併發，超過容量時排隊或回 429
+    admission_enabled: bool = True
+    admission_memory_budget_mb: int = 1024
+    admission_llm_slots: int = 4
+    admission_max_queue: int = 16
+    admission_queue_timeout_seconds: float = 30.0
+    # 沒有索引可估算時，一份 Figma 文件解碼後的預估記憶體
+    admission_figma_default_mb: int = 128
+    admission_figma_bytes_per_node: int = 3072
+    admission_confluence_default_mb: int = 16
+    # 相似文件（複製自前一檔活動）沿用其摘要，只依差異更新；會改變送給 LLM 的內容，預設關閉
+    similarity_enabled: bool = False
+    similarity_dir: str = "./cache/similarity"
+    similarity_threshold: float = 0.8
+    similarity_max_changed_lines: int = 60
+    # 保存上限：項目數、天數（0 為不限制），以及可參與比對的內容字數
+    similarity_max_entries: int = 1000
+    similarity_max_age_days: float = 30.0
+    similarity_max_content_chars: int = 200000
+    # 每隔幾秒重新掃描目錄，取得其他 worker 新增的項目
+    similarity_refresh_seconds: float = 60.0
+    # 解析請求的整體期限（秒，0 為不限制）；呼叫端可在請求中以 deadline_seconds 指定
+    request_deadline_seconds: float = 120.0
+    # 各 HTTP 呼叫的逾時上限，實際逾時取此值與剩餘期限的較小者
+    http_timeout_seconds: float = 30.0
+    # 剩餘時間不足以下秒數時不再開始下載／LLM 呼叫
+    deadline_min_stage_seconds: float = 1.0
+    deadline_min_llm_seconds: float = 5.0
+    # auto 模型下剩餘時間少於此秒數時改用最小的模型且不再升級
+    deadline_small_model_seconds: float = 30.0
+    # Figma / Confluence / OpenAI 的斷路器：最近呼叫的失敗率或慢速比例過高時開啟，暫停呼叫後以單一請求試探
+    circuit_enabled: bool = True
+    circuit_window_size: int = 20
+    circuit_min_calls: int = 10
+    circuit_failure_rate: float = 0.5
+    circuit_slow_rate: float = 0.8
+    circuit_http_slow_seconds: float = 20.0
+    circuit_llm_slow_seconds: float = 120.0
+    circuit_open_seconds: float = 30.0
     
     class Config:
         # Allow extra fields to be ignored
@@ -13,5 +58,38 @@ class MiscSettings(BaseSettings):
 
 # Initialize settings with values from env.json
 settings = MiscSettings(
-    log_dir=_config_data.get("LOG_DIR", "./logs")
+    log_dir=_config_data.get("LOG_DIR", "./logs"),
+    profiling_admin_token=_config_data.get("PROFILING_ADMIN_TOKEN", ""),
+    profiling_sample_rate=_config_data.get("PROFILING_SAMPLE_RATE", 0.0),
+    results_dir=_config_data.get("RESULTS_DIR", "./cache/results"),
+    results_cache_control=_config_data.get("RESULTS_CACHE_CONTROL", "public, max-age=31536000, immutable"),
+    admission_enabled=_config_data.get("ADMISSION_ENABLED", True),
+    admission_memory_budget_mb=_config_data.get("ADMISSION_MEMORY_BUDGET_MB", 1024),
+    admission_llm_slots=_config_data.get("ADMISSION_LLM_SLOTS", 4),
+    admission_max_queue=_config_data.get("ADMISSION_MAX_QUEUE", 16),
+    admission_queue_timeout_seconds=_config_data.get("ADMISSION_QUEUE_TIMEOUT_SECONDS", 30.0),
+    admission_figma_default_mb=_config_data.get("ADMISSION_FIGMA_DEFAULT_MB", 128),
+    admission_figma_bytes_per_node=_config_data.get("ADMISSION_FIGMA_BYTES_PER_NODE", 3072),
+    admission_confluence_default_mb=_config_data.get("ADMISSION_CONFLUENCE_DEFAULT_MB", 16),
+    similarity_enabled=_config_data.get("SIMILARITY_ENABLED", False),
+    similarity_dir=_config_data.get("SIMILARITY_DIR", "./cache/similarity"),
+    similarity_threshold=_config_data.get("SIMILARITY_THRESHOLD", 0.8),
+    similarity_max_changed_lines=_config_data.get("SIMILARITY_MAX_CHANGED_LINES", 60),
+    similarity_max_entries=_config_data.get("SIMILARITY_MAX_ENTRIES", 1000),
+    similarity_max_age_days=_config_data.get("SIMILARITY_MAX_AGE_DAYS", 30.0),
+    similarity_max_content_chars=_config_data.get("SIMILARITY_MAX_CONTENT_CHARS", 200000),
+    similarity_refresh_seconds=_config_data.get("SIMILARITY_REFRESH_SECONDS", 60.0),
+    request_deadline_seconds=_config_data.get("REQUEST_DEADLINE_SECONDS", 120.0),
+    http_timeout_seconds=_config_data.get("HTTP_TIMEOUT_SECONDS", 30.0),
+    deadline_min_stage_seconds=_config_data.get("DEADLINE_MIN_STAGE_SECONDS", 1.0),
+    deadline_min_llm_seconds=_config_data.get("DEADLINE_MIN_LLM_SECONDS", 5.0),
+    deadline_small_model_seconds=_config_data.get("DEADLINE_SMALL_MODEL_SECONDS", 30.0),
+    circuit_enabled=_config_data.get("CIRCUIT_ENABLED", True),
+    circuit_window_size=_config_data.get("CIRCUIT_WINDOW_SIZE", 20),
+    circuit_min_calls=_config_data.get("CIRCUIT_MIN_CALLS", 10),
+    circuit_failure_rate=_config_data.get("CIRCUIT_FAILURE_RATE", 0.5),
+    circuit_slow_rate=_config_data.get("CIRCUIT_SLOW_RATE", 0.8),
+    circuit_http_slow_seconds=_config_data.get("CIRCUIT_HTTP_SLOW_SECONDS", 20.0),
+    circuit_llm_slow_seconds=_config_data.get("CIRCUIT_LLM_SLOW_SECONDS", 120.0),
+    circuit_open_seconds=_config_data.get("CIRCUIT_OPEN_SECONDS", 30.0)
 )
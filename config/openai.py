@@ -1,13 +1,51 @@
 from pydantic_settings import BaseSettings
-from config.loader import load_env_json
+from typing import Any, Dict, List
+from config.loader import get_config_data
 
-# Load configuration from JSON
-_config_data = load_env_json()
+# Shared configuration, parsed once per process
+_config_data = get_config_data()
+
+# USD per 1M tokens: input / cached_input / output（用於成本估算，可由 OPENAI_MODEL_PRICES 覆寫）
+DEFAULT_MODEL_PRICES = {
+    "gpt-4.1": {"input": 2.00, "cached_input": 0.50, "output": 8.00},
+    "gpt-4.1-mini": {"input": 0.40, "cached_input": 0.10, "output": 1.60},
+    "gpt-4.1-nano": {"input": 0.10, "cached_input": 0.025, "output": 0.40},
+    "gpt-4o": {"input": 2.50, "cached_input": 1.25, "output": 10.00},
+    "gpt-4o-mini": {"input": 0.15, "cached_input": 0.075, "output": 0.60},
+}
+
+# model="auto" 時依估算輸入 token 數由小到大選擇模型；max_input_tokens 為 None 表示不設上限
+DEFAULT_MODEL_TIERS = [
+    {"model": "gpt-4.1-nano", "max_input_tokens": 4000},
+    {"model": "gpt-4.1-mini", "max_input_tokens": 60000},
+    {"model": "gpt-4.1", "max_input_tokens": None},
+]
 
 class OpenAISettings(BaseSettings):
     api_key: str = ""
     model: str = "gpt-5.2"
     temperature: float = 0.0
+    # 空字串代表使用 OpenAI 官方端點
+    base_url: str = ""
+    # LLM 輸出模式: "parser"(在 prompt 附上 JSON schema 說明), "json_schema", "function_calling"
+    output_mode: str = "parser"
+    # 依模型覆寫輸出模式，例如 {"gpt-4.1-mini": "json_schema"}
+    output_mode_by_model: Dict[str, str] = {}
+    # 本地修正仍無法通過驗證時，是否再呼叫一次 LLM 只修正失敗欄位
+    repair_with_llm: bool = True
+    model_prices: Dict[str, Dict[str, float]] = DEFAULT_MODEL_PRICES
+    model_tiers: List[Dict[str, Any]] = DEFAULT_MODEL_TIERS
+    # 輸出驗證失敗時最多往上升級幾層模型
+    model_max_escalations: int = 1
+    # 對沖請求：呼叫超過近期耗時的指定百分位仍未完成時，再送出一個相同請求，先通過驗證者為準
+    hedge_enabled: bool = False
+    hedge_percentile: float = 95.0
+    # 樣本不足時使用的等待秒數
+    hedge_min_samples: int = 20
+    hedge_default_delay_seconds: float = 30.0
+    hedge_min_delay_seconds: float = 5.0
+    # 每分鐘最多送出的對沖請求數，避免耗盡 token 預算
+    hedge_max_per_minute: int = 10
     
     class Config:
         # Allow extra fields to be ignored
@@ -17,5 +55,18 @@ class OpenAISettings(BaseSettings):
 settings = OpenAISettings(
     api_key=_config_data.get("OPENAI_API_KEY", ""),
     model=_config_data.get("OPENAI_MODEL", "gpt-5.2"),
-    temperature=_config_data.get("OPENAI_TEMPERATURE", 0.1)
+    temperature=_config_data.get("OPENAI_TEMPERATURE", 0.1),
+    base_url=_config_data.get("OPENAI_BASE_URL", ""),
+    output_mode=_config_data.get("OPENAI_OUTPUT_MODE", "parser"),
+    output_mode_by_model=_config_data.get("OPENAI_OUTPUT_MODE_BY_MODEL", {}),
+    repair_with_llm=_config_data.get("OPENAI_REPAIR_WITH_LLM", True),
+    model_prices=_config_data.get("OPENAI_MODEL_PRICES", DEFAULT_MODEL_PRICES),
+    model_tiers=_config_data.get("OPENAI_MODEL_TIERS", DEFAULT_MODEL_TIERS),
+    model_max_escalations=_config_data.get("OPENAI_MODEL_MAX_ESCALATIONS", 1),
+    hedge_enabled=_config_data.get("OPENAI_HEDGE_ENABLED", False),
+    hedge_percentile=_config_data.get("OPENAI_HEDGE_PERCENTILE", 95.0),
+    hedge_min_samples=_config_data.get("OPENAI_HEDGE_MIN_SAMPLES", 20),
+    hedge_default_delay_seconds=_config_data.get("OPENAI_HEDGE_DEFAULT_DELAY_SECONDS", 30.0),
+    hedge_min_delay_seconds=_config_data.get("OPENAI_HEDGE_MIN_DELAY_SECONDS", 5.0),
+    hedge_max_per_minute=_config_data.get("OPENAI_HEDGE_MAX_PER_MINUTE", 10)
 )
@@ -1,9 +1,9 @@
 from pydantic_settings import BaseSettings
 from typing import List
-from config.loader import load_env_json
+from config.loader import get_config_data
 
-# Load configuration from JSON
-_config_data = load_env_json()
+# Shared configuration, parsed once per process
+_config_data = get_config_data()
 
 # Define defaults as module-level constants
 DEFAULT_SYSTEM_PROMPT = (
@@ -48,6 +48,47 @@ CONFLUENCE_HUMAN_TEMPLATE = (
     "{format_instructions}"
 )
 
+# Repair prompts: fix only the fields that failed FigmaSummaryResult validation
+REPAIR_SYSTEM_PROMPT = (
+    "你是一位 JSON 修正助手，會以繁體中文輸出。"
+    "你會收到一份未通過驗證的摘要 JSON 與驗證錯誤訊息，"
+    "只修正錯誤訊息提到的欄位，其餘內容維持原意，不可捏造文件中沒有的資訊。\n"
+    "欄位規則：title 4-80 字；plan 3-7 點；summary 5-30 條完整語句且不可使用項目符號；qa 3-20 組問答。\n"
+    "只輸出一個 JSON 物件，鍵為需要修正的欄位名稱。"
+)
+
+REPAIR_HUMAN_TEMPLATE = (
+    "需要修正的欄位: {fields}\n"
+    "<validation_errors>\n{errors}\n</validation_errors>\n"
+    "<current_output>\n{current_output}\n</current_output>"
+)
+
+UPDATE_SYSTEM_PROMPT = (
+    "你是一位熟悉 Figma 文件的產品設計分析師，會以繁體中文輸出結論。"
+    "你會收到同一份文件上一版的摘要 JSON，以及這一版新增、刪除、修改的文字節點。"
+    "請只依照這些變更更新摘要：受影響的標題、步驟、摘要與問答需改寫或移除，新增資訊需補上，"
+    "未受影響的內容維持原文。日期與金額以變更後的內容為準，不可捏造文件中沒有的資訊。\n"
+    "欄位規則：title 4-80 字；plan 3-7 點；summary 5-30 條完整語句且不可使用項目符號；qa 3-20 組問答。\n"
+    "請嚴格按照 parser 指定的 JSON schema 輸出完整的摘要。"
+)
+
+NEAR_DUPLICATE_SYSTEM_PROMPT = (
+    "你是一位熟悉活動文件的產品分析師，會以繁體中文輸出結論。"
+    "你會收到一份相似文件（通常是前一檔活動複製後修改而來）的摘要 JSON，"
+    "以及本文件與該文件逐行比對後新增、刪除、修改的內容。"
+    "請以該摘要為基礎，依照這些差異改寫成本文件的摘要：活動名稱、日期、金額、名額等變更處必須更新，"
+    "被刪除的資訊需移除，新增資訊需補上，其餘內容維持原文。不可捏造文件中沒有的資訊。\n"
+    "欄位規則：title 4-80 字；plan 3-7 點；summary 5-30 條完整語句且不可使用項目符號；qa 3-20 組問答。\n"
+    "請嚴格按照 parser 指定的 JSON schema 輸出完整的摘要。"
+)
+
+UPDATE_HUMAN_TEMPLATE = (
+    "Url: {url}\n"
+    "<previous_summary>\n{previous_summary}\n</previous_summary>\n"
+    "<changes>\n{changes}\n</changes>\n"
+    "{format_instructions}"
+)
+
 
 class PromptSettings(BaseSettings):
     figma_system_prompt: str = DEFAULT_SYSTEM_PROMPT
@@ -55,6 +96,11 @@ class PromptSettings(BaseSettings):
     target_node_names: List[str] = DEFAULT_TARGET_NODE_NAMES
     confluence_system_prompt: str = CONFLUENCE_SYSTEM_PROMPT
     confluence_human_template: str = CONFLUENCE_HUMAN_TEMPLATE
+    repair_system_prompt: str = REPAIR_SYSTEM_PROMPT
+    repair_human_template: str = REPAIR_HUMAN_TEMPLATE
+    update_system_prompt: str = UPDATE_SYSTEM_PROMPT
+    update_human_template: str = UPDATE_HUMAN_TEMPLATE
+    near_duplicate_system_prompt: str = NEAR_DUPLICATE_SYSTEM_PROMPT
     
     class Config:
         # Allow extra fields to be ignored
@@ -67,5 +113,10 @@ settings = PromptSettings(
     figma_human_template=_config_data.get("FIGMA_HUMAN_TEMPLATE", DEFAULT_HUMAN_TEMPLATE),
     target_node_names=_config_data.get("TARGET_NODE_NAMES", DEFAULT_TARGET_NODE_NAMES),
     confluence_system_prompt=_config_data.get("CONFLUENCE_SYSTEM_PROMPT", CONFLUENCE_SYSTEM_PROMPT),
-    confluence_human_template=_config_data.get("CONFLUENCE_HUMAN_TEMPLATE", CONFLUENCE_HUMAN_TEMPLATE)
+    confluence_human_template=_config_data.get("CONFLUENCE_HUMAN_TEMPLATE", CONFLUENCE_HUMAN_TEMPLATE),
+    repair_system_prompt=_config_data.get("REPAIR_SYSTEM_PROMPT", REPAIR_SYSTEM_PROMPT),
+    repair_human_template=_config_data.get("REPAIR_HUMAN_TEMPLATE", REPAIR_HUMAN_TEMPLATE),
+    update_system_prompt=_config_data.get("UPDATE_SYSTEM_PROMPT", UPDATE_SYSTEM_PROMPT),
+    update_human_template=_config_data.get("UPDATE_HUMAN_TEMPLATE", UPDATE_HUMAN_TEMPLATE),
+    near_duplicate_system_prompt=_config_data.get("NEAR_DUPLICATE_SYSTEM_PROMPT", NEAR_DUPLICATE_SYSTEM_PROMPT)
 )
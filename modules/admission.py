@@ -0,0 +1,203 @@
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, NamedTuple, Optional
+
+from fastapi import HTTPException
+
+from modules.figma_client import extract_file_key
+from modules.figma_index import get_index_store
+from config.confluence import settings as confluence_settings
+from config.misc import settings as misc_settings
+from utils.metrics import observe_admission, observe_admission_wait, set_admission_state
+
+
+MB = 1024 * 1024
+
+# 尚無實際耗時資料時，預估一個請求佔用名額的秒數
+INITIAL_SERVICE_SECONDS = 10.0
+MAX_RETRY_AFTER_SECONDS = 120
+
+
+class RequestCost(NamedTuple):
+    """Estimated resources one parse request holds while it runs."""
+
+    memory_bytes: int
+    llm_slots: int = 1
+
+
+def estimate_figma_cost(url: str) -> RequestCost:
+    """
+    Memory for the decoded Figma document.
+
+    Uses the node count of the file's index when it is in memory (no disk
+    read on the event loop), otherwise ``ADMISSION_FIGMA_DEFAULT_MB``.
+    """
+    file_key = extract_file_key(url)
+    index = get_index_store().peek(file_key) if file_key else None
+    if index is None:
+        return RequestCost(misc_settings.admission_figma_default_mb * MB)
+    return RequestCost(max(len(index.nodes) * misc_settings.admission_figma_bytes_per_node, MB))
+
+
+def estimate_confluence_cost(include_linked_figma: bool = False) -> RequestCost:
+    memory = misc_settings.admission_confluence_default_mb * MB
+    if include_linked_figma:
+        # 連結的 Figma 檔案並行下載，以上限數量估算
+        memory += confluence_settings.linked_figma_max_files * misc_settings.admission_figma_default_mb * MB
+    return RequestCost(memory)
+
+
+class _Waiter:
+    __slots__ = ("cost", "future")
+
+    def __init__(self, cost: RequestCost, future: "asyncio.Future[None]"):
+        self.cost = cost
+        self.future = future
+
+
+class AdmissionController:
+    """
+    Admits parse requests while their estimated memory and LLM slots fit.
+
+    Requests that do not fit wait in a FIFO queue of at most ``max_queue``
+    entries for up to ``queue_timeout`` seconds; beyond that they are rejected
+    with 429 and a ``Retry-After`` based on recent request durations. A request
+    larger than the whole budget is still admitted when nothing else runs, so
+    it cannot starve. Meant to be used from a single event loop.
+    """
+
+    def __init__(self, memory_budget_bytes: int, llm_slots: int, max_queue: int, queue_timeout: float):
+        self.memory_budget_bytes = memory_budget_bytes
+        self.llm_slots = llm_slots
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.inflight_requests = 0
+        self.inflight_bytes = 0
+        self.inflight_slots = 0
+        self._waiters: Deque[_Waiter] = deque()
+        self._service_seconds = INITIAL_SERVICE_SECONDS
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def _fits(self, cost: RequestCost) -> bool:
+        if self.inflight_requests == 0:
+            return True
+        return (
+            self.inflight_slots + cost.llm_slots <= self.llm_slots
+            and self.inflight_bytes + cost.memory_bytes <= self.memory_budget_bytes
+        )
+
+    def _take(self, cost: RequestCost) -> None:
+        self.inflight_requests += 1
+        self.inflight_bytes += cost.memory_bytes
+        self.inflight_slots += cost.llm_slots
+        self._publish_state()
+
+    def _release(self, cost: RequestCost, held_seconds: float) -> None:
+        self.inflight_requests -= 1
+        self.inflight_bytes -= cost.memory_bytes
+        self.inflight_slots -= cost.llm_slots
+        self._service_seconds = 0.8 * self._service_seconds + 0.2 * held_seconds
+        self._wake()
+
+    def _wake(self) -> None:
+        # 依序喚醒排在最前面、且容量已足夠的請求
+        while self._waiters and self._fits(self._waiters[0].cost):
+            waiter = self._waiters.popleft()
+            if waiter.future.done():
+                continue
+            self._take(waiter.cost)
+            waiter.future.set_result(None)
+        self._publish_state()
+
+    def _publish_state(self) -> None:
+        set_admission_state(self.queue_depth, self.inflight_requests, self.inflight_bytes)
+
+    def retry_after(self) -> int:
+        """Seconds until capacity is likely, from the average request duration."""
+        rounds = (self.queue_depth + 1) / max(self.llm_slots, 1)
+        return max(1, min(MAX_RETRY_AFTER_SECONDS, math.ceil(self._service_seconds * rounds)))
+
+    def _reject(self, route: str, outcome: str, detail: str) -> HTTPException:
+        observe_admission(route, outcome)
+        return HTTPException(status_code=429, detail=detail, headers={"Retry-After": str(self.retry_after())})
+
+    async def _wait(self, route: str, cost: RequestCost, max_wait: Optional[float]) -> None:
+        if len(self._waiters) >= self.max_queue:
+            raise self._reject(route, "rejected", "伺服器忙碌中，請稍後再試")
+        waiter = _Waiter(cost, asyncio.get_running_loop().create_future())
+        self._waiters.append(waiter)
+        self._publish_state()
+        observe_admission(route, "queued")
+        started = time.perf_counter()
+        try:
+            # 請求的期限比佇列逾時短時，不等到期限過後才開始處理
+            timeout = self.queue_timeout if max_wait is None else max(0.0, min(self.queue_timeout, max_wait))
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as exc:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # 逾時或取消的同時剛好取得名額：歸還
+                self._release(cost, 0.0)
+            else:
+                waiter.future.cancel()
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                # 離開的請求可能擋住了後面放得下的請求
+                self._wake()
+            if isinstance(exc, asyncio.CancelledError):
+                raise
+            raise self._reject(route, "timeout", "等待處理逾時，伺服器忙碌中，請稍後再試") from None
+        finally:
+            observe_admission_wait(route, time.perf_counter() - started)
+
+    @asynccontextmanager
+    async def admit(self, route: str, cost: RequestCost, max_wait: Optional[float] = None) -> AsyncIterator[None]:
+        """
+        Hold capacity for ``cost`` during the block; raises HTTP 429 when unavailable.
+
+        ``max_wait`` (the time left before the request's deadline) shortens the
+        queue timeout.
+        """
+        if not self._waiters and self._fits(cost):
+            self._take(cost)
+        else:
+            await self._wait(route, cost, max_wait)
+        observe_admission(route, "admitted")
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._release(cost, time.perf_counter() - started)
+
+
+_controller: Optional[AdmissionController] = None
+
+
+def get_admission_controller() -> Optional[AdmissionController]:
+    """Process-wide controller, or None when admission control is disabled."""
+    global _controller
+    if not misc_settings.admission_enabled:
+        return None
+    if _controller is None:
+        _controller = AdmissionController(
+            memory_budget_bytes=misc_settings.admission_memory_budget_mb * MB,
+            llm_slots=misc_settings.admission_llm_slots,
+            max_queue=misc_settings.admission_max_queue,
+            queue_timeout=misc_settings.admission_queue_timeout_seconds,
+        )
+    return _controller
+
+
+@asynccontextmanager
+async def admission(route: str, cost: RequestCost, max_wait: Optional[float] = None) -> AsyncIterator[None]:
+    controller = get_admission_controller()
+    if controller is None:
+        yield
+        return
+    async with controller.admit(route, cost, max_wait):
+        yield
@@ -0,0 +1,226 @@
+"""
+Offline bulk summarization without the HTTP server.
+
+Reads Figma / Confluence URLs (one per line, ``#`` comments allowed) from a
+file or stdin, summarizes them on a thread pool and writes one JSON line per
+URL as soon as it finishes. URLs that succeeded are appended to a checkpoint
+file, so an interrupted run can be restarted with the same arguments and only
+processes what is left; failed URLs are retried on the next run.
+
+    python -m modules.bulk_runner urls.txt -o results.jsonl --workers 4
+    cat urls.txt | python -m modules.bulk_runner - -o results.jsonl --model auto
+"""
+
+import argparse
+import contextvars
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, IO, Iterable, List, Optional, Set
+
+from modules.confluence_client import ConfluencePageBatcher, extract_page_id, is_confluence_url
+from modules.confluence_doc_agent import generate_confluence_summary
+from modules.figma_agent import format_output, generate_figma_summary
+from modules.figma_client import extract_file_key
+from utils.deadline import Deadline, deadline_scope
+from utils.metrics import start_request_timings
+from utils.usage import collect_usage
+
+
+def read_urls(lines: Iterable[str]) -> List[str]:
+    """Non-empty, non-comment lines in input order, without duplicates."""
+    urls: List[str] = []
+    seen: Set[str] = set()
+    for line in lines:
+        url = line.strip()
+        if url and not url.startswith("#") and url not in seen:
+            seen.add(url)
+            urls.append(url)
+    return urls
+
+
+def detect_doc_type(url: str) -> Optional[str]:
+    if extract_file_key(url):
+        return "figma"
+    if is_confluence_url(url):
+        return "confluence"
+    return None
+
+
+def load_checkpoint(path: str) -> Set[str]:
+    if not path or not os.path.exists(path):
+        return set()
+    with open(path, encoding="utf-8") as handle:
+        return {line.strip() for line in handle if line.strip()}
+
+
+def process_url(
+    url: str,
+    options: argparse.Namespace,
+    pages: Optional[ConfluencePageBatcher] = None,
+) -> Dict[str, Any]:
+    """
+    Summarize one URL and return its JSONL record; errors are reported, not raised.
+
+    Confluence pages come from ``pages`` when given, so a batch needs one
+    search request per ``CONFLUENCE_BULK_FETCH_LIMIT`` pages instead of one
+    request each.
+    """
+    timings = start_request_timings()
+    started = time.perf_counter()
+    record: Dict[str, Any] = {"url": url, "doc_type": detect_doc_type(url), "ok": False}
+    # 批次預設不限時；--deadline-seconds 為每個網址的期限
+    deadline = Deadline(options.deadline_seconds) if options.deadline_seconds else None
+    with deadline_scope(deadline), collect_usage() as usage:
+        try:
+            if record["doc_type"] == "figma":
+                result = generate_figma_summary(
+                    url,
+                    llm_model=options.model,
+                    temperature=options.temperature,
+                    search_activity_node=options.search_activity_node,
+                )
+            elif record["doc_type"] == "confluence":
+                page_id = extract_page_id(url)
+                result = generate_confluence_summary(
+                    url,
+                    llm_model=options.model,
+                    temperature=options.temperature,
+                    include_linked_figma=options.include_linked_figma,
+                    page_json=pages.get(page_id) if pages is not None and page_id else None,
+                )
+            else:
+                raise ValueError("不支援的網址，僅支援 Figma 或 Confluence 頁面")
+            record.update(ok=True, title=result.title, summary=format_output(result), result=result.model_dump())
+        except Exception as exc:
+            record.update(error=str(exc), error_type=type(exc).__name__)
+    stage_seconds: Dict[str, float] = {}
+    for stage, elapsed in timings:
+        stage_seconds[stage] = round(stage_seconds.get(stage, 0.0) + elapsed, 4)
+    record.update(
+        model=usage.model,
+        usage=usage.summary(),
+        timings=stage_seconds,
+        duration_seconds=round(time.perf_counter() - started, 4),
+        finished_at=time.time(),
+    )
+    return record
+
+
+def run_bulk(
+    urls: List[str],
+    options: argparse.Namespace,
+    output: IO[str],
+    checkpoint: Optional[IO[str]] = None,
+) -> Dict[str, int]:
+    """
+    Process ``urls`` with ``options.workers`` threads, writing records as they finish.
+
+    Only the calling thread writes to ``output`` / ``checkpoint``; each line is
+    flushed before the URL is checkpointed, so a crash never loses a result
+    that the checkpoint claims.
+    """
+    counts = {"ok": 0, "failed": 0}
+    pending: Dict[Future, str] = {}
+    queue = iter(urls)
+    page_ids = [extract_page_id(url) for url in urls if detect_doc_type(url) == "confluence"]
+    pages = ConfluencePageBatcher([page_id for page_id in page_ids if page_id]) if page_ids else None
+    with ThreadPoolExecutor(max_workers=options.workers, thread_name_prefix="bulk") as executor:
+
+        def submit_next() -> None:
+            url = next(queue, None)
+            if url is not None:
+                # 每個項目使用獨立的 context，計時與用量不會互相混入
+                context = contextvars.copy_context()
+                pending[executor.submit(context.run, process_url, url, options, pages)] = url
+
+        # 只預先送出 workers 個項目，輸入很長時不必一次建立所有 future
+        for _ in range(options.workers):
+            submit_next()
+        try:
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url = pending.pop(future)
+                    record = future.result()
+                    output.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    output.flush()
+                    if record["ok"]:
+                        counts["ok"] += 1
+                        if checkpoint is not None:
+                            checkpoint.write(url + "\n")
+                            checkpoint.flush()
+                    else:
+                        counts["failed"] += 1
+                    submit_next()
+        except KeyboardInterrupt:
+            for future in pending:
+                future.cancel()
+            raise
+    return counts
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Summarize Figma / Confluence URLs in bulk into JSONL")
+    parser.add_argument("input", help="file with one URL per line, or - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="JSONL output file (appended), default stdout")
+    parser.add_argument(
+        "--checkpoint",
+        help="file of finished URLs for resuming; defaults to <output>.checkpoint when writing to a file",
+    )
+    parser.add_argument("-w", "--workers", type=int, default=4)
+    parser.add_argument("--model", default="gpt-4.1-mini", help='model name, or "auto" for size-based routing')
+    parser.add_argument("--temperature", type=float, default=0.0)
+    parser.add_argument("--include-linked-figma", action="store_true")
+    parser.add_argument(
+        "--no-search-activity-node",
+        dest="search_activity_node",
+        action="store_false",
+        help="summarize the whole Figma file instead of the activity description node",
+    )
+    parser.add_argument(
+        "--deadline-seconds",
+        type=float,
+        help="time budget per URL; stages fail fast or use a smaller model when it runs low (default: none)",
+    )
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    options = build_parser().parse_args(argv)
+    if options.workers < 1:
+        print("--workers 至少為 1", file=sys.stderr)
+        return 2
+    if options.input == "-":
+        urls = read_urls(sys.stdin)
+    else:
+        with open(options.input, encoding="utf-8") as handle:
+            urls = read_urls(handle)
+
+    checkpoint_path = options.checkpoint
+    if checkpoint_path is None and options.output != "-":
+        checkpoint_path = options.output + ".checkpoint"
+    finished = load_checkpoint(checkpoint_path)
+    remaining = [url for url in urls if url not in finished]
+    print(f"共 {len(urls)} 筆，已完成 {len(urls) - len(remaining)} 筆，待處理 {len(remaining)} 筆", file=sys.stderr)
+
+    output = sys.stdout if options.output == "-" else open(options.output, "a", encoding="utf-8")
+    checkpoint = open(checkpoint_path, "a", encoding="utf-8") if checkpoint_path else None
+    try:
+        counts = run_bulk(remaining, options, output, checkpoint)
+    except KeyboardInterrupt:
+        print("已中斷，重新執行相同指令即可從 checkpoint 繼續", file=sys.stderr)
+        return 130
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        if checkpoint is not None:
+            checkpoint.close()
+    print(f"完成 {counts['ok']} 筆，失敗 {counts['failed']} 筆", file=sys.stderr)
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+from typing import Any, Dict, Optional, Tuple
+
+from pydantic import ValidationError
+
+from langchain_core.exceptions import OutputParserException
+from langchain_core.messages import BaseMessage
+from langchain_core.output_parsers import PydanticOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import Runnable, RunnableConfig
+from langchain_openai import ChatOpenAI
+
+from modules.hedging import run_hedged
+from modules.models import FigmaSummaryResult
+from modules.output_repair import apply_local_fixes, extract_raw_output, repair_with_llm, validate
+from config.openai import settings as openai_settings
+from utils.cancellation import check_cancelled, current_token
+from utils.circuit_breaker import OPENAI, get_breaker
+from utils.deadline import check_deadline
+from utils.metrics import observe_llm_usage, observe_repair, observe_validation, track_stage
+from utils.usage import record_llm_usage
+
+
+OUTPUT_MODES = ("parser", "json_schema", "function_calling")
+
+
+class OutputValidationError(RuntimeError):
+    """The model output failed validation and could not be repaired."""
+
+
+def model_name_of(llm: Optional[ChatOpenAI], message: Optional[BaseMessage] = None) -> str:
+    """Configured model name, falling back to the one reported in the response."""
+    name = getattr(llm, "model_name", None)
+    if not name and message is not None:
+        name = (getattr(message, "response_metadata", None) or {}).get("model_name")
+    return name or "unknown"
+
+
+def resolve_output_mode(llm: ChatOpenAI, output_mode: Optional[str] = None) -> str:
+    """Pick the output mode: explicit argument, then per-model setting, then default."""
+    model_name = getattr(llm, "model_name", "") or ""
+    mode = output_mode or openai_settings.output_mode_by_model.get(model_name) or openai_settings.output_mode
+    if mode not in OUTPUT_MODES:
+        raise ValueError(f"不支援的輸出模式: {mode}，可用模式: {', '.join(OUTPUT_MODES)}")
+    return mode
+
+
+def _response_format() -> Dict[str, Any]:
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": FigmaSummaryResult.__name__,
+            "schema": FigmaSummaryResult.model_json_schema(),
+            "strict": False,
+        },
+    }
+
+
+def build_summary_chain(
+    llm: ChatOpenAI,
+    system_prompt: str,
+    human_template: str,
+    output_mode: str = "parser",
+) -> Tuple[Runnable, str]:
+    """
+    Build ``prompt | llm`` for the given output mode.
+
+    Returns the chain and the ``format_instructions`` text for the human prompt.
+    Only ``parser`` mode puts the JSON schema into the prompt; the native modes
+    pass it to the API as ``response_format`` or a forced tool call instead.
+    """
+    prompt = ChatPromptTemplate.from_messages(
+        [
+            ("system", system_prompt),
+            ("human", human_template),
+        ]
+    )
+    if output_mode == "json_schema":
+        return prompt | llm.bind(response_format=_response_format()), ""
+    if output_mode == "function_calling":
+        bound = llm.bind_tools(
+            [FigmaSummaryResult],
+            tool_choice=FigmaSummaryResult.__name__,
+            parallel_tool_calls=False,
+        )
+        return prompt | bound, ""
+    parser = PydanticOutputParser(pydantic_object=FigmaSummaryResult)
+    return prompt | llm, parser.get_format_instructions()
+
+
+def parse_summary(message: BaseMessage, output_mode: str) -> FigmaSummaryResult:
+    """Validate the model output into ``FigmaSummaryResult`` according to ``output_mode``."""
+    if output_mode == "json_schema":
+        return FigmaSummaryResult.model_validate_json(message.content)
+    if output_mode == "function_calling":
+        tool_calls = getattr(message, "tool_calls", None) or []
+        if not tool_calls:
+            raise OutputParserException("LLM 未回傳 tool call")
+        return FigmaSummaryResult.model_validate(tool_calls[0]["args"])
+    return PydanticOutputParser(pydantic_object=FigmaSummaryResult).invoke(message)
+
+
+def repair_summary(
+    stage: str,
+    message: BaseMessage,
+    output_mode: str,
+    error: Exception,
+    llm: Optional[ChatOpenAI] = None,
+) -> FigmaSummaryResult:
+    """
+    Try to turn an output that failed validation into a valid result.
+
+    First applies safe local fixes (bullet prefixes, over-long lists); if the
+    result still fails and ``llm`` is given, asks the model to rewrite only the
+    failing fields. Raises the last validation error when both attempts fail.
+    """
+    data = extract_raw_output(message, output_mode)
+    if data is not None:
+        with track_stage(f"{stage}_repair_local"):
+            fixed, applied = apply_local_fixes(data)
+            try:
+                result = validate(fixed) if applied else None
+            except ValidationError as err:
+                result, error = None, err
+        if result is not None:
+            observe_repair(stage, "local", "ok")
+            return result
+        if applied:
+            observe_repair(stage, "local", "failed")
+        data = fixed
+
+    if llm is None or not openai_settings.repair_with_llm:
+        raise error
+    try:
+        with track_stage(f"{stage}_repair_llm"):
+            result = validate(repair_with_llm(llm, data or {"raw_output": message.content}, error, stage))
+    except (OutputParserException, ValidationError, ValueError) as err:
+        observe_repair(stage, "llm", "failed")
+        raise err from error
+    observe_repair(stage, "llm", "ok")
+    return result
+
+
+def invoke_chain(
+    stage: str,
+    chain: Runnable,
+    inputs: Dict[str, Any],
+    config: Optional[RunnableConfig] = None,
+) -> BaseMessage:
+    """
+    Invoke ``chain``; inside a cancellation scope the response is streamed instead.
+
+    Streaming lets a cancelled request close the connection mid-generation,
+    so the model stops producing output tokens nobody will read; the same
+    happens once the request's deadline has passed. The chunks are merged
+    into one message, so callers see the same result either way.
+    """
+    if current_token() is None:
+        return chain.invoke(inputs, config=config or {})
+    message: Optional[BaseMessage] = None
+    stream = chain.stream(inputs, config=config or {})
+    try:
+        for chunk in stream:
+            check_cancelled(f"{stage}_llm")
+            check_deadline(f"{stage}_llm")
+            message = chunk if message is None else message + chunk
+    finally:
+        stream.close()
+    if message is None:
+        raise OutputParserException("LLM 未回傳任何內容")
+    return message
+
+
+def run_summary_chain(
+    stage: str,
+    chain: Runnable,
+    inputs: Dict[str, Any],
+    output_mode: str,
+    config: Optional[RunnableConfig] = None,
+    llm: Optional[ChatOpenAI] = None,
+) -> FigmaSummaryResult:
+    """
+    Invoke the chain, then validate its output.
+
+    LLM call and validation are timed as ``{stage}_llm`` / ``{stage}_validate``;
+    token usage and validation outcome are recorded per output mode. Outputs
+    that fail validation go through ``repair_summary`` before giving up; pass
+    ``llm`` to allow the LLM repair step. With ``OPENAI_HEDGE_ENABLED`` a call
+    slower than recent calls of the same stage and model gets a second,
+    identical call and the first valid result wins (see ``run_hedged``).
+    """
+    if not openai_settings.hedge_enabled:
+        return _run_summary_chain_once(stage, chain, inputs, output_mode, config, llm)
+    return run_hedged(
+        stage,
+        f"{stage}:{model_name_of(llm)}",
+        lambda: _run_summary_chain_once(stage, chain, inputs, output_mode, config, llm),
+    )
+
+
+def _run_summary_chain_once(
+    stage: str,
+    chain: Runnable,
+    inputs: Dict[str, Any],
+    output_mode: str,
+    config: Optional[RunnableConfig] = None,
+    llm: Optional[ChatOpenAI] = None,
+) -> FigmaSummaryResult:
+    with get_breaker(OPENAI).guard(), track_stage(f"{stage}_llm"):
+        message = invoke_chain(stage, chain, inputs, config)
+    usage_metadata = getattr(message, "usage_metadata", None)
+    observe_llm_usage(f"{stage}_llm", usage_metadata, mode=output_mode)
+    record_llm_usage(stage, model_name_of(llm, message), usage_metadata)
+    try:
+        with track_stage(f"{stage}_validate"):
+            result = parse_summary(message, output_mode)
+    except (OutputParserException, ValidationError, ValueError) as err:
+        observe_validation(stage, "failed", mode=output_mode)
+        try:
+            return repair_summary(stage, message, output_mode, err, llm)
+        except (OutputParserException, ValidationError, ValueError) as repair_err:
+            raise OutputValidationError(f"LLM 輸出驗證失敗: {repair_err}") from err
+    observe_validation(stage, "ok", mode=output_mode)
+    return result
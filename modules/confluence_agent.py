@@ -7,7 +7,10 @@ from urllib.parse import unquote
 import requests
 
 from config.confluence import settings
+from config.misc import settings as misc_settings
 from modules.figma_agent import FigmaSummaryResult
+from utils.circuit_breaker import CONFLUENCE, CircuitOpenError, DependencyStatusError, get_breaker
+from utils.metrics import observe_payload_bytes, track_stage
 
 @dataclass
 class ConfluencePublisher:
@@ -56,8 +59,14 @@ class ConfluencePublisher:
         """
         try:
             endpoint = f"{self.base_url.rstrip('/')}/rest/api/content/{folder_id}"
-            response = self.session.get(endpoint, timeout=30)
+            with get_breaker(CONFLUENCE).guard(), track_stage("confluence_folder_validate"):
+                response = self.session.get(endpoint, timeout=misc_settings.http_timeout_seconds)
+                if response.status_code >= 500:
+                    raise DependencyStatusError(f"Confluence 回傳狀態碼 {response.status_code}", response.status_code)
             return response.status_code == requests.codes.ok
+        except CircuitOpenError:
+            # 斷路器開啟時無法判斷 folder 是否存在，不可因此改發佈到根目錄
+            raise
         except Exception:
             # 捕獲所有異常（網路錯誤、timeout 等）
             return False
@@ -65,18 +74,20 @@ class ConfluencePublisher:
     def get_folder_info(self, folder_id: str) -> Dict[str, Any]:
         """取得 folder 資訊，用於驗證 folder 是否存在"""
         endpoint = f"{self.base_url.rstrip('/')}/rest/api/content/{folder_id}"
-        response = self.session.get(endpoint, timeout=30)
-        if response.status_code != requests.codes.ok:
-            raise RuntimeError(
-                f"無法取得 folder 資訊: {response.status_code} {response.text}"
-            )
+        with get_breaker(CONFLUENCE).guard():
+            response = self.session.get(endpoint, timeout=misc_settings.http_timeout_seconds)
+            if response.status_code != requests.codes.ok:
+                raise DependencyStatusError(
+                    f"無法取得 folder 資訊: {response.status_code} {response.text}", response.status_code
+                )
         return response.json()
 
     def create_page(
         self, 
         title: str, 
         adf_doc: Dict[str, Any], 
-        folder_id: Optional[str] = None
+        folder_id: Optional[str] = None,
+        labels: Optional[List[str]] = None
     ) -> str:
         """
         建立 Confluence 頁面
@@ -86,6 +97,7 @@ class ConfluencePublisher:
             adf_doc: ADF 格式的文件內容
             folder_id: (可選) Confluence folder ID，如果指定則頁面會建立在該 folder 下
                       範例: "3412262946" (從 URL 取得)
+            labels: (可選) 建立時加上的頁面標籤
         
         Returns:
             建立成功的頁面 URL
@@ -112,15 +124,51 @@ class ConfluencePublisher:
         # 如果有指定 folder_id，將其設為父頁面
         if target_folder_id:
             payload["ancestors"] = [{"id": target_folder_id}]
+        if labels:
+            payload["metadata"] = {"labels": [{"prefix": "global", "name": label} for label in labels]}
         
-        response = self.session.post(endpoint, json=payload, timeout=30)
-        if response.status_code not in (requests.codes.ok, requests.codes.created):
-            raise RuntimeError(
-                f"Confluence 建立頁面失敗: {response.status_code} {response.text}"
-            )
+        observe_payload_bytes("confluence_publish", len(payload["body"]["atlas_doc_format"]["value"]))
+        with get_breaker(CONFLUENCE).guard(), track_stage("confluence_publish"):
+            response = self.session.post(endpoint, json=payload, timeout=misc_settings.http_timeout_seconds)
+            if response.status_code not in (requests.codes.ok, requests.codes.created):
+                raise DependencyStatusError(
+                    f"Confluence 建立頁面失敗: {response.status_code} {response.text}", response.status_code
+                )
+        return self._page_url(response.json())
+
+    def find_page(self, title: str) -> Optional[Dict[str, Any]]:
+        """
+        依標題在 space 中尋找頁面
+
+        Args:
+            title: 頁面標題
+
+        Returns:
+            找到時回傳 {"url": 頁面 URL, "labels": 標籤名稱}，否則 None
+        """
+        endpoint = f"{self.base_url.rstrip('/')}/rest/api/content"
+        params = {"spaceKey": self.space_key, "title": title.strip(), "type": "page", "expand": "metadata.labels"}
+        with get_breaker(CONFLUENCE).guard(), track_stage("confluence_find_page"):
+            response = self.session.get(endpoint, params=params, timeout=misc_settings.http_timeout_seconds)
+            if response.status_code != requests.codes.ok:
+                raise DependencyStatusError(
+                    f"Confluence 查詢頁面失敗: {response.status_code} {response.text}", response.status_code
+                )
         data = response.json()
-        links = data.get("_links", {})
-        base_link = links.get("base") or self.base_url.rstrip("/")
+        results = data.get("results") or []
+        if not results:
+            return None
+        page = results[0]
+        labels = ((page.get("metadata") or {}).get("labels") or {}).get("results") or []
+        return {
+            # 搜尋結果的 base 連結在最外層
+            "url": self._page_url(page, data.get("_links", {}).get("base")),
+            "labels": [label.get("name") for label in labels],
+        }
+
+    def _page_url(self, page: Dict[str, Any], base: Optional[str] = None) -> str:
+        links = page.get("_links", {})
+        base_link = links.get("base") or base or self.base_url.rstrip("/")
         webui = links.get("webui") or ""
         return f"{base_link}{webui}"
 
@@ -1,10 +1,16 @@
 import re
+import threading
 from dataclasses import dataclass
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, List, Optional
 
 import requests
 
 from config.confluence import settings
+from config.misc import settings as misc_settings
+from utils.cancellation import check_cancelled
+from utils.circuit_breaker import CONFLUENCE, DependencyStatusError, get_breaker
+from utils.deadline import stage_timeout
+from utils.metrics import observe_cache_lookup, observe_payload_bytes, track_stage
 
 
 # Pattern to extract page ID from Confluence URLs
@@ -13,6 +19,8 @@ from config.confluence import settings
 # - https://lang.atlassian.net/wiki/spaces/ACS/pages/123456789
 CONFLUENCE_PAGE_URL_RE = re.compile(r"atlassian\.net/wiki/spaces/[^/]+/pages/(\d+)")
 
+PAGE_EXPAND = "body.storage,body.view,version,space"
+
 
 def extract_page_id(url: str) -> Optional[str]:
     """Extract page ID from Confluence URL."""
@@ -25,6 +33,13 @@ def is_confluence_url(url: str) -> bool:
     return "atlassian.net" in url
 
 
+def check_status(response: requests.Response) -> None:
+    if response.status_code != requests.codes.ok:
+        raise DependencyStatusError(
+            f"Confluence API 回傳狀態碼 {response.status_code}: {response.text}", response.status_code
+        )
+
+
 @dataclass
 class ConfluenceAPIClient:
     """API client for fetching Confluence page content."""
@@ -63,11 +78,114 @@ class ConfluenceAPIClient:
         # Use expand to get body content in storage format
         endpoint = f"{self.base_url.rstrip('/')}/rest/api/content/{page_id}"
         params = {
-            "expand": "body.storage,body.view,version,space"
+            "expand": PAGE_EXPAND
         }
-        response = self.session.get(endpoint, params=params, timeout=30)
-        if response.status_code != requests.codes.ok:
-            raise RuntimeError(
-                f"Confluence API 回傳狀態碼 {response.status_code}: {response.text}"
+        check_cancelled("confluence_download")
+        with get_breaker(CONFLUENCE).guard(), track_stage("confluence_download"):
+            response = self.session.get(
+                endpoint,
+                params=params,
+                timeout=stage_timeout("confluence_download", misc_settings.http_timeout_seconds),
             )
-        return response.json()
+            check_status(response)
+        observe_payload_bytes("confluence_download", len(response.content))
+        with track_stage("confluence_decode"):
+            return response.json()
+
+    def fetch_pages(self, page_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Fetch several pages with CQL ``id in (...)`` searches, keyed by page ID.
+
+        Uses the same expansions as ``fetch_page``, so each page has the same
+        shape. Sends one request per ``CONFLUENCE_BULK_FETCH_LIMIT`` IDs; pages
+        that are missing or not visible are simply absent from the result.
+        """
+        ids = [page_id for page_id in dict.fromkeys(page_ids) if page_id.isdigit()]
+        endpoint = f"{self.base_url.rstrip('/')}/rest/api/content/search"
+        limit = max(1, settings.bulk_fetch_limit)
+        pages: Dict[str, Dict[str, Any]] = {}
+        for start in range(0, len(ids), limit):
+            chunk = ids[start:start + limit]
+            params = {
+                "cql": f"id in ({','.join(chunk)})",
+                "expand": PAGE_EXPAND,
+                "limit": len(chunk),
+            }
+            with get_breaker(CONFLUENCE).guard(), track_stage("confluence_bulk_download"):
+                # 一次取回多頁，逾時上限為單頁的兩倍
+                response = self.session.get(
+                    endpoint,
+                    params=params,
+                    timeout=stage_timeout("confluence_bulk_download", 2 * misc_settings.http_timeout_seconds),
+                )
+                check_status(response)
+            observe_payload_bytes("confluence_bulk_download", len(response.content))
+            with track_stage("confluence_decode"):
+                results = response.json().get("results", [])
+            for page in results:
+                pages[str(page.get("id"))] = page
+        return pages
+
+
+class ConfluencePageBatcher:
+    """
+    Hands prefetched pages to per-URL pipelines in a batch workload.
+
+    The page IDs are known up front and split into batches in input order.
+    The first ``get`` for a page fetches its whole batch with one
+    ``fetch_pages`` call; concurrent callers for the same batch wait for that
+    call instead of issuing their own. ``get`` returns None when the page
+    could not be prefetched, and the caller falls back to ``fetch_page``.
+    """
+
+    def __init__(
+        self,
+        page_ids: List[str],
+        client_factory: Callable[[], ConfluenceAPIClient] = ConfluenceAPIClient,
+        batch_size: Optional[int] = None,
+    ):
+        self.page_ids = list(dict.fromkeys(page_ids))
+        self.batch_size = max(1, batch_size or settings.bulk_fetch_limit)
+        self.client_factory = client_factory
+        self._positions = {page_id: position for position, page_id in enumerate(self.page_ids)}
+        self._pages: Dict[str, Dict[str, Any]] = {}
+        self._batches: Dict[int, threading.Event] = {}
+        self._lock = threading.Lock()
+        self._client: Optional[ConfluenceAPIClient] = None
+
+    def get(self, page_id: str) -> Optional[Dict[str, Any]]:
+        position = self._positions.get(page_id)
+        if position is None:
+            return None
+        batch = position // self.batch_size
+        with self._lock:
+            done = self._batches.get(batch)
+            owner = done is None
+            if owner:
+                done = self._batches[batch] = threading.Event()
+        if owner:
+            try:
+                self._fetch_batch(batch)
+            finally:
+                done.set()
+        else:
+            done.wait()
+        with self._lock:
+            # 取出後即釋放，批次中的頁面只保留到各自的流程取用為止
+            page = self._pages.pop(page_id, None)
+        observe_cache_lookup("confluence_bulk", "hit" if page is not None else "miss")
+        return page
+
+    def _fetch_batch(self, batch: int) -> None:
+        ids = self.page_ids[batch * self.batch_size:(batch + 1) * self.batch_size]
+        try:
+            with self._lock:
+                if self._client is None:
+                    self._client = self.client_factory()
+                client = self._client
+            pages = client.fetch_pages(ids)
+        except Exception:
+            # 批次失敗時各頁面改走單頁 fetch_page，錯誤由該流程回報
+            return
+        with self._lock:
+            self._pages.update(pages)
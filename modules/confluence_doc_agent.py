@@ -1,14 +1,25 @@
-from typing import List, Optional
-
-from langchain_openai import ChatOpenAI
+import contextvars
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
 
 from modules.models import FigmaSummaryResult, QAItem
 from modules.confluence_client import ConfluenceAPIClient, extract_page_id, is_confluence_url
-from modules.confluence_parser import aggregate_confluence_content
-from modules.confluence_llm_chain import run_confluence_chain
+from modules.confluence_parser import aggregate_confluence_content, find_figma_file_keys
+from modules.figma_agent import fetch_figma_content
+from modules.similarity_index import (
+    remember_summary,
+    similarity_fingerprint,
+    stored_summary,
+    update_from_near_duplicate,
+)
 from config.confluence import settings as confluence_settings
 from config.openai import settings as openai_settings
+from utils.circuit_breaker import CircuitOpenError
+from utils.deadline import check_deadline, llm_request_options
 from utils.log import get_logger
+from utils.metrics import observe_content_length, observe_summary_duration, observe_summary_mode, track_stage
+from utils.usage import collect_usage
 
 
 # Initialize logger using factory function
@@ -32,12 +43,39 @@ def format_output(result: FigmaSummaryResult) -> str:
     return "\n".join(lines)
 
 
+def collect_linked_figma(url: str, futures: List[Tuple[str, Future]]) -> str:
+    """Append the content of each linked Figma file; files that fail are skipped."""
+    sections = []
+    for file_key, future in futures:
+        try:
+            content = future.result()
+        except Exception as exc:
+            logger.warning(status="warning", url=url, message=f"無法取得連結的Figma文件 {file_key}: {exc}")
+            continue
+        sections.append(f"\n\n=== 連結的 Figma 文件 {file_key} ===\n{content}")
+    logger.info(status="info", url=url, message=f"合併連結的Figma文件 {len(sections)}/{len(futures)} 個")
+    return "".join(sections)
+
+
+def stale_summary(url: str, key: str, exc: CircuitOpenError) -> FigmaSummaryResult:
+    """Last summary of the page while Confluence or OpenAI is unavailable; re-raises ``exc`` without one."""
+    result = stored_summary(key)
+    if result is None:
+        logger.error(status="error", url=url, message=f"產生摘要與問答失敗: {exc}")
+        raise exc
+    logger.warning(status="warning", url=url, message=f"{exc}，改用此頁面的既有摘要")
+    observe_summary_mode("confluence", "reuse", "circuit_open")
+    return result
+
+
 def generate_confluence_summary(
     url: str,
     *,
     api_key: Optional[str] = None,
     llm_model: str = "gpt-4.1-mini",
     temperature: float = 0.0,
+    include_linked_figma: bool = False,
+    page_json: Optional[Dict[str, Any]] = None,
 ) -> FigmaSummaryResult:
     """
     Generate summary and Q&A from a Confluence page.
@@ -45,28 +83,55 @@ def generate_confluence_summary(
     Args:
         url: Confluence page URL
         api_key: Optional OpenAI API key override
-        llm_model: LLM model to use
+        llm_model: LLM model to use, or "auto" to pick one by content size
         temperature: LLM temperature
+        include_linked_figma: Also summarize the Figma files linked from the page
+            (at most CONFLUENCE_LINKED_FIGMA_MAX_FILES), fetched concurrently
+        page_json: Page already fetched for this URL (e.g. by ``fetch_pages`` in
+            a batch); skips the per-page request
         
     Returns:
         FigmaSummaryResult with title, plan, summary, and qa
     """
+    started = time.perf_counter()
     page_id = extract_page_id(url)
     if not page_id:
         raise ValueError("無法取得有效的Confluence頁面ID，請確認連結格式。")
 
+    similarity_key = f"confluence:{page_id}"
     try:
-        client = ConfluenceAPIClient()
-        page_json = client.fetch_page(page_id)
+        if page_json is None:
+            client = ConfluenceAPIClient()
+            page_json = client.fetch_page(page_id)
+    except CircuitOpenError as exc:
+        return stale_summary(url, similarity_key, exc)
     except Exception as exc:
         logger.error(status="error", url=url, message="無法取得Confluence頁面，請確認連結或權限。")
         raise RuntimeError(
             "無法取得Confluence頁面，請確認連結或權限。"
         ) from exc
 
-    # Extract text content from the page
-    confluence_content = aggregate_confluence_content(page_json)
-    logger.info(status="info", url=url, message=f"成功取得Confluence內容，長度: {len(confluence_content)}")
+    linked_keys: List[str] = []
+    if include_linked_figma:
+        linked_keys = find_figma_file_keys(page_json)[: confluence_settings.linked_figma_max_files]
+
+    # 連結的 Figma 檔案在背景下載，與 Confluence 文字擷取同時進行
+    with ThreadPoolExecutor(max_workers=max(1, len(linked_keys)), thread_name_prefix="linked-figma") as pool:
+        futures = [
+            (file_key, pool.submit(contextvars.copy_context().run, fetch_figma_content, file_key))
+            for file_key in linked_keys
+        ]
+
+        # Extract text content from the page
+        check_deadline("confluence_extract")
+        with track_stage("confluence_extract"):
+            confluence_content = aggregate_confluence_content(page_json)
+        observe_content_length("confluence_extract", len(confluence_content))
+        logger.info(status="info", url=url, message=f"成功取得Confluence內容，長度: {len(confluence_content)}")
+
+        if futures:
+            with track_stage("confluence_linked_figma"):
+                confluence_content += collect_linked_figma(url, futures)
 
     # Use provided API key or from configuration
     openai_api_key = api_key or openai_settings.api_key
@@ -74,17 +139,51 @@ def generate_confluence_summary(
         logger.error(status="error", url=url, message="OpenAI API key 未設定")
         raise ValueError("OpenAI API key 未設定")
     
-    llm = ChatOpenAI(
-        model=llm_model,
-        temperature=temperature,
-        api_key=openai_api_key
-    )
-    try:
-        result = run_confluence_chain(url, confluence_content, llm)
-        logger.info(status="info", url=url, message="產生摘要與問答成功")
-    except Exception as exc:
-        logger.error(status="error", url=url, message=f"產生摘要與問答失敗: {exc}")
-        raise RuntimeError(f"產生摘要與問答失敗: {exc}") from exc
+    # LLM 相關套件延遲到第一次使用時才載入，縮短冷啟動時間
+    from langchain_openai import ChatOpenAI
+    from modules.confluence_llm_chain import run_confluence_chain
+    from modules.model_router import run_with_model_cascade
+
+    def build_llm(model: str) -> ChatOpenAI:
+        return ChatOpenAI(
+            model=model,
+            temperature=temperature,
+            api_key=openai_api_key,
+            base_url=openai_settings.base_url or None,
+            # 可取消的請求以串流呼叫，自訂 base_url 時也要回報 token 用量
+            stream_usage=True,
+            # 每次呼叫的逾時為請求剩餘的期限
+            **llm_request_options("confluence_llm"),
+        )
+
+    def summarize(model: str) -> FigmaSummaryResult:
+        return run_confluence_chain(url, confluence_content, build_llm(model))
+
+    similarity = similarity_fingerprint("confluence", llm_model, temperature)
+
+    with collect_usage() as usage:
+        try:
+            # 複製自前一檔活動的頁面：只依與相似頁面的差異更新其摘要
+            near_duplicate = update_from_near_duplicate(
+                "confluence", url, similarity_key, similarity, confluence_content, llm_model, build_llm
+            )
+            if near_duplicate is not None:
+                result, model_used = near_duplicate
+            else:
+                result, model_used = run_with_model_cascade(
+                    "confluence", url, confluence_content, llm_model, summarize
+                )
+            logger.info(status="info", url=url, message="產生摘要與問答成功")
+        except CircuitOpenError as exc:
+            return stale_summary(url, similarity_key, exc)
+        except Exception as exc:
+            logger.error(status="error", url=url, message=f"產生摘要與問答失敗: {exc}")
+            raise RuntimeError(f"產生摘要與問答失敗: {exc}") from exc
+        finally:
+            if usage.calls:
+                logger.info(status="usage", url=url, message=usage.summary())
+    observe_summary_duration("confluence", model_used, time.perf_counter() - started)
+    remember_summary("confluence", url, similarity_key, similarity, confluence_content, result)
 
     return result
 
@@ -1,33 +1,22 @@
 from typing import Optional
-from pydantic import ValidationError
 
-from langchain_core.output_parsers import PydanticOutputParser
-from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.runnables import RunnableConfig
 from langchain_openai import ChatOpenAI
 
 from modules.models import FigmaSummaryResult
+from modules.chain_runner import build_summary_chain, resolve_output_mode, run_summary_chain
 from config.prompts import settings as prompt_settings
 
 
-def build_confluence_chain(llm: ChatOpenAI):
+def build_confluence_chain(llm: ChatOpenAI, output_mode: str = "parser"):
     """
     Build LangChain chain for Confluence content summarization.
     Uses Confluence-specific prompts (without UI filtering).
     """
-    parser = PydanticOutputParser(pydantic_object=FigmaSummaryResult)
-    
     system_prompt = prompt_settings.confluence_system_prompt
     human_template = prompt_settings.confluence_human_template
-    
-    prompt = ChatPromptTemplate.from_messages(
-        [
-            ("system", system_prompt),
-            ("human", human_template),
-        ]
-    )
-    chain = prompt | llm | parser
-    return chain, parser
+
+    return build_summary_chain(llm, system_prompt, human_template, output_mode)
 
 
 def run_confluence_chain(
@@ -35,30 +24,33 @@ def run_confluence_chain(
     content: str,
     llm: ChatOpenAI,
     config: Optional[RunnableConfig] = None,
+    output_mode: Optional[str] = None,
 ) -> FigmaSummaryResult:
     """
     Run the Confluence summarization chain.
-    
+
     Args:
         url: Source Confluence URL
         content: Extracted text content from Confluence
         llm: ChatOpenAI instance
         config: Optional runnable config
-        
+        output_mode: "parser", "json_schema" or "function_calling";
+            defaults to the per-model / global setting
+
     Returns:
         FigmaSummaryResult with title, plan, summary, and qa
     """
-    chain, parser = build_confluence_chain(llm)
-    format_instructions = parser.get_format_instructions()
-    try:
-        result: FigmaSummaryResult = chain.invoke(
-            {
-                "url": url,
-                "content": content,
-                "format_instructions": format_instructions,
-            },
-            config=config or {},
-        )
-    except ValidationError as err:
-        raise RuntimeError(f"LLM 輸出驗證失敗: {err}") from err
-    return result
+    mode = resolve_output_mode(llm, output_mode)
+    chain, format_instructions = build_confluence_chain(llm, mode)
+    return run_summary_chain(
+        "confluence",
+        chain,
+        {
+            "url": url,
+            "content": content,
+            "format_instructions": format_instructions,
+        },
+        mode,
+        config,
+        llm=llm,
+    )
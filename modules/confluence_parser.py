@@ -1,6 +1,10 @@
+import html
 import re
-from typing import Any, Dict
+from typing import Any, Dict, List
 from html.parser import HTMLParser
+from urllib.parse import unquote
+
+from modules.figma_client import FIGMA_FILE_URL_RE
 
 
 class HTMLTextExtractor(HTMLParser):
@@ -106,3 +110,21 @@ def aggregate_confluence_content(page_json: Dict[str, Any]) -> str:
         return "（無法取得文件內容）"
     
     return "\n\n".join(sections)
+
+
+def find_figma_file_keys(page_json: Dict[str, Any]) -> List[str]:
+    """
+    Figma file keys linked or embedded in the page body, in order of appearance.
+
+    Scans the raw storage (or view) markup, so links in anchors, smart links
+    and embed macro parameters are all found. The markup is HTML-unescaped and
+    percent-decoded first: embed macros store their URL as
+    ``https%3A%2F%2Fwww.figma.com%2Ffile%2F...``.
+    """
+    body = page_json.get("body", {})
+    markup = body.get("storage", {}).get("value", "") or body.get("view", {}).get("value", "")
+    keys: List[str] = []
+    for match in FIGMA_FILE_URL_RE.finditer(unquote(html.unescape(markup))):
+        if match.group(1) not in keys:
+            keys.append(match.group(1))
+    return keys
@@ -1,15 +1,32 @@
-from typing import List, Optional
-
-from langchain_openai import ChatOpenAI
+import time
+from typing import Dict, List, Optional, Tuple
 
 from modules.models import FigmaSummaryResult, QAItem
 from modules.figma_client import FigmaMCPClient, extract_file_key
-from modules.figma_parser import find_node_by_names, collapse_text_nodes, aggregate_figma_content
-from modules.llm_chain import run_chain
+from modules.figma_index import FigmaFileIndex, get_file_index
+from modules.figma_incremental import (
+    SummaryRecord,
+    format_changes,
+    get_summary_store,
+    plan_update,
+    summary_fingerprint,
+)
+from modules.figma_parser import join_figma_content
+from modules.similarity_index import remember_summary, similarity_fingerprint, update_from_near_duplicate
 from config.figma import settings as figma_settings
 from config.openai import settings as openai_settings
 from config.prompts import settings as prompt_settings
+from utils.circuit_breaker import CircuitOpenError
+from utils.deadline import check_deadline, llm_request_options
 from utils.log import get_logger
+from utils.metrics import (
+    observe_content_length,
+    observe_dedup_savings,
+    observe_summary_duration,
+    observe_summary_mode,
+    track_stage,
+)
+from utils.usage import collect_usage, estimate_tokens
 
 
 # Initialize logger using factory function
@@ -32,6 +49,77 @@ def format_output(result: FigmaSummaryResult) -> str:
     return "\n".join(lines)
 
 
+def extract_figma_content(
+    index: FigmaFileIndex,
+    url: str,
+    search_activity_node: bool = True,
+) -> Tuple[str, Dict[str, str], List[str], str]:
+    """
+    Pick the summary scope and build the LLM input for an indexed file.
+
+    Returns ``(scope node id, text nodes, extra sections, content)``; the scope
+    is the "活動說明" node when found, otherwise the whole document.
+    """
+    # 嘗試尋找 "活動說明" 節點
+    target_node = None
+    if search_activity_node:
+        target_node = index.find_by_names(prompt_settings.target_node_names)
+
+    if target_node:
+        logger.info(status="info", url=url, message="找到活動說明節點")
+        scope = target_node
+        extra_sections: List[str] = []
+    else:
+        logger.info(status="info", url=url, message="未找到活動說明節點")
+        # 若找不到則使用完整內容
+        scope = index.root
+        extra_sections = index.extra_sections
+
+    # text_nodes 保留每個節點（供增量比對），送給 LLM 的內容則合併重複區塊
+    text_nodes = index.subtree_text_nodes(scope)
+    fragments = list(text_nodes.values())
+    if figma_settings.deduplicate_subtrees:
+        fragments = report_dedup(index, scope, text_nodes, url)
+
+    if target_node:
+        content = "\n".join(fragments) or "（活動說明區塊無文字節點）"
+    else:
+        content = join_figma_content(fragments, extra_sections)
+    return scope, text_nodes, extra_sections, content
+
+
+def report_dedup(index: FigmaFileIndex, scope: str, text_nodes: Dict[str, str], url: str) -> List[str]:
+    """Deduplicated fragments of ``scope``; logs and records the bytes / tokens saved."""
+    fragments, stats = index.deduplicated_text(scope)
+    if not stats.skipped_occurrences:
+        return fragments
+    saved_tokens = estimate_tokens("\n".join(text_nodes.values())) - estimate_tokens("\n".join(fragments))
+    observe_dedup_savings(stats.saved_bytes, saved_tokens)
+    logger.info(
+        status="info",
+        url=url,
+        message=(
+            f"合併 {stats.repeated_blocks} 種重複區塊（略過 {stats.skipped_occurrences} 次重複），"
+            f"節省 {stats.saved_bytes} bytes、約 {saved_tokens} tokens"
+        ),
+    )
+    return fragments
+
+
+def fetch_figma_content(file_key: str, access_token: Optional[str] = None) -> str:
+    """Fetch (or reuse the index of) one Figma file and return its extracted content."""
+    token = access_token or figma_settings.access_token
+    if not token:
+        raise ValueError("Figma金鑰未設定")
+    client = FigmaMCPClient(access_token=token, base_url=figma_settings.base_url)
+    index = get_file_index(client, file_key)
+    check_deadline("figma_extract")
+    with track_stage("figma_extract"):
+        _, _, _, content = extract_figma_content(index, f"figma:{file_key}")
+    observe_content_length("figma_extract", len(content))
+    return content
+
+
 def generate_figma_summary(
     url: str,
     *,
@@ -41,6 +129,7 @@ def generate_figma_summary(
     temperature: float = 0.0,
     search_activity_node: bool = True,
 ) -> FigmaSummaryResult:
+    started = time.perf_counter()
     file_key = extract_file_key(url)
     if not file_key:
         raise ValueError("無法取得有效的Figma文件，請確認檔案連結或權限。")
@@ -51,29 +140,29 @@ def generate_figma_summary(
         raise ValueError("Figma金鑰未設定")
 
     try:
-        client = FigmaMCPClient(access_token=token)
-        figma_json = client.fetch_file(file_key)
+        client = FigmaMCPClient(access_token=token, base_url=figma_settings.base_url)
+        index = get_file_index(client, file_key)
     except Exception as exc:
         logger.error(status="error", url=url, message="無法取得有效的Figma文件，請確認檔案連結或權限。")
         raise RuntimeError(
             "無法取得有效的Figma文件，請確認檔案連結或權限。"
         ) from exc
 
-    # 嘗試尋找 "活動說明" 節點
-    document = figma_json.get("document", {})
-    target_node = None
-    if search_activity_node:
-        target_node = find_node_by_names(document, prompt_settings.target_node_names)
+    check_deadline("figma_extract")
+    with track_stage("figma_extract"):
+        scope, text_nodes, extra_sections, figma_content = extract_figma_content(index, url, search_activity_node)
+    observe_content_length("figma_extract", len(figma_content))
 
-    if target_node:
-        logger.info(status="info", url=url, message="找到活動說明節點")
-        text_fragments: List[str] = []
-        collapse_text_nodes(target_node, text_fragments)
-        figma_content = "\n".join(text_fragments) or "（活動說明區塊無文字節點）"
-    else:
-        logger.info(status="info", url=url, message="未找到活動說明節點")
-        # 若找不到則使用完整內容
-        figma_content = aggregate_figma_content(figma_json)
+    # 與上一次處理的版本比較：文字未變直接沿用，變更少時只做增量更新
+    store = get_summary_store()
+    previous = store.get(file_key) if store else None
+    fingerprint = summary_fingerprint(llm_model, temperature, search_activity_node)
+    mode, reason, diff = plan_update(previous, fingerprint, scope, text_nodes, extra_sections)
+    observe_summary_mode("figma", mode, reason)
+    if mode == "reuse":
+        logger.info(status="info", url=url, message=f"文字內容與版本 {previous.version} 相同，沿用既有摘要")
+        observe_summary_duration("figma", "reused", time.perf_counter() - started)
+        return FigmaSummaryResult.model_validate(previous.result)
 
     # 使用提供的 API key 或從配置中讀取
     openai_api_key = api_key or openai_settings.api_key
@@ -81,17 +170,88 @@ def generate_figma_summary(
         logger.error(status="error", url=url, message="OpenAI API key 未設定")
         raise ValueError("OpenAI API key 未設定")
     
-    llm = ChatOpenAI(
-        model=llm_model,
-        temperature=temperature,
-        api_key=openai_api_key
-    )
-    try:
-        result = run_chain(url, figma_content, llm)
-        logger.info(status="info", url=url, message="產生摘要與問答成功")
-    except Exception as exc:
-        logger.error(status="error", url=url, message=f"產生摘要與問答失敗: {exc}")
-        raise RuntimeError(f"產生摘要與問答失敗: {exc}") from exc
+    # LLM 相關套件延遲到第一次使用時才載入，縮短冷啟動時間
+    from langchain_openai import ChatOpenAI
+    from modules.llm_chain import run_chain, run_update_chain
+    from modules.model_router import run_with_model_cascade
+
+    def build_llm(model: str) -> ChatOpenAI:
+        return ChatOpenAI(
+            model=model,
+            temperature=temperature,
+            api_key=openai_api_key,
+            base_url=openai_settings.base_url or None,
+            # 可取消的請求以串流呼叫，自訂 base_url 時也要回報 token 用量
+            stream_usage=True,
+            # 每次呼叫的逾時為請求剩餘的期限
+            **llm_request_options("figma_llm"),
+        )
+
+    def summarize(model: str) -> FigmaSummaryResult:
+        return run_chain(url, figma_content, build_llm(model))
+
+    similarity_key = f"figma:{file_key}"
+    similarity = similarity_fingerprint("figma", llm_model, temperature)
+
+    with collect_usage() as usage:
+        try:
+            if mode == "update":
+                changes = format_changes(diff)
+                previous_result = FigmaSummaryResult.model_validate(previous.result)
+                try:
+                    result, model_used = run_with_model_cascade(
+                        "figma_update",
+                        url,
+                        changes,
+                        llm_model,
+                        lambda model: run_update_chain(url, previous_result, changes, build_llm(model)),
+                    )
+                    logger.info(status="info", url=url, message=f"依 {diff.count} 個文字節點變更增量更新摘要")
+                except Exception as exc:
+                    logger.warning(status="warning", url=url, message=f"增量更新失敗，改為重新產生完整摘要: {exc}")
+                    observe_summary_mode("figma", "full", "update_failed")
+                    mode = "full"
+            if mode == "full":
+                # 新檔案常是前一檔活動複製後修改：與相似文件比對，只依差異更新其摘要
+                near_duplicate = update_from_near_duplicate(
+                    "figma", url, similarity_key, similarity, figma_content, llm_model, build_llm
+                )
+                if near_duplicate is not None:
+                    (result, model_used), mode = near_duplicate, "near_duplicate"
+            if mode == "full":
+                result, model_used = run_with_model_cascade("figma", url, figma_content, llm_model, summarize)
+            logger.info(status="info", url=url, message="產生摘要與問答成功")
+        except CircuitOpenError as exc:
+            if previous is None:
+                logger.error(status="error", url=url, message=f"產生摘要與問答失敗: {exc}")
+                raise RuntimeError(f"產生摘要與問答失敗: {exc}") from exc
+            # OpenAI 暫時無法使用：回傳此檔案上一個版本的摘要
+            logger.warning(status="warning", url=url, message=f"{exc}，改用版本 {previous.version} 的既有摘要")
+            observe_summary_mode("figma", "reuse", "circuit_open")
+            return FigmaSummaryResult.model_validate(previous.result)
+        except Exception as exc:
+            logger.error(status="error", url=url, message=f"產生摘要與問答失敗: {exc}")
+            raise RuntimeError(f"產生摘要與問答失敗: {exc}") from exc
+        finally:
+            if usage.calls:
+                logger.info(status="usage", url=url, message=usage.summary())
+    observe_summary_duration("figma", model_used, time.perf_counter() - started)
+
+    if store:
+        record = SummaryRecord(
+            file_key=file_key,
+            version=index.version,
+            fingerprint=fingerprint,
+            scope=scope,
+            text_nodes=text_nodes,
+            extra_sections=extra_sections,
+            result=result.model_dump(),
+        )
+        try:
+            store.save(record)
+        except OSError as exc:
+            logger.warning(status="warning", url=url, message=f"無法保存摘要紀錄: {exc}")
+    remember_summary("figma", url, similarity_key, similarity, figma_content, result)
 
     return result
 
@@ -1,9 +1,16 @@
+import json
 import re
 from dataclasses import dataclass
 from typing import Any, Dict, Optional
 
 import requests
 
+from config.misc import settings as misc_settings
+from utils.cancellation import check_cancelled, read_body
+from utils.circuit_breaker import FIGMA, DependencyStatusError, get_breaker
+from utils.deadline import stage_timeout
+from utils.metrics import observe_payload_bytes, track_stage
+
 
 FIGMA_FILE_URL_RE = re.compile(r"figma\.com/(?:file|design)/([A-Za-z0-9]+)")
 
@@ -13,6 +20,13 @@ def extract_file_key(url: str) -> Optional[str]:
     return match.group(1) if match else None
 
 
+def check_status(response: requests.Response) -> None:
+    if response.status_code != requests.codes.ok:
+        raise DependencyStatusError(
+            f"Figma API 回傳狀態碼 {response.status_code}: {response.text}", response.status_code
+        )
+
+
 @dataclass
 class FigmaMCPClient:
     """Minimal MCP-style client for Figma REST API interactions."""
@@ -32,11 +46,28 @@ class FigmaMCPClient:
             }
         )
 
+    def fetch_file_version(self, file_key: str) -> Optional[str]:
+        """Current version id of the file, fetched without the node tree (depth=1)."""
+        url = f"{self.base_url}/files/{file_key}"
+        check_cancelled("figma_version")
+        with get_breaker(FIGMA).guard(), track_stage("figma_version"):
+            response = self.session.get(
+                url, params={"depth": 1}, timeout=stage_timeout("figma_version", misc_settings.http_timeout_seconds)
+            )
+            check_status(response)
+        version = response.json().get("version")
+        return str(version) if version else None
+
     def fetch_file(self, file_key: str) -> Dict[str, Any]:
         url = f"{self.base_url}/files/{file_key}"
-        response = self.session.get(url, timeout=30)
-        if response.status_code != requests.codes.ok:
-            raise RuntimeError(
-                f"Figma API 回傳狀態碼 {response.status_code}: {response.text}"
+        check_cancelled("figma_download")
+        with get_breaker(FIGMA).guard(), track_stage("figma_download"):
+            # 分段讀取，請求取消時可中斷大型檔案的下載
+            response = self.session.get(
+                url, timeout=stage_timeout("figma_download", misc_settings.http_timeout_seconds), stream=True
             )
-        return response.json()
+            check_status(response)
+            body = read_body(response, "figma_download")
+        observe_payload_bytes("figma_download", len(body))
+        with track_stage("figma_decode"):
+            return json.loads(body)
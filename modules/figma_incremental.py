@@ -0,0 +1,135 @@
+import hashlib
+import os
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from config.figma import settings as figma_settings
+from config.prompts import settings as prompt_settings
+from utils.storage import read_json, write_json_atomic
+
+
+RECORD_FORMAT = 1
+
+# 單次增量更新最多列出的變更字元數，避免變更描述本身比完整內容還長
+MAX_CHANGE_TEXT = 200
+
+
+@dataclass
+class SummaryRecord:
+    """Text nodes and summary of the last processed version of a file."""
+
+    file_key: str
+    version: Optional[str]
+    # 產生摘要時的設定指紋（模型、prompt、搜尋範圍），不同時不沿用
+    fingerprint: str
+    # 摘要範圍的根節點：活動說明節點或整份文件
+    scope: str
+    text_nodes: Dict[str, str]
+    extra_sections: List[str]
+    result: Dict[str, Any]
+
+
+class TextDiff(NamedTuple):
+    added: Dict[str, str]
+    removed: Dict[str, str]
+    changed: Dict[str, Tuple[str, str]]
+
+    @property
+    def count(self) -> int:
+        return len(self.added) + len(self.removed) + len(self.changed)
+
+
+def diff_text_nodes(old: Dict[str, str], new: Dict[str, str]) -> TextDiff:
+    """Node-level diff of two ``node id -> text`` maps."""
+    added = {node_id: text for node_id, text in new.items() if node_id not in old}
+    removed = {node_id: text for node_id, text in old.items() if node_id not in new}
+    changed = {
+        node_id: (old[node_id], text)
+        for node_id, text in new.items()
+        if node_id in old and old[node_id] != text
+    }
+    return TextDiff(added, removed, changed)
+
+
+def _clip(text: str) -> str:
+    return text if len(text) <= MAX_CHANGE_TEXT else text[:MAX_CHANGE_TEXT] + "…"
+
+
+def format_changes(diff: TextDiff) -> str:
+    """Human-readable change list for the update prompt."""
+    lines = [f"[新增] {_clip(text)}" for text in diff.added.values()]
+    lines.extend(f"[刪除] {_clip(text)}" for text in diff.removed.values())
+    lines.extend(f"[修改] 原: {_clip(before)} → 新: {_clip(after)}" for before, after in diff.changed.values())
+    return "\n".join(lines)
+
+
+def summary_fingerprint(llm_model: str, temperature: float, search_activity_node: bool) -> str:
+    """Settings that must match for a previous summary to be reused or updated."""
+    parts = [
+        llm_model,
+        repr(temperature),
+        repr(search_activity_node),
+        prompt_settings.figma_system_prompt,
+        prompt_settings.figma_human_template,
+        repr(prompt_settings.target_node_names),
+    ]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def plan_update(
+    record: Optional[SummaryRecord],
+    fingerprint: str,
+    scope: str,
+    text_nodes: Dict[str, str],
+    extra_sections: List[str],
+) -> Tuple[str, str, Optional[TextDiff]]:
+    """
+    Decide how to summarize the new version: ``(mode, reason, diff)``.
+
+    ``reuse`` when the text is unchanged, ``update`` when the diff is within
+    ``FIGMA_INCREMENTAL_MAX_CHANGE_RATIO`` / ``FIGMA_INCREMENTAL_MAX_CHANGED_NODES``,
+    otherwise ``full``.
+    """
+    if record is None:
+        return "full", "no_previous", None
+    if record.fingerprint != fingerprint:
+        return "full", "settings_changed", None
+    if record.scope != scope or record.extra_sections != extra_sections:
+        return "full", "scope_changed", None
+    diff = diff_text_nodes(record.text_nodes, text_nodes)
+    if diff.count == 0:
+        return "reuse", "unchanged", diff
+    base = max(len(record.text_nodes), len(text_nodes), 1)
+    if diff.count > figma_settings.incremental_max_changed_nodes:
+        return "full", "large_diff", diff
+    if diff.count / base > figma_settings.incremental_max_change_ratio:
+        return "full", "large_diff", diff
+    return "update", "small_diff", diff
+
+
+class SummaryStore:
+    """Last processed ``SummaryRecord`` per file key, one JSON file each."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _path(self, file_key: str) -> str:
+        return os.path.join(self.directory, f"{file_key}.json")
+
+    def get(self, file_key: str) -> Optional[SummaryRecord]:
+        data = read_json(self._path(file_key))
+        if not isinstance(data, dict) or data.pop("format", None) != RECORD_FORMAT:
+            return None
+        try:
+            return SummaryRecord(**data)
+        except TypeError:
+            return None
+
+    def save(self, record: SummaryRecord) -> None:
+        write_json_atomic(self._path(record.file_key), dict(asdict(record), format=RECORD_FORMAT))
+
+
+def get_summary_store() -> Optional[SummaryStore]:
+    if not figma_settings.incremental_summary or not figma_settings.summary_dir:
+        return None
+    return SummaryStore(figma_settings.summary_dir)
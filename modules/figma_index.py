@@ -0,0 +1,557 @@
+import gc
+import hashlib
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from itertools import repeat
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from modules.figma_parser import format_component_sections, join_figma_content
+from config.figma import settings as figma_settings
+from utils.circuit_breaker import CircuitOpenError
+from utils.log import get_logger
+from utils.metrics import observe_cache_lookup, track_stage
+from utils.storage import read_json, write_json_atomic
+
+
+logger = get_logger("figma_index")
+
+INDEX_FORMAT = 3
+
+# 「哪個 frame 含有這段文字」時視為 frame 的節點類型
+FRAME_TYPES = {"FRAME", "COMPONENT", "COMPONENT_SET", "INSTANCE", "SECTION"}
+
+# 重複區塊只輸出一次並標示次數；標示本身比區塊文字長時不合併
+REPEATED_TEXT_MARK = "（重複 {count} 次）"
+REPEATED_BLOCK_START = "【以下區塊重複 {count} 次】"
+REPEATED_BLOCK_END = "【區塊結束】"
+
+
+def structure_hash(node_type: str, name: str, text: str, child_hashes: List[str]) -> str:
+    """
+    Hash of a subtree's text-bearing structure.
+
+    Covers node types along the path to every TEXT node plus the TEXT names and
+    content, in order; subtrees without text are left out, so decorative
+    layers do not break the match. Equal hashes mean equal extracted text.
+    """
+    parts = [node_type, name, text] if node_type == "TEXT" else [node_type]
+    parts.extend(child_hashes)
+    return hashlib.sha1("\x1f".join(parts).encode("utf-8")).hexdigest()[:20]
+
+
+class DedupStats(NamedTuple):
+    """Effect of collapsing repeated subtrees on one extraction."""
+
+    repeated_blocks: int
+    skipped_occurrences: int
+    saved_bytes: int
+    saved_chars: int
+
+
+class IndexedNode(NamedTuple):
+    name: str
+    type: str
+    parent: Optional[str]
+    page: Optional[str]
+    # 前序走訪位置；子樹為 [start, end)
+    start: int
+    end: int
+
+
+class FigmaFileIndex:
+    """
+    Flat lookup tables for one version of a Figma file.
+
+    Built with a single walk over the document tree; name lookups, ancestor
+    chains and subtree text then no longer rescan the JSON. Subtree text comes
+    from the pre-order ranges: the TEXT nodes of a subtree are a contiguous
+    slice of ``text_positions``.
+    """
+
+    def __init__(
+        self,
+        file_key: str,
+        version: Optional[str],
+        root: str,
+        nodes: Dict[str, IndexedNode],
+        texts: Dict[str, str],
+        extra_sections: List[str],
+        hashes: Optional[Dict[str, str]] = None,
+    ):
+        self.file_key = file_key
+        self.version = version
+        self.root = root
+        self.nodes = nodes
+        self.texts = texts
+        self.extra_sections = extra_sections
+        # 只有子樹含文字的節點才有結構雜湊
+        self.hashes = hashes or {}
+        self._order: Optional[List[str]] = None
+        # 名稱與文字位置表在第一次使用時才建立，建索引與載入時不付這筆成本
+        self._names: Optional[Dict[str, List[str]]] = None
+        self._text_ids: Optional[List[str]] = None
+        self._text_positions: Optional[List[int]] = None
+
+    @classmethod
+    def build(cls, file_key: str, figma_json: Dict[str, Any]) -> "FigmaFileIndex":
+        document = figma_json.get("document", {}) or {}
+        nodes: Dict[str, Optional[IndexedNode]] = {}
+        texts: Dict[str, str] = {}
+        hashes: Dict[str, str] = {}
+        root = str(document.get("id") or "_0")
+        position = 0
+        # 等同 IndexedNode(...)，但略過 namedtuple 以 Python 實作的 __new__
+        new_node = tuple.__new__
+
+        def visit(node: Dict[str, Any], parent: Optional[str], page: Optional[str]) -> Optional[str]:
+            # 與 collapse_text_nodes 相同的遞迴走訪；回傳子樹的結構雜湊（無文字時為 None）
+            nonlocal position
+            start = position
+            position += 1
+            node_id = str(node.get("id") or f"_{start}")
+            node_type = node.get("type", "") or ""
+            name = node.get("name", "") or ""
+            if node_type == "CANVAS":
+                page = node_id
+            text_content = ""
+            if node_type == "TEXT":
+                text_content = (node.get("characters", "") or "").strip()
+                if text_content:
+                    texts[node_id] = text_content
+            # 先佔位，nodes 維持前序順序
+            nodes[node_id] = None
+            children_hashes = []
+            for child in node.get("children") or ():
+                child_hash = visit(child, node_id, page)
+                if child_hash is not None:
+                    children_hashes.append(child_hash)
+            nodes[node_id] = new_node(IndexedNode, (name, node_type, parent, page, start, position))
+            if not children_hashes and not text_content:
+                return None
+            node_hash = hashes[node_id] = structure_hash(node_type, name, text_content, children_hashes)
+            return node_hash
+
+        with _gc_paused():
+            visit(document, None, None)
+        extra_sections = format_component_sections(
+            figma_json.get("components", {}), figma_json.get("styles", {})
+        )
+        version = figma_json.get("version") or figma_json.get("lastModified")
+        return cls(file_key, str(version) if version else None, root, nodes, texts, extra_sections, hashes)
+
+    @property
+    def names(self) -> Dict[str, List[str]]:
+        """Node name -> node ids in document order."""
+        if self._names is None:
+            names: Dict[str, List[str]] = {}
+            for node_id, node in self.nodes.items():
+                names.setdefault(node.name, []).append(node_id)
+            self._names = names
+        return self._names
+
+    @property
+    def text_ids(self) -> List[str]:
+        """TEXT node ids in document order (texts are inserted in pre-order)."""
+        if self._text_ids is None:
+            self._text_ids = list(self.texts)
+        return self._text_ids
+
+    @property
+    def text_positions(self) -> List[int]:
+        if self._text_positions is None:
+            self._text_positions = [self.nodes[node_id].start for node_id in self.text_ids]
+        return self._text_positions
+
+    # --- lookups ---
+
+    def find_by_names(self, names: List[str]) -> Optional[str]:
+        """First node in document order whose name is in ``names`` (same as ``find_node_by_names``)."""
+        if self._names is not None:
+            candidates = [self._names[name][0] for name in names if name in self._names]
+            return min(candidates, key=lambda node_id: self.nodes[node_id].start) if candidates else None
+        # 通常每個索引只查一次，掃描到第一個符合的節點即可，不必建立整張名稱表
+        wanted = set(names)
+        return next((node_id for node_id, node in self.nodes.items() if node.name in wanted), None)
+
+    def ancestors(self, node_id: str) -> List[str]:
+        """Parent chain from the direct parent up to the document root."""
+        chain = []
+        parent = self.nodes[node_id].parent
+        while parent is not None:
+            chain.append(parent)
+            parent = self.nodes[parent].parent
+        return chain
+
+    def subtree_text_nodes(self, node_id: str) -> Dict[str, str]:
+        """TEXT node id -> fragment below ``node_id``, in document order."""
+        node = self.nodes[node_id]
+        low = bisect_left(self.text_positions, node.start)
+        high = bisect_left(self.text_positions, node.end)
+        return {text_id: self._fragment(text_id) for text_id in self.text_ids[low:high]}
+
+    @property
+    def order(self) -> List[str]:
+        """Node ids by pre-order position."""
+        if self._order is None:
+            self._order = list(self.nodes)
+        return self._order
+
+    def deduplicated_text(self, node_id: str) -> Tuple[List[str], DedupStats]:
+        """
+        Subtree text with repeated subtrees emitted once and marked with their count.
+
+        Subtrees with the same ``structure_hash`` (component instances, repeated
+        cards, legal footers) produce the same text; the first occurrence is
+        emitted, later ones are skipped without walking them. The text of each
+        collapsed subtree is memoized by hash across files.
+        """
+        scope = self.nodes[node_id]
+        order = self.order
+        counts = Counter(self.hashes.get(order[pos]) for pos in range(scope.start + 1, scope.end))
+        entries: List[List[Any]] = []
+        first_seen: Dict[str, List[Any]] = {}
+        position = scope.start
+        while position < scope.end:
+            current = order[position]
+            node = self.nodes[current]
+            node_hash = self.hashes.get(current)
+            if node_hash is None:
+                # 子樹沒有任何文字
+                position = node.end
+                continue
+            if position != scope.start and counts[node_hash] > 1:
+                entry = first_seen.get(node_hash)
+                if entry is not None:
+                    entry[2] += 1
+                    position = node.end
+                    continue
+                fragments = cached_subtree_fragments(node_hash, lambda: self.subtree_text(current))
+                if _worth_collapsing(node.type, fragments):
+                    entry = [node.type, fragments, 1]
+                    first_seen[node_hash] = entry
+                    entries.append(entry)
+                    position = node.end
+                    continue
+            if current in self.texts:
+                entries.append([node.type, [self._fragment(current)], 1])
+            position += 1
+
+        output: List[str] = []
+        skipped = 0
+        saved_chars = saved_bytes = 0
+        for node_type, fragments, count in entries:
+            if count == 1:
+                output.extend(fragments)
+                continue
+            skipped += count - 1
+            if node_type == "TEXT":
+                marked = [fragments[0] + REPEATED_TEXT_MARK.format(count=count)]
+            else:
+                marked = [REPEATED_BLOCK_START.format(count=count), *fragments, REPEATED_BLOCK_END]
+            output.extend(marked)
+            original = "\n".join(fragments)
+            repeated = "\n".join([original] * count)
+            saved_chars += len(repeated) - len("\n".join(marked))
+            saved_bytes += len(repeated.encode("utf-8")) - len("\n".join(marked).encode("utf-8"))
+        repeated_blocks = sum(1 for entry in entries if entry[2] > 1)
+        return output, DedupStats(repeated_blocks, skipped, saved_bytes, saved_chars)
+
+    def _fragment(self, text_id: str) -> str:
+        name = self.nodes[text_id].name
+        return f"{name}: {self.texts[text_id]}" if name else self.texts[text_id]
+
+    def subtree_text(self, node_id: str) -> List[str]:
+        """TEXT content below ``node_id``, formatted like ``collapse_text_nodes``."""
+        return list(self.subtree_text_nodes(node_id).values())
+
+    def content(self) -> str:
+        """Whole-file content, identical to ``aggregate_figma_content``."""
+        return join_figma_content(self.subtree_text(self.root), self.extra_sections)
+
+    def containing_frame(self, node_id: str) -> Optional[str]:
+        """Nearest ancestor that is a frame-like container."""
+        for ancestor in self.ancestors(node_id):
+            if self.nodes[ancestor].type in FRAME_TYPES:
+                return ancestor
+        return None
+
+    def find_text(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """TEXT nodes containing ``query`` with their frame, top-level frame and page."""
+        matches = []
+        for text_id in self.text_ids:
+            if query not in self.texts[text_id]:
+                continue
+            frame = self.containing_frame(text_id)
+            chain = self.ancestors(text_id)
+            page = self.nodes[text_id].page
+            top_frame = next(
+                (ancestor for ancestor in chain if self.nodes[ancestor].parent == page), None
+            )
+            matches.append(
+                {
+                    "node": self.describe(text_id),
+                    "text": self.texts[text_id],
+                    "frame": self.describe(frame) if frame else None,
+                    "top_frame": self.describe(top_frame) if top_frame else None,
+                }
+            )
+            if len(matches) >= limit:
+                break
+        return matches
+
+    def describe(self, node_id: str) -> Dict[str, Any]:
+        node = self.nodes[node_id]
+        page = self.nodes.get(node.page) if node.page else None
+        return {
+            "id": node_id,
+            "name": node.name,
+            "type": node.type,
+            "page": {"id": node.page, "name": page.name} if page else None,
+            "path": [self.nodes[ancestor].name for ancestor in reversed(self.ancestors(node_id))],
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "file_key": self.file_key,
+            "version": self.version,
+            "node_count": len(self.nodes),
+            "text_count": len(self.texts),
+            "pages": [
+                {"id": node_id, "name": node.name}
+                for node_id, node in self.nodes.items()
+                if node.type == "CANVAS"
+            ],
+        }
+
+    # --- persistence ---
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "format": INDEX_FORMAT,
+            "file_key": self.file_key,
+            "version": self.version,
+            "root": self.root,
+            # 依欄位分開存放，載入時不必逐一解析每個節點的 list
+            "nodes": {
+                "ids": list(self.nodes),
+                **{field: [getattr(node, field) for node in self.nodes.values()] for field in IndexedNode._fields},
+            },
+            "texts": self.texts,
+            "extra_sections": self.extra_sections,
+            "hashes": self.hashes,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "FigmaFileIndex":
+        with _gc_paused():
+            nodes = _nodes_from_columns(data["nodes"])
+        return cls(
+            data["file_key"],
+            data.get("version"),
+            data["root"],
+            nodes,
+            data["texts"],
+            data["extra_sections"],
+            data.get("hashes"),
+        )
+
+
+def _nodes_from_columns(columns: Dict[str, List[Any]]) -> Dict[str, IndexedNode]:
+    rows = zip(*(columns[field] for field in IndexedNode._fields))
+    return dict(zip(columns["ids"], map(tuple.__new__, repeat(IndexedNode), rows)))
+
+
+@contextmanager
+def _gc_paused() -> Iterator[None]:
+    """
+    Pause the cyclic garbage collector while allocating an index.
+
+    Building or loading a large index allocates hundreds of thousands of
+    tuples, which would otherwise trigger repeated full collections that scan
+    the whole (acyclic) Figma document.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _worth_collapsing(node_type: str, fragments: List[str]) -> bool:
+    text_length = len("\n".join(fragments))
+    if node_type == "TEXT":
+        return text_length > len(REPEATED_TEXT_MARK.format(count=9))
+    return text_length > len(REPEATED_BLOCK_START.format(count=9)) + len(REPEATED_BLOCK_END)
+
+
+# 結構雜湊 -> 子樹文字；相同元件常跨檔案出現，行程內共用
+_subtree_cache: "OrderedDict[str, List[str]]" = OrderedDict()
+_subtree_cache_lock = threading.Lock()
+
+
+def cached_subtree_fragments(node_hash: str, compute: Any) -> List[str]:
+    with _subtree_cache_lock:
+        fragments = _subtree_cache.get(node_hash)
+        if fragments is not None:
+            _subtree_cache.move_to_end(node_hash)
+    observe_cache_lookup("figma_subtree", "hit" if fragments is not None else "miss")
+    if fragments is not None:
+        return fragments
+    fragments = compute()
+    with _subtree_cache_lock:
+        _subtree_cache[node_hash] = fragments
+        while len(_subtree_cache) > figma_settings.subtree_cache_size:
+            _subtree_cache.popitem(last=False)
+    return fragments
+
+
+class FigmaIndexStore:
+    """
+    Indexes keyed by file key, one JSON file per key holding the latest version.
+
+    Recently used indexes are also kept in memory, with the time their version
+    was last confirmed against Figma per access token (by hash): a token only
+    gets the cached index without asking Figma once Figma has let it read the
+    file. With an empty ``directory`` the store is memory-only.
+    """
+
+    def __init__(self, directory: str, memory_size: int = 16):
+        self.directory = directory
+        self.memory_size = memory_size
+        self._memory: "OrderedDict[str, FigmaFileIndex]" = OrderedDict()
+        # (file key, token 雜湊) -> 最近一次以該 token 確認為最新版本的時間（monotonic）
+        self._checked_at: Dict[Tuple[str, str], float] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, file_key: str) -> str:
+        return os.path.join(self.directory, f"{file_key}.json")
+
+    def get(self, file_key: str) -> Optional[FigmaFileIndex]:
+        """Latest stored index for ``file_key``, whatever its version."""
+        with self._lock:
+            index = self._memory.get(file_key)
+            if index is not None:
+                self._memory.move_to_end(file_key)
+                return index
+        if not self.directory:
+            return None
+        with _gc_paused():
+            data = read_json(self._path(file_key))
+        if not isinstance(data, dict) or data.get("format") != INDEX_FORMAT:
+            return None
+        index = FigmaFileIndex.from_dict(data)
+        self._remember(index)
+        return index
+
+    def peek(self, file_key: str) -> Optional[FigmaFileIndex]:
+        """In-memory index for ``file_key`` without reading disk or updating recency."""
+        with self._lock:
+            return self._memory.get(file_key)
+
+    def fresh(self, file_key: str, token_key: str, max_age: float) -> Optional[FigmaFileIndex]:
+        """In-memory index confirmed with this token less than ``max_age`` seconds ago."""
+        with self._lock:
+            checked_at = self._checked_at.get((file_key, token_key))
+            if checked_at is None or time.monotonic() - checked_at >= max_age:
+                return None
+            self._memory.move_to_end(file_key)
+            return self._memory[file_key]
+
+    def confirmed_for(self, file_key: str, token_key: str) -> bool:
+        """Whether Figma has let this token read the file since the index was kept in memory."""
+        with self._lock:
+            return (file_key, token_key) in self._checked_at
+
+    def confirm(self, file_key: str, token_key: str) -> None:
+        """Record that the in-memory index is the current version and readable with this token."""
+        with self._lock:
+            if file_key in self._memory:
+                self._checked_at[(file_key, token_key)] = time.monotonic()
+
+    def load(self, file_key: str, version: str) -> Optional[FigmaFileIndex]:
+        """Stored index for exactly ``version``, or None."""
+        index = self.get(file_key)
+        return index if index is not None and index.version == version else None
+
+    def save(self, index: FigmaFileIndex) -> None:
+        self._remember(index)
+        if not self.directory or not index.version:
+            return
+        write_json_atomic(self._path(index.file_key), index.to_dict())
+
+    def _remember(self, index: FigmaFileIndex) -> None:
+        with self._lock:
+            self._memory[index.file_key] = index
+            self._memory.move_to_end(index.file_key)
+            while len(self._memory) > self.memory_size:
+                evicted, _ = self._memory.popitem(last=False)
+                for key in [key for key in self._checked_at if key[0] == evicted]:
+                    del self._checked_at[key]
+
+
+_store: Optional[FigmaIndexStore] = None
+_store_lock = threading.Lock()
+
+
+def get_index_store() -> FigmaIndexStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = FigmaIndexStore(figma_settings.index_dir)
+        return _store
+
+
+def token_key(client: Any) -> str:
+    """Hash of the client's Figma token, so cached access is never shared across tokens."""
+    token = getattr(client, "access_token", "") or ""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()[:32]
+
+
+def get_file_index(client: Any, file_key: str) -> FigmaFileIndex:
+    """
+    Index for the current version of ``file_key``.
+
+    An index confirmed with the client's token within
+    ``FIGMA_INDEX_FRESH_SECONDS`` is used as is. Otherwise Figma is asked for
+    the file version first (a ``depth=1`` request, which also checks the
+    token's access); when an index for that version is stored, the full file
+    is not downloaded. While the Figma circuit breaker is open, the latest
+    stored index is returned to tokens Figma already let read the file, even
+    if the file may have changed since.
+    """
+    store = get_index_store()
+    access = token_key(client)
+    if figma_settings.index_fresh_seconds > 0:
+        index = store.fresh(file_key, access, figma_settings.index_fresh_seconds)
+        if index is not None:
+            observe_cache_lookup("figma_index", "fresh")
+            return index
+    try:
+        version = client.fetch_file_version(file_key)
+    except CircuitOpenError as exc:
+        # 無法向 Figma 確認權限時，只提供給曾成功讀取此檔案的 token
+        stale = store.get(file_key) if store.confirmed_for(file_key, access) else None
+        if stale is None:
+            raise
+        observe_cache_lookup("figma_index", "stale")
+        logger.warning(
+            status="warning",
+            url=f"figma:{file_key}",
+            message=f"{exc}，改用已保存的版本 {stale.version} 索引",
+        )
+        return stale
+    index = store.load(file_key, version) if version else None
+    observe_cache_lookup("figma_index", "hit" if index is not None else "miss")
+    if index is None:
+        figma_json = client.fetch_file(file_key)
+        with track_stage("figma_index_build"):
+            index = FigmaFileIndex.build(file_key, figma_json)
+        store.save(index)
+    store.confirm(file_key, access)
+    return index
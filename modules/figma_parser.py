@@ -28,13 +28,8 @@ def find_node_by_names(node: Dict[str, Any], names: List[str]) -> Optional[Dict[
     return None
 
 
-def aggregate_figma_content(figma_json: Dict[str, Any]) -> str:
-    document = figma_json.get("document", {})
-    components = figma_json.get("components", {})
-    styles = figma_json.get("styles", {})
-    text_fragments: List[str] = []
-    collapse_text_nodes(document, text_fragments)
-
+def format_component_sections(components: Dict[str, Any], styles: Dict[str, Any]) -> List[str]:
+    """Component and style listing appended after the document text."""
     component_info = "\n".join(
         f"元件 {k}: {v.get('name', '')}"
         for k, v in components.items()
@@ -46,12 +41,28 @@ def aggregate_figma_content(figma_json: Dict[str, Any]) -> str:
         if isinstance(v, dict)
     )
 
-    sections = [
-        "=== Document Text ===",
-        "\n".join(text_fragments) or "（無文字節點）",
-    ]
+    sections: List[str] = []
     if component_info:
         sections.extend(["=== Components ===", component_info])
     if style_info:
         sections.extend(["=== Styles ===", style_info])
+    return sections
+
+
+def join_figma_content(text_fragments: List[str], extra_sections: List[str]) -> str:
+    sections = [
+        "=== Document Text ===",
+        "\n".join(text_fragments) or "（無文字節點）",
+    ]
+    sections.extend(extra_sections)
     return "\n".join(sections)
+
+
+def aggregate_figma_content(figma_json: Dict[str, Any]) -> str:
+    document = figma_json.get("document", {})
+    text_fragments: List[str] = []
+    collapse_text_nodes(document, text_fragments)
+    extra_sections = format_component_sections(
+        figma_json.get("components", {}), figma_json.get("styles", {})
+    )
+    return join_figma_content(text_fragments, extra_sections)
@@ -0,0 +1,193 @@
+import contextvars
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, TimeoutError as FutureTimeoutError, wait
+from typing import Callable, Deque, Dict, List, Optional, TypeVar
+
+from config.openai import settings as openai_settings
+from config.misc import settings as misc_settings
+from utils.cancellation import CancelToken, cancellation_scope, check_cancelled, current_token
+from utils.deadline import remaining_seconds
+from utils.log import get_logger
+from utils.metrics import observe_hedge, observe_hedge_latency
+
+
+logger = get_logger("hedging")
+
+T = TypeVar("T")
+
+LATENCY_WINDOW = 200
+
+
+class LatencyWindow:
+    """Recent LLM call durations per key (stage and model), for percentile-based hedge delays."""
+
+    def __init__(self, size: int = LATENCY_WINDOW):
+        self.size = size
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, key: str, seconds: float) -> None:
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=self.size)).append(seconds)
+
+    def percentile(self, key: str, pct: float, min_samples: int) -> Optional[float]:
+        """Nearest-rank percentile, or None with fewer than ``min_samples`` samples."""
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if not samples or len(samples) < min_samples:
+            return None
+        index = min(len(samples) - 1, max(0, math.ceil(pct / 100 * len(samples)) - 1))
+        return samples[index]
+
+
+class HedgeBudget:
+    """At most ``per_minute`` hedges in any sliding 60 second window."""
+
+    def __init__(self, per_minute: int):
+        self.per_minute = per_minute
+        self._issued: Deque[float] = deque()
+        self._lock = threading.Lock()
+
+    def try_acquire(self, now: Optional[float] = None) -> bool:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            while self._issued and now - self._issued[0] >= 60:
+                self._issued.popleft()
+            if len(self._issued) >= self.per_minute:
+                return False
+            self._issued.append(now)
+            return True
+
+
+class _Attempt:
+    """One LLM call on its own daemon thread, cancellable without cancelling the request."""
+
+    def __init__(self, attempt: Callable[[], T], key: str, window: LatencyWindow):
+        self.token = CancelToken(parent=current_token())
+        self.future: "Future[T]" = Future()
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+        context = contextvars.copy_context()
+
+        def run() -> None:
+            try:
+                result = context.run(self._run_in_scope, attempt)
+            except BaseException as exc:
+                self._finish(key, window)
+                self.future.set_exception(exc)
+            else:
+                self._finish(key, window)
+                self.future.set_result(result)
+
+        # daemon：被取消但仍卡在等待回應的呼叫不會阻擋程序結束
+        threading.Thread(target=run, name="llm-hedge", daemon=True).start()
+
+    def _run_in_scope(self, attempt: Callable[[], T]) -> T:
+        with cancellation_scope(self.token):
+            return attempt()
+
+    def _finish(self, key: str, window: LatencyWindow) -> None:
+        self.finished = time.perf_counter()
+        if not self.token.cancelled:
+            window.add(key, self.finished - self.started)
+
+
+_window = LatencyWindow()
+_budget: Optional[HedgeBudget] = None
+_budget_lock = threading.Lock()
+
+
+def get_hedge_budget() -> HedgeBudget:
+    global _budget
+    with _budget_lock:
+        if _budget is None or _budget.per_minute != openai_settings.hedge_max_per_minute:
+            _budget = HedgeBudget(openai_settings.hedge_max_per_minute)
+        return _budget
+
+
+def hedge_delay(key: str, window: Optional[LatencyWindow] = None) -> float:
+    """
+    Seconds to wait for the first call before hedging.
+
+    The ``OPENAI_HEDGE_PERCENTILE`` of recent calls for ``key``, or
+    ``OPENAI_HEDGE_DEFAULT_DELAY_SECONDS`` until enough calls were seen; never
+    below ``OPENAI_HEDGE_MIN_DELAY_SECONDS``.
+    """
+    observed = (window or _window).percentile(
+        key, openai_settings.hedge_percentile, openai_settings.hedge_min_samples
+    )
+    delay = openai_settings.hedge_default_delay_seconds if observed is None else observed
+    return max(delay, openai_settings.hedge_min_delay_seconds)
+
+
+def run_hedged(
+    stage: str,
+    key: str,
+    attempt: Callable[[], T],
+    window: Optional[LatencyWindow] = None,
+    budget: Optional[HedgeBudget] = None,
+) -> T:
+    """
+    Run ``attempt()``; if it is still running after ``hedge_delay``, start an identical second one.
+
+    The first attempt to return a result wins and the other is cancelled (a
+    streamed LLM response is closed at its next chunk). Errors only count once
+    both attempts failed; the first attempt's error is raised then. Hedges
+    are limited by the per-minute budget.
+    """
+    window = window or _window
+    budget = budget or get_hedge_budget()
+    observe_hedge(stage, "call")
+    started = time.perf_counter()
+    primary = _Attempt(attempt, key, window)
+    primary.future.add_done_callback(
+        lambda _: observe_hedge_latency(stage, "primary", (primary.finished or time.perf_counter()) - started)
+    )
+    try:
+        result = primary.future.result(timeout=hedge_delay(key, window))
+    except FutureTimeoutError:
+        pass
+    else:
+        observe_hedge_latency(stage, "effective", time.perf_counter() - started)
+        return result
+
+    # 請求已取消時不再送出第二個呼叫
+    check_cancelled(f"{stage}_llm")
+    remaining = remaining_seconds()
+    # 剩餘期限已不足以完成第二個呼叫時只等第一個（其逾時即為期限）
+    if remaining is not None and remaining < misc_settings.deadline_min_llm_seconds:
+        skipped = "deadline"
+    elif not budget.try_acquire():
+        skipped = "budget_exhausted"
+    else:
+        skipped = None
+    if skipped:
+        observe_hedge(stage, skipped)
+        try:
+            return primary.future.result()
+        finally:
+            observe_hedge_latency(stage, "effective", time.perf_counter() - started)
+
+    observe_hedge(stage, "hedged")
+    logger.info(
+        status="info",
+        url="",
+        message=f"{stage} LLM 呼叫超過 {time.perf_counter() - started:.1f} 秒未完成，送出第二個相同請求",
+    )
+    pending: List[_Attempt] = [primary, _Attempt(attempt, key, window)]
+    while pending:
+        done, _ = wait([item.future for item in pending], return_when=FIRST_COMPLETED)
+        for item in [item for item in pending if item.future in done]:
+            pending.remove(item)
+            if item.future.exception() is not None:
+                continue
+            for loser in pending:
+                loser.token.cancel()
+            observe_hedge(stage, "primary_won" if item is primary else "hedge_won")
+            observe_hedge_latency(stage, "effective", time.perf_counter() - started)
+            return item.future.result()
+    observe_hedge_latency(stage, "effective", time.perf_counter() - started)
+    return primary.future.result()
@@ -1,29 +1,19 @@
+import json
 from typing import Optional
-from pydantic import ValidationError
 
-from langchain_core.output_parsers import PydanticOutputParser
-from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.runnables import RunnableConfig
 from langchain_openai import ChatOpenAI
 
 from modules.models import FigmaSummaryResult
+from modules.chain_runner import build_summary_chain, resolve_output_mode, run_summary_chain
 from config.prompts import settings as prompt_settings
 
 
-def build_chain(llm: ChatOpenAI):
-    parser = PydanticOutputParser(pydantic_object=FigmaSummaryResult)
-    
+def build_chain(llm: ChatOpenAI, output_mode: str = "parser"):
     system_prompt = prompt_settings.figma_system_prompt
     human_template = prompt_settings.figma_human_template
-    
-    prompt = ChatPromptTemplate.from_messages(
-        [
-            ("system", system_prompt),
-            ("human", human_template),
-        ]
-    )
-    chain = prompt | llm | parser
-    return chain, parser
+
+    return build_summary_chain(llm, system_prompt, human_template, output_mode)
 
 
 def run_chain(
@@ -31,18 +21,55 @@ def run_chain(
     figma_content: str,
     llm: ChatOpenAI,
     config: Optional[RunnableConfig] = None,
+    output_mode: Optional[str] = None,
+) -> FigmaSummaryResult:
+    mode = resolve_output_mode(llm, output_mode)
+    chain, format_instructions = build_chain(llm, mode)
+    return run_summary_chain(
+        "figma",
+        chain,
+        {
+            "url": url,
+            "figma_content": figma_content,
+            "format_instructions": format_instructions,
+        },
+        mode,
+        config,
+        llm=llm,
+    )
+
+
+def run_update_chain(
+    url: str,
+    previous: FigmaSummaryResult,
+    changes: str,
+    llm: ChatOpenAI,
+    config: Optional[RunnableConfig] = None,
+    output_mode: Optional[str] = None,
+    stage: str = "figma_update",
+    system_prompt: Optional[str] = None,
 ) -> FigmaSummaryResult:
-    chain, parser = build_chain(llm)
-    format_instructions = parser.get_format_instructions()
-    try:
-        result: FigmaSummaryResult = chain.invoke(
-            {
-                "url": url,
-                "figma_content": figma_content,
-                "format_instructions": format_instructions,
-            },
-            config=config or {},
-        )
-    except ValidationError as err:
-        raise RuntimeError(f"LLM 輸出驗證失敗: {err}") from err
-    return result
+    """
+    Update ``previous`` given a description of the changes.
+
+    By default the changes are the text nodes changed since the previous
+    version of the same file; pass ``system_prompt`` for other sources of
+    changes (e.g. differences from a similar document).
+    """
+    mode = resolve_output_mode(llm, output_mode)
+    chain, format_instructions = build_summary_chain(
+        llm, system_prompt or prompt_settings.update_system_prompt, prompt_settings.update_human_template, mode
+    )
+    return run_summary_chain(
+        stage,
+        chain,
+        {
+            "url": url,
+            "previous_summary": json.dumps(previous.model_dump(), ensure_ascii=False),
+            "changes": changes,
+            "format_instructions": format_instructions,
+        },
+        mode,
+        config,
+        llm=llm,
+    )
@@ -0,0 +1,86 @@
+from typing import Callable, List, Optional, Tuple, TypeVar
+
+from modules.chain_runner import OutputValidationError
+from config.misc import settings as misc_settings
+from config.openai import settings as openai_settings
+from utils.cancellation import check_cancelled
+from utils.deadline import check_deadline, remaining_seconds
+from utils.log import get_logger
+from utils.metrics import observe_model_selection
+from utils.usage import estimate_tokens
+
+
+logger = get_logger("model_router")
+
+AUTO_MODEL = "auto"
+
+T = TypeVar("T")
+
+
+def plan_models(content: str, requested_model: Optional[str]) -> List[Tuple[str, str]]:
+    """
+    Ordered ``(model, reason)`` attempts for one document.
+
+    An explicit model is used as-is. With ``auto`` the first tier whose
+    ``max_input_tokens`` fits the content is tried first (reason ``size``),
+    followed by up to ``model_max_escalations`` stronger tiers used only when
+    the output fails validation (reason ``escalation``). When less than
+    ``DEADLINE_SMALL_MODEL_SECONDS`` of the request's deadline is left, only
+    the smallest tier is tried (reason ``deadline``).
+    """
+    if requested_model and requested_model != AUTO_MODEL:
+        return [(requested_model, "requested")]
+
+    tiers = openai_settings.model_tiers
+    if not tiers:
+        raise ValueError("未設定 OPENAI_MODEL_TIERS，無法自動選擇模型")
+    remaining = remaining_seconds()
+    if remaining is not None and remaining < misc_settings.deadline_small_model_seconds:
+        return [(tiers[0]["model"], "deadline")]
+    tokens = estimate_tokens(content)
+    start = len(tiers) - 1
+    for index, tier in enumerate(tiers):
+        limit = tier.get("max_input_tokens")
+        if limit is None or tokens <= limit:
+            start = index
+            break
+    stop = min(len(tiers), start + 1 + max(0, openai_settings.model_max_escalations))
+    return [
+        (tiers[index]["model"], "size" if index == start else "escalation")
+        for index in range(start, stop)
+    ]
+
+
+def run_with_model_cascade(
+    doc_type: str,
+    url: str,
+    content: str,
+    requested_model: Optional[str],
+    attempt: Callable[[str], T],
+) -> Tuple[T, str]:
+    """
+    Call ``attempt(model)`` along the planned models until one passes validation.
+
+    Only ``OutputValidationError`` escalates to the next model; other errors
+    (network, auth) are raised immediately, and no attempt starts once the
+    request is cancelled or too little of its deadline is left. Returns the
+    result and the model that produced it.
+    """
+    plan = plan_models(content, requested_model)
+    for index, (model, reason) in enumerate(plan):
+        # 用戶端已離開時不再送出 LLM 請求，以內容估計省下的輸入 token
+        check_cancelled(f"{doc_type}_llm", estimate_tokens(content))
+        # 剩餘期限不足以完成一次呼叫時直接失敗，不再升級到下一個模型
+        check_deadline(f"{doc_type}_llm", misc_settings.deadline_min_llm_seconds)
+        observe_model_selection(doc_type, model, reason)
+        try:
+            return attempt(model), model
+        except OutputValidationError as exc:
+            if index == len(plan) - 1:
+                raise
+            logger.warning(
+                status="warning",
+                url=url,
+                message=f"{model} 輸出驗證失敗，改用 {plan[index + 1][0]}: {exc}",
+            )
+    raise RuntimeError("沒有可用的模型")
@@ -0,0 +1,142 @@
+import copy
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from langchain_core.messages import BaseMessage
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.utils.json import parse_json_markdown
+from langchain_openai import ChatOpenAI
+
+from modules.models import FigmaSummaryResult
+from config.prompts import settings as prompt_settings
+from utils.cancellation import check_cancelled
+from utils.circuit_breaker import OPENAI, get_breaker
+from utils.deadline import llm_attempt_timeout
+from utils.metrics import observe_llm_usage
+from utils.usage import record_llm_usage
+
+
+BULLET_PREFIX_RE = re.compile(r"^\s*[-*•●▪]+\s*")
+
+# 與 FigmaSummaryResult 欄位限制一致
+LIST_LIMITS = {"plan": 7, "summary": 30, "qa": 20}
+TITLE_MAX_LENGTH = 80
+REPAIRABLE_FIELDS = ("title", "plan", "summary", "qa")
+
+
+def extract_raw_output(message: BaseMessage, output_mode: str) -> Optional[Dict[str, Any]]:
+    """Best-effort JSON object from the model output, or None when it is not parseable."""
+    try:
+        if output_mode == "function_calling":
+            tool_calls = getattr(message, "tool_calls", None) or []
+            data = tool_calls[0]["args"] if tool_calls else None
+        else:
+            data = parse_json_markdown(message.content)
+    except (ValueError, TypeError, KeyError, AttributeError):
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def apply_local_fixes(data: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Apply fixes that cannot change the meaning of the output.
+
+    Strips bullet prefixes and blank items from ``plan``/``summary``, trims
+    over-long lists to the schema maximum and truncates an over-long title.
+    Returns the fixed copy and the names of the fixes applied.
+    """
+    fixed = copy.deepcopy(data)
+    applied: List[str] = []
+
+    for field in ("plan", "summary"):
+        items = fixed.get(field)
+        if not isinstance(items, list):
+            continue
+        cleaned = []
+        for item in items:
+            if not isinstance(item, str):
+                cleaned.append(item)
+                continue
+            stripped = BULLET_PREFIX_RE.sub("", item).strip()
+            if stripped:
+                cleaned.append(stripped)
+        if cleaned != items:
+            fixed[field] = cleaned
+            applied.append(f"{field}_bullets")
+
+    for field, limit in LIST_LIMITS.items():
+        items = fixed.get(field)
+        if isinstance(items, list) and len(items) > limit:
+            fixed[field] = items[:limit]
+            applied.append(f"{field}_truncate")
+
+    title = fixed.get("title")
+    if isinstance(title, str) and len(title.strip()) > TITLE_MAX_LENGTH:
+        fixed["title"] = title.strip()[:TITLE_MAX_LENGTH]
+        applied.append("title_truncate")
+
+    return fixed, applied
+
+
+def failing_fields(error: Exception) -> List[str]:
+    """Top-level field names reported by a pydantic ValidationError."""
+    if not isinstance(error, ValidationError):
+        return []
+    fields = []
+    for detail in error.errors():
+        loc = detail.get("loc") or ()
+        if loc and loc[0] in REPAIRABLE_FIELDS and loc[0] not in fields:
+            fields.append(loc[0])
+    return fields
+
+
+def validate(data: Dict[str, Any]) -> FigmaSummaryResult:
+    return FigmaSummaryResult.model_validate(data)
+
+
+def repair_with_llm(
+    llm: ChatOpenAI,
+    data: Dict[str, Any],
+    error: Exception,
+    stage: str = "summary",
+) -> Dict[str, Any]:
+    """
+    Ask the model to rewrite only the failing fields and merge them back.
+
+    When the failing fields cannot be determined, the whole object is requested.
+    The call goes through the OpenAI circuit breaker and ``invoke_chain`` like
+    the summary call, and its timeout is what is left of the request's deadline.
+    """
+    from modules.chain_runner import invoke_chain
+
+    fields = failing_fields(error) or list(REPAIRABLE_FIELDS)
+    prompt = ChatPromptTemplate.from_messages(
+        [
+            ("system", prompt_settings.repair_system_prompt),
+            ("human", prompt_settings.repair_human_template),
+        ]
+    )
+    check_cancelled(f"{stage}_repair_llm")
+    # 在 LLM 建立後已經過了摘要呼叫的時間，逾時改以目前剩餘的期限計算
+    timeout = llm_attempt_timeout(f"{stage}_repair_llm", getattr(llm, "max_retries", None))
+    bound = llm.bind(timeout=timeout) if timeout is not None else llm
+    inputs = {
+        "fields": ", ".join(fields),
+        "errors": str(error),
+        "current_output": json.dumps(data, ensure_ascii=False),
+    }
+    with get_breaker(OPENAI).guard():
+        message = invoke_chain(f"{stage}_repair", prompt | bound, inputs)
+    usage_metadata = getattr(message, "usage_metadata", None)
+    observe_llm_usage(f"{stage}_repair_llm", usage_metadata)
+    model = getattr(llm, "model_name", None) or (getattr(message, "response_metadata", None) or {}).get("model_name")
+    record_llm_usage(stage, model or "unknown", usage_metadata, purpose="repair")
+    patch = parse_json_markdown(message.content)
+    if not isinstance(patch, dict):
+        raise ValueError("LLM 修正結果不是 JSON 物件")
+    merged = dict(data)
+    merged.update({key: value for key, value in patch.items() if key in fields})
+    return merged
@@ -0,0 +1,278 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from modules.confluence_agent import ConfluencePublisher
+from config.confluence import settings as confluence_settings
+from utils.circuit_breaker import CircuitOpenError
+from utils.log import get_logger
+from utils.metrics import observe_publish
+
+
+logger = get_logger("publish_outbox")
+
+PENDING = "pending"
+PUBLISHING = "publishing"
+PUBLISHED = "published"
+FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    title TEXT NOT NULL,
+    adf TEXT NOT NULL,
+    folder_id TEXT,
+    source_url TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    page_url TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at);
+"""
+
+_PUBLIC_FIELDS = ("id", "status", "title", "source_url", "attempts", "page_url", "error", "created_at", "updated_at")
+
+
+class PublishOutbox:
+    """
+    Durable queue of Confluence pages to create, stored in SQLite.
+
+    Entries move ``pending`` -> ``publishing`` -> ``published`` / ``failed``;
+    a failed attempt goes back to ``pending`` with a later ``next_attempt_at``
+    until the attempt limit is reached. Claiming is a conditional UPDATE, so
+    several processes can drain the same file safely.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+        self.wakeup = threading.Event()
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # autocommit；每個操作使用獨立連線，可在多執行緒間安全使用
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            yield conn
+        finally:
+            conn.close()
+
+    def enqueue(self, title: str, adf_doc: Dict[str, Any], folder_id: Optional[str], source_url: str) -> str:
+        """Store a page to publish and return its ticket id."""
+        ticket = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO outbox (id, status, title, adf, folder_id, source_url, next_attempt_at, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (ticket, PENDING, title, json.dumps(adf_doc, ensure_ascii=False), folder_id, source_url, now, now, now),
+            )
+        observe_publish("enqueued")
+        self.wakeup.set()
+        return ticket
+
+    def get(self, ticket: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM outbox WHERE id = ?", (ticket,)).fetchone()
+        if row is None:
+            return None
+        return {field: row[field] for field in _PUBLIC_FIELDS}
+
+    def claim_due(self, limit: int) -> List[Dict[str, Any]]:
+        """Mark up to ``limit`` due entries as publishing and return them."""
+        now = time.time()
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM outbox WHERE status = ? AND next_attempt_at <= ? ORDER BY created_at LIMIT ?",
+                (PENDING, now, limit),
+            ).fetchall()
+            claimed = []
+            for row in rows:
+                cursor = conn.execute(
+                    "UPDATE outbox SET status = ?, updated_at = ? WHERE id = ? AND status = ?",
+                    (PUBLISHING, now, row["id"], PENDING),
+                )
+                if cursor.rowcount == 1:
+                    entry = dict(row)
+                    entry["adf"] = json.loads(entry["adf"])
+                    claimed.append(entry)
+        return claimed
+
+    def mark_published(self, ticket: str, page_url: str) -> None:
+        self._update(ticket, status=PUBLISHED, page_url=page_url, error=None)
+
+    def mark_failed(self, ticket: str, attempts: int, error: str, retry_in: Optional[float]) -> None:
+        """Record a failed attempt; retry after ``retry_in`` seconds, or give up when None."""
+        if retry_in is None:
+            self._update(ticket, status=FAILED, attempts=attempts, error=error)
+        else:
+            self._update(
+                ticket, status=PENDING, attempts=attempts, error=error, next_attempt_at=time.time() + retry_in
+            )
+
+    def recover(self, stale_after: float = 600.0) -> int:
+        """
+        Return entries stuck in ``publishing`` (e.g. after a crash) to the queue.
+
+        Only entries untouched for ``stale_after`` seconds are reset, so batches
+        still in flight in another process are left alone.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            # 中斷前可能已建立頁面，記下錯誤讓重試時先查詢
+            cursor = conn.execute(
+                "UPDATE outbox SET status = ?, error = ?, updated_at = ? WHERE status = ? AND updated_at < ?",
+                (PENDING, "發佈中斷", now, PUBLISHING, now - stale_after),
+            )
+        return cursor.rowcount
+
+    def _update(self, ticket: str, **fields: Any) -> None:
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE outbox SET {assignments} WHERE id = ?", (*fields.values(), ticket))
+
+
+def retry_delay(attempts: int) -> Optional[float]:
+    """Exponential backoff after ``attempts`` failures, or None once the limit is reached."""
+    if attempts >= confluence_settings.publish_max_attempts:
+        return None
+    return min(confluence_settings.publish_retry_base_seconds * 2 ** (attempts - 1), 300)
+
+
+def publish_batch(outbox: PublishOutbox, entries: List[Dict[str, Any]]) -> None:
+    """
+    Create the pages of one batch with a single ``ConfluencePublisher``.
+
+    Sharing the publisher reuses its HTTP session and the folder check done at
+    construction. Configuration errors (``ValueError``) are not retried.
+
+    Each page is created with its ticket's label. An entry that failed before
+    may have created its page anyway (e.g. the response timed out), so the
+    page is looked up by title before creating it again; Confluence titles are
+    unique per space. A page with that title is only adopted when it carries
+    the ticket's label, otherwise the entry fails with the title collision.
+    """
+    try:
+        publisher = ConfluencePublisher()
+    except Exception as exc:
+        for entry in entries:
+            _record_failure(outbox, entry, exc)
+        return
+
+    for entry in entries:
+        try:
+            page_url = _find_own_page(publisher, entry) if entry["error"] is not None else None
+            if page_url is None:
+                page_url = publisher.create_page(
+                    title=entry["title"],
+                    adf_doc=entry["adf"],
+                    folder_id=entry["folder_id"],
+                    labels=[ticket_label(entry["id"])],
+                )
+        except Exception as exc:
+            _record_failure(outbox, entry, exc)
+            continue
+        outbox.mark_published(entry["id"], page_url)
+        observe_publish("published")
+        logger.info(status="info", url=entry["source_url"], message=f"已發佈到 Confluence: {page_url}")
+
+
+def ticket_label(ticket: str) -> str:
+    """Confluence label marking the page created for ``ticket``."""
+    return f"qa-parser-{ticket}"
+
+
+def _find_own_page(publisher: ConfluencePublisher, entry: Dict[str, Any]) -> Optional[str]:
+    """URL of the page an earlier attempt of ``entry`` created, or None when there is none yet."""
+    page = publisher.find_page(entry["title"])
+    if page is None:
+        return None
+    if ticket_label(entry["id"]) not in page["labels"]:
+        # 同名頁面屬於其他發佈（例如同一文件先前的摘要），不可視為本次發佈成功
+        raise ValueError(f"Confluence 已有同名頁面「{entry['title']}」：{page['url']}")
+    return page["url"]
+
+
+def _record_failure(outbox: PublishOutbox, entry: Dict[str, Any], exc: Exception) -> None:
+    if isinstance(exc, CircuitOpenError):
+        # Confluence 斷路器開啟：未實際送出，不計入嘗試次數，等斷路器可試探時再發佈
+        outbox.mark_failed(entry["id"], entry["attempts"], str(exc), max(exc.retry_after, 1.0))
+        observe_publish("deferred")
+        return
+    attempts = entry["attempts"] + 1
+    retry_in = None if isinstance(exc, ValueError) else retry_delay(attempts)
+    outbox.mark_failed(entry["id"], attempts, str(exc), retry_in)
+    observe_publish("retry" if retry_in is not None else "failed")
+    logger.warning(
+        status="warning",
+        url=entry["source_url"],
+        message=f"Confluence 發佈失敗（第 {attempts} 次）: {exc}"
+        + (f"，{retry_in:.0f} 秒後重試" if retry_in is not None else "，不再重試"),
+    )
+
+
+class OutboxPublisher:
+    """Background thread that drains the outbox in batches."""
+
+    def __init__(self, outbox: PublishOutbox, poll_interval: float = 2.0):
+        self.outbox = outbox
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        recovered = self.outbox.recover()
+        if recovered:
+            logger.info(status="info", url="", message=f"重新排入 {recovered} 筆未完成的發佈")
+        self._thread = threading.Thread(target=self._run, name="publish-outbox", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        self._stop.set()
+        self.outbox.wakeup.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def drain_once(self) -> int:
+        entries = self.outbox.claim_due(confluence_settings.publish_batch_size)
+        if entries:
+            publish_batch(self.outbox, entries)
+        return len(entries)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.outbox.wakeup.clear()
+            try:
+                processed = self.drain_once()
+            except Exception as exc:
+                logger.error(status="error", url="", message=f"發佈佇列處理失敗: {exc}")
+                processed = 0
+            if not processed:
+                self.outbox.wakeup.wait(self.poll_interval)
+
+
+_outbox: Optional[PublishOutbox] = None
+_outbox_lock = threading.Lock()
+
+
+def get_outbox() -> PublishOutbox:
+    global _outbox
+    with _outbox_lock:
+        if _outbox is None:
+            _outbox = PublishOutbox(confluence_settings.outbox_path)
+        return _outbox
@@ -0,0 +1,61 @@
+import hashlib
+import json
+import os
+import re
+import time
+from typing import Any, Dict, Optional
+
+from modules.models import FigmaSummaryResult
+from config.misc import settings as misc_settings
+from utils.storage import read_json, write_json_atomic
+
+
+RESULT_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+
+def result_id_for(result: FigmaSummaryResult, source_url: str, doc_type: str) -> str:
+    """Content address of a result: same summary for the same source gives the same id."""
+    canonical = json.dumps(
+        {"doc_type": doc_type, "source_url": source_url, "result": result.model_dump()},
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
+
+
+class ResultStore:
+    """Completed summaries stored as one JSON file per content-addressed id."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _path(self, result_id: str) -> str:
+        # 以前兩碼分目錄，避免單一目錄檔案過多
+        return os.path.join(self.directory, result_id[:2], f"{result_id}.json")
+
+    def save(self, result: FigmaSummaryResult, source_url: str, doc_type: str) -> str:
+        result_id = result_id_for(result, source_url, doc_type)
+        path = self._path(result_id)
+        if not os.path.exists(path):
+            write_json_atomic(
+                path,
+                {
+                    "id": result_id,
+                    "doc_type": doc_type,
+                    "source_url": source_url,
+                    "created_at": time.time(),
+                    "result": result.model_dump(),
+                },
+            )
+        return result_id
+
+    def get(self, result_id: str) -> Optional[Dict[str, Any]]:
+        if not RESULT_ID_RE.match(result_id):
+            return None
+        data = read_json(self._path(result_id))
+        return data if isinstance(data, dict) else None
+
+
+def get_result_store() -> ResultStore:
+    return ResultStore(misc_settings.results_dir)
@@ -0,0 +1,392 @@
+import difflib
+import hashlib
+import heapq
+import os
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from modules.figma_incremental import TextDiff, format_changes
+from modules.models import FigmaSummaryResult
+from config.misc import settings as misc_settings
+from config.prompts import settings as prompt_settings
+from utils.log import get_logger
+from utils.metrics import observe_cache_lookup, observe_similarity, observe_summary_mode
+from utils.storage import read_json, write_json_atomic
+
+
+logger = get_logger("similarity_index")
+
+
+ENTRY_FORMAT = 1
+
+WHITESPACE_RE = re.compile(r"\s+")
+
+
+def content_sketch(content: str, shingle_size: int, sketch_size: int) -> List[int]:
+    """
+    Bottom-k MinHash sketch of the character shingles of ``content``.
+
+    Character shingles work for Chinese text without a tokenizer; the sketch
+    keeps the ``sketch_size`` smallest 64-bit shingle hashes, sorted.
+    """
+    text = WHITESPACE_RE.sub(" ", content).strip()
+    if len(text) <= shingle_size:
+        shingles = {text}
+    else:
+        shingles = {text[start:start + shingle_size] for start in range(len(text) - shingle_size + 1)}
+    hashes = {
+        int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for shingle in shingles
+    }
+    return sorted(heapq.nsmallest(sketch_size, hashes))
+
+
+def estimate_similarity(first: List[int], second: List[int]) -> float:
+    """Jaccard similarity estimated from two bottom-k sketches."""
+    if not first or not second:
+        return 0.0
+    size = min(len(first), len(second))
+    union = heapq.nsmallest(size, set(first) | set(second))
+    both = set(first) & set(second)
+    return sum(1 for value in union if value in both) / len(union)
+
+
+def diff_lines(old: str, new: str) -> TextDiff:
+    """Line-level diff of two extracted contents, keyed by line number."""
+    old_lines = [line.strip() for line in old.splitlines() if line.strip()]
+    new_lines = [line.strip() for line in new.splitlines() if line.strip()]
+    added: Dict[str, str] = {}
+    removed: Dict[str, str] = {}
+    changed: Dict[str, Any] = {}
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+        if tag == "equal":
+            continue
+        pairs = min(old_end - old_start, new_end - new_start) if tag == "replace" else 0
+        for offset in range(pairs):
+            changed[str(new_start + offset)] = (old_lines[old_start + offset], new_lines[new_start + offset])
+        for position in range(old_start + pairs, old_end):
+            removed[str(position)] = old_lines[position]
+        for position in range(new_start + pairs, new_end):
+            added[str(position)] = new_lines[position]
+    return TextDiff(added, removed, changed)
+
+
+def similarity_fingerprint(doc_type: str, llm_model: str, temperature: float) -> str:
+    """Settings that must match for a summary to seed another document's summary."""
+    if doc_type == "confluence":
+        prompts = [prompt_settings.confluence_system_prompt, prompt_settings.confluence_human_template]
+    else:
+        prompts = [prompt_settings.figma_system_prompt, prompt_settings.figma_human_template]
+    parts = [doc_type, llm_model, repr(temperature), *prompts]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+class NearDuplicate(NamedTuple):
+    key: str
+    source_url: str
+    similarity: float
+    result: Dict[str, Any]
+    changes: str
+    change_count: int
+
+
+class SimilarityIndex:
+    """
+    Sketches of previously summarized documents, one JSON file per document.
+
+    Only the sketches are kept in memory; the stored content and summary of
+    an entry are read from disk when it is the best match. Lookups scan the
+    sketches of the same document type and settings fingerprint.
+
+    The directory is shared by all workers: every ``refresh_seconds`` the
+    sketches are reconciled with it, reading only new or rewritten files.
+    Entries older than ``max_age_seconds`` are ignored and removed, and
+    ``add`` removes the oldest entries beyond ``max_entries``. Documents
+    longer than ``max_content_chars`` keep only their summary (for ``get``),
+    not their content, so they are never matched.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        threshold: float = 0.8,
+        max_changed_lines: int = 60,
+        shingle_size: int = 5,
+        sketch_size: int = 128,
+        max_entries: int = 1000,
+        max_age_seconds: float = 30 * 86400,
+        max_content_chars: int = 200_000,
+        refresh_seconds: float = 60.0,
+    ):
+        self.directory = directory
+        self.threshold = threshold
+        self.max_changed_lines = max_changed_lines
+        self.shingle_size = shingle_size
+        self.sketch_size = sketch_size
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_seconds
+        self.max_content_chars = max_content_chars
+        self.refresh_seconds = refresh_seconds
+        # 檔名 -> 草圖與檔案修改時間
+        self._sketches: Optional[Dict[str, Dict[str, Any]]] = None
+        self._refreshed_at = 0.0
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, self._name(key))
+
+    @staticmethod
+    def _name(key: str) -> str:
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32] + ".json"
+
+    def _expired(self, created_at: float) -> bool:
+        return bool(self.max_age_seconds) and created_at < time.time() - self.max_age_seconds
+
+    def _remove(self, name: str) -> None:
+        try:
+            os.remove(os.path.join(self.directory, name))
+        except OSError:
+            pass
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            if self._sketches is not None and time.monotonic() - self._refreshed_at < self.refresh_seconds:
+                return self._sketches
+            previous = self._sketches or {}
+            sketches: Dict[str, Dict[str, Any]] = {}
+            if os.path.isdir(self.directory):
+                with os.scandir(self.directory) as files:
+                    for file in files:
+                        if not file.name.endswith(".json"):
+                            continue
+                        try:
+                            mtime = file.stat().st_mtime
+                        except OSError:
+                            continue
+                        entry = previous.get(file.name)
+                        if entry is None or entry["mtime"] != mtime:
+                            # 其他 worker 新增或改寫的項目
+                            entry = self._read_sketch(file.path, mtime)
+                        if entry is None:
+                            continue
+                        if self._expired(entry["created_at"]):
+                            self._remove(file.name)
+                            continue
+                        sketches[file.name] = entry
+            self._sketches = sketches
+            self._refreshed_at = time.monotonic()
+            return sketches
+
+    @staticmethod
+    def _read_sketch(path: str, mtime: float) -> Optional[Dict[str, Any]]:
+        data = read_json(path)
+        if not isinstance(data, dict) or data.get("format") != ENTRY_FORMAT:
+            return None
+        return {
+            "key": data["key"],
+            "doc_type": data["doc_type"],
+            "fingerprint": data["fingerprint"],
+            "sketch": data["sketch"],
+            "created_at": data.get("created_at", 0.0),
+            "mtime": mtime,
+        }
+
+    def sketch(self, content: str) -> List[int]:
+        return content_sketch(content, self.shingle_size, self.sketch_size)
+
+    def find(self, doc_type: str, key: str, fingerprint: str, content: str) -> Optional[NearDuplicate]:
+        """
+        Most similar stored document above the threshold with a small enough diff.
+
+        Entries of ``key`` itself are skipped: changes to the same document are
+        handled by its own previous version.
+        """
+        sketch = self.sketch(content)
+        best_key, best_score = None, 0.0
+        for entry in list(self._load().values()):
+            if entry["key"] == key or entry["doc_type"] != doc_type or entry["fingerprint"] != fingerprint:
+                continue
+            if self._expired(entry["created_at"]):
+                continue
+            score = estimate_similarity(sketch, entry["sketch"])
+            if score > best_score:
+                best_key, best_score = entry["key"], score
+        if best_key is not None:
+            observe_similarity(doc_type, best_score)
+        if best_key is None or best_score < self.threshold:
+            observe_cache_lookup(f"similarity_{doc_type}", "miss")
+            return None
+        data = read_json(self._path(best_key))
+        if not isinstance(data, dict) or data.get("content") is None:
+            observe_cache_lookup(f"similarity_{doc_type}", "miss")
+            return None
+        diff = diff_lines(data["content"], content)
+        if diff.count > self.max_changed_lines:
+            observe_cache_lookup(f"similarity_{doc_type}", "too_different")
+            return None
+        observe_cache_lookup(f"similarity_{doc_type}", "hit")
+        return NearDuplicate(best_key, data["source_url"], best_score, data["result"], format_changes(diff), diff.count)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Stored summary result of ``key`` itself, or None."""
+        data = read_json(self._path(key))
+        if not isinstance(data, dict) or data.get("format") != ENTRY_FORMAT or data.get("key") != key:
+            return None
+        if self._expired(data.get("created_at", 0.0)):
+            return None
+        return data["result"]
+
+    def add(
+        self,
+        doc_type: str,
+        key: str,
+        fingerprint: str,
+        source_url: str,
+        content: str,
+        result: Dict[str, Any],
+    ) -> None:
+        # 過長的文件只保存摘要，不參與相似比對
+        keep_content = not self.max_content_chars or len(content) <= self.max_content_chars
+        sketch = self.sketch(content) if keep_content else []
+        created_at = time.time()
+        path = self._path(key)
+        write_json_atomic(
+            path,
+            {
+                "format": ENTRY_FORMAT,
+                "key": key,
+                "doc_type": doc_type,
+                "fingerprint": fingerprint,
+                "source_url": source_url,
+                "sketch": sketch,
+                "content": content if keep_content else None,
+                "result": result,
+                "created_at": created_at,
+            },
+        )
+        sketches = self._load()
+        with self._lock:
+            try:
+                mtime = os.stat(path).st_mtime
+            except OSError:
+                mtime = 0.0
+            sketches[self._name(key)] = {
+                "key": key,
+                "doc_type": doc_type,
+                "fingerprint": fingerprint,
+                "sketch": sketch,
+                "created_at": created_at,
+                "mtime": mtime,
+            }
+            excess = len(sketches) - self.max_entries if self.max_entries else 0
+            if excess > 0:
+                oldest = heapq.nsmallest(excess, sketches, key=lambda name: sketches[name]["created_at"])
+                for name in oldest:
+                    del sketches[name]
+                    self._remove(name)
+
+
+def update_from_near_duplicate(
+    doc_type: str,
+    url: str,
+    key: str,
+    fingerprint: str,
+    content: str,
+    llm_model: str,
+    build_llm: Callable[[str], Any],
+) -> Optional[Tuple[FigmaSummaryResult, str]]:
+    """
+    Summarize ``content`` by updating the summary of a near-duplicate document.
+
+    Returns ``(result, model)``, or None when there is no close enough match or
+    the update fails; the caller then generates a full summary.
+    """
+    index = get_similarity_index()
+    match = index.find(doc_type, key, fingerprint, content) if index else None
+    if match is None:
+        return None
+
+    from modules.llm_chain import run_update_chain
+    from modules.model_router import run_with_model_cascade
+
+    previous = FigmaSummaryResult.model_validate(match.result)
+    try:
+        result, model = run_with_model_cascade(
+            f"{doc_type}_near_duplicate",
+            url,
+            match.changes,
+            llm_model,
+            lambda model: run_update_chain(
+                url,
+                previous,
+                match.changes,
+                build_llm(model),
+                stage=f"{doc_type}_near_duplicate",
+                system_prompt=prompt_settings.near_duplicate_system_prompt,
+            ),
+        )
+    except Exception as exc:
+        logger.warning(status="warning", url=url, message=f"以相似文件更新摘要失敗，改為重新產生完整摘要: {exc}")
+        observe_summary_mode(doc_type, "full", "near_duplicate_failed")
+        return None
+    observe_summary_mode(doc_type, "update", "near_duplicate")
+    logger.info(
+        status="info",
+        url=url,
+        message=(
+            f"與 {match.source_url} 相似度 {match.similarity:.2f}，"
+            f"依 {match.change_count} 行差異更新既有摘要"
+        ),
+    )
+    return result, model
+
+
+def remember_summary(
+    doc_type: str,
+    url: str,
+    key: str,
+    fingerprint: str,
+    content: str,
+    result: FigmaSummaryResult,
+) -> None:
+    """Add a finished summary to the similarity index; storage errors are only logged."""
+    index = get_similarity_index()
+    if index is None:
+        return
+    try:
+        index.add(doc_type, key, fingerprint, url, content, result.model_dump())
+    except OSError as exc:
+        logger.warning(status="warning", url=url, message=f"無法保存相似文件索引: {exc}")
+
+
+def stored_summary(key: str) -> Optional[FigmaSummaryResult]:
+    """Last summary remembered for ``key``, served stale while a dependency is unavailable."""
+    index = get_similarity_index()
+    result = index.get(key) if index else None
+    return FigmaSummaryResult.model_validate(result) if result is not None else None
+
+
+_index: Optional[SimilarityIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_similarity_index() -> Optional[SimilarityIndex]:
+    """Process-wide index, or None when near-duplicate reuse is disabled."""
+    global _index
+    if not misc_settings.similarity_enabled or not misc_settings.similarity_dir:
+        return None
+    with _index_lock:
+        if _index is None:
+            _index = SimilarityIndex(
+                misc_settings.similarity_dir,
+                threshold=misc_settings.similarity_threshold,
+                max_changed_lines=misc_settings.similarity_max_changed_lines,
+                max_entries=misc_settings.similarity_max_entries,
+                max_age_seconds=misc_settings.similarity_max_age_days * 86400,
+                max_content_chars=misc_settings.similarity_max_content_chars,
+                refresh_seconds=misc_settings.similarity_refresh_seconds,
+            )
+        return _index
@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import FileResponse
+from typing import Optional
+
+from utils.profiling import is_admin_token, list_profiles, resolve_profile_path
+from utils.usage import usage_report
+
+router = APIRouter()
+
+
+def require_admin(token: Optional[str]) -> None:
+    if not is_admin_token(token):
+        raise HTTPException(status_code=403, detail="Admin token 無效或未設定")
+
+
+@router.get("/profiles")
+async def list_profiles_endpoint(x_admin_token: Optional[str] = Header(default=None)):
+    """List profiling artifacts written under the log directory."""
+    require_admin(x_admin_token)
+    return {"profiles": list_profiles()}
+
+
+@router.get("/profiles/{filename}")
+async def download_profile_endpoint(filename: str, x_admin_token: Optional[str] = Header(default=None)):
+    """Download a single profiling artifact (.prof for pstats/snakeviz, .txt summary)."""
+    require_admin(x_admin_token)
+    path = resolve_profile_path(filename)
+    if not path:
+        raise HTTPException(status_code=404, detail="找不到指定的 profile")
+    return FileResponse(path, filename=filename)
+
+
+@router.get("/usage")
+async def usage_endpoint(x_admin_token: Optional[str] = Header(default=None)):
+    """Token usage and estimated cost per model and document type since process start."""
+    require_admin(x_admin_token)
+    return usage_report()
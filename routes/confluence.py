@@ -1,6 +1,9 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import Optional
+import math
+
+from fastapi import APIRouter, Header, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
+from typing import Any, Dict, Optional, Tuple
 
 from modules.confluence_doc_agent import (
     generate_confluence_summary,
@@ -9,57 +12,131 @@ from modules.confluence_doc_agent import (
 from modules.confluence_agent import (
     resolve_confluence_title,
     build_confluence_adf,
-    ConfluencePublisher
 )
+from modules.admission import admission, estimate_confluence_cost
+from modules.publish_outbox import get_outbox
+from modules.result_store import get_result_store
 from modules.models import FigmaSummaryResult
+from utils.cancellation import RequestCancelled, run_cancellable
+from utils.circuit_breaker import find_open_circuit
+from utils.deadline import Deadline, deadline_scope, log_budget, request_deadline
+from utils.metrics import observe_deadline_exceeded
+from utils.profiling import maybe_profile
+from utils.usage import collect_usage
 
 router = APIRouter()
 
 
 class ConfluenceParseRequest(BaseModel):
     url: str
+    # "auto" 依內容大小選擇模型，驗證失敗時升級（見 OPENAI_MODEL_TIERS）
     model: str = "gpt-4.1-mini"
     temperature: float = 0.0
     publish_confluence: bool = False
     confluence_title: Optional[str] = None
     confluence_folder_id: Optional[str] = None
+    # 一併擷取頁面中連結的 Figma 檔案，與頁面內容合併成一次摘要
+    include_linked_figma: bool = False
+    # 整體處理期限（秒）；未指定時使用 REQUEST_DEADLINE_SECONDS
+    deadline_seconds: Optional[float] = Field(default=None, gt=0)
 
 
 class ConfluenceParseResponse(BaseModel):
     summary: str
+    # 發佈到 Confluence 已改為非同步，頁面網址請以 publish_ticket 查詢 /publish/{ticket}
     confluence_url: Optional[str] = None
+    publish_ticket: Optional[str] = None
+    # GET /results/{result_id} 可重複取得此結果（json / markdown / adf）
+    result_id: Optional[str] = None
+    # 實際產生結果的模型
+    model: Optional[str] = None
+    # LLM token 用量與估算成本（USD）
+    usage: Optional[Dict[str, Any]] = None
 
 
-@router.post("/parse", response_model=ConfluenceParseResponse)
-async def parse_confluence_endpoint(request: ConfluenceParseRequest):
-    """
-    Parse a Confluence page and generate summary/Q&A.
-    Optionally publish the result back to Confluence.
-    """
+def _summarize(request: ConfluenceParseRequest, x_profile_token: Optional[str], deadline: Optional[Deadline]):
     try:
-        result: FigmaSummaryResult = generate_confluence_summary(
-            request.url,
-            llm_model=request.model,
-            temperature=request.temperature,
-        )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        with deadline_scope(deadline), maybe_profile("confluence_parse", x_profile_token) as profile:
+            with collect_usage() as usage:
+                result = generate_confluence_summary(
+                    request.url,
+                    llm_model=request.model,
+                    temperature=request.temperature,
+                    include_linked_figma=request.include_linked_figma,
+                )
+    finally:
+        # 記錄各階段耗用的期限預算
+        log_budget(deadline, request.url)
+    return result, usage, profile
 
-    output_text = format_output(result)
-    confluence_url = None
 
+def _store_result(request: ConfluenceParseRequest, result) -> Tuple[str, Optional[str]]:
+    """Save the result for ``/results`` and queue the Confluence page; returns (result_id, publish_ticket)."""
+    result_id = get_result_store().save(result, request.url, "confluence")
+    publish_ticket = None
     if request.publish_confluence:
+        # 發佈交給背景 outbox 處理，回應不等待頁面建立；以 /publish/{ticket} 查詢結果
         title = request.confluence_title or resolve_confluence_title(result, request.url)
+        publish_ticket = get_outbox().enqueue(
+            title=title,
+            adf_doc=build_confluence_adf(result, request.url),
+            folder_id=request.confluence_folder_id,
+            source_url=request.url,
+        )
+    return result_id, publish_ticket
+
+
+@router.post("/parse", response_model=ConfluenceParseResponse)
+async def parse_confluence_endpoint(
+    request: ConfluenceParseRequest,
+    response: Response,
+    http_request: Request,
+    x_profile_token: Optional[str] = Header(default=None),
+):
+    """
+    Parse a Confluence page and generate summary/Q&A.
+    Optionally publish the result back to Confluence.
+    Send ``X-Profile-Token`` with the admin token to profile this request.
+    Returns 429 with ``Retry-After`` when the server is at capacity.
+    """
+    # 超過記憶體 / LLM 容量時排隊，佇列已滿或等待逾時回 429
+    # 期限自收到請求起算，排隊時間也計入
+    deadline = request_deadline(request.deadline_seconds)
+    max_wait = deadline.remaining() if deadline else None
+    async with admission("confluence", estimate_confluence_cost(request.include_linked_figma), max_wait=max_wait):
         try:
-            publisher = ConfluencePublisher()
-            confluence_url = publisher.create_page(
-                title=title,
-                adf_doc=build_confluence_adf(result, request.url),
-                folder_id=request.confluence_folder_id
+            # 摘要為同步阻塞工作，移到 threadpool 執行以免阻塞 event loop；
+            # 用戶端中斷連線時取消下載與 LLM 呼叫
+            result, usage, profile = await run_cancellable(
+                http_request, "confluence", _summarize, request, x_profile_token, deadline
             )
+        except RequestCancelled:
+            raise HTTPException(status_code=499, detail="用戶端已中斷連線，已取消處理")
         except Exception as e:
-            # Log error but return summary
-            print(f"Confluence publishing failed: {e}")
-            pass
+            if deadline is not None and deadline.exceeded:
+                stage = deadline.exceeded_stage or "in_flight"
+                observe_deadline_exceeded("confluence", stage)
+                raise HTTPException(
+                    status_code=504, detail=f"超過處理期限 {deadline.seconds:g} 秒，於 {stage} 停止: {e}"
+                )
+            circuit = find_open_circuit(e)
+            if circuit is not None:
+                # 依賴服務的斷路器開啟且沒有既有結果可用
+                raise HTTPException(
+                    status_code=503, detail=str(e), headers={"Retry-After": str(max(1, math.ceil(circuit.retry_after)))}
+                )
+            raise HTTPException(status_code=500, detail=str(e))
+    if profile.profile_id:
+        response.headers["X-Profile-Id"] = profile.profile_id
+
+    output_text = format_output(result)
+    # 結果儲存與 outbox 皆為同步 SQLite / 檔案 I/O，不在 event loop 上執行
+    result_id, publish_ticket = await run_in_threadpool(_store_result, request, result)
 
-    return ConfluenceParseResponse(summary=output_text, confluence_url=confluence_url)
+    return ConfluenceParseResponse(
+        summary=output_text,
+        publish_ticket=publish_ticket,
+        result_id=result_id,
+        model=usage.model,
+        usage=usage.summary(),
+    )
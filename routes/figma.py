@@ -1,65 +1,185 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel, HttpUrl
-from typing import Optional
+import math
+
+from fastapi import APIRouter, Header, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field, HttpUrl
+from typing import Any, Dict, Optional, Tuple
 
 from modules.figma_agent import (
     generate_figma_summary,
     format_output,
-    FigmaSummaryResult
 )
+from modules.figma_client import FigmaMCPClient
+from modules.figma_index import FigmaFileIndex, get_file_index
 from modules.confluence_agent import (
     resolve_confluence_title,
     build_confluence_adf,
-    ConfluencePublisher
 )
+from modules.admission import admission, estimate_figma_cost
+from modules.publish_outbox import get_outbox
+from modules.result_store import get_result_store
+from config.figma import settings as figma_settings
+from utils.cancellation import RequestCancelled, run_cancellable
+from utils.circuit_breaker import find_open_circuit
+from utils.deadline import Deadline, deadline_scope, log_budget, request_deadline
+from utils.metrics import observe_deadline_exceeded
+from utils.profiling import maybe_profile
+from utils.usage import collect_usage
 
 router = APIRouter()
 
 class FigmaParseRequest(BaseModel):
     url: str
     token: Optional[str] = None
+    # "auto" 依內容大小選擇模型，驗證失敗時升級（見 OPENAI_MODEL_TIERS）
     model: str = "gpt-4.1-mini"
     temperature: float = 0.0
     publish_confluence: bool = False
     confluence_title: Optional[str] = None
     confluence_folder_id: Optional[str] = None
     search_activity_node: bool = True
+    # 整體處理期限（秒）；未指定時使用 REQUEST_DEADLINE_SECONDS
+    deadline_seconds: Optional[float] = Field(default=None, gt=0)
 
 class FigmaParseResponse(BaseModel):
     summary: str
+    # 發佈到 Confluence 已改為非同步，頁面網址請以 publish_ticket 查詢 /publish/{ticket}
     confluence_url: Optional[str] = None
+    publish_ticket: Optional[str] = None
+    # GET /results/{result_id} 可重複取得此結果（json / markdown / adf）
+    result_id: Optional[str] = None
+    # 實際產生結果的模型
+    model: Optional[str] = None
+    # LLM token 用量與估算成本（USD）
+    usage: Optional[Dict[str, Any]] = None
 
-@router.post("/parse", response_model=FigmaParseResponse)
-async def parse_figma_endpoint(request: FigmaParseRequest):
+def _summarize(request: FigmaParseRequest, x_profile_token: Optional[str], deadline: Optional[Deadline]):
     try:
-        result: FigmaSummaryResult = generate_figma_summary(
-            request.url,
-            access_token=request.token,
-            llm_model=request.model,
-            temperature=request.temperature,
-            search_activity_node=request.search_activity_node,
-        )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        with deadline_scope(deadline), maybe_profile("figma_parse", x_profile_token) as profile:
+            with collect_usage() as usage:
+                result = generate_figma_summary(
+                    request.url,
+                    access_token=request.token,
+                    llm_model=request.model,
+                    temperature=request.temperature,
+                    search_activity_node=request.search_activity_node,
+                )
+    finally:
+        # 記錄各階段耗用的期限預算
+        log_budget(deadline, request.url)
+    return result, usage, profile
+
 
-    output_text = format_output(result)
-    confluence_url = None
 
+def _store_result(request: FigmaParseRequest, result) -> Tuple[str, Optional[str]]:
+    """Save the result for ``/results`` and queue the Confluence page; returns (result_id, publish_ticket)."""
+    result_id = get_result_store().save(result, request.url, "figma")
+    publish_ticket = None
     if request.publish_confluence:
+        # 發佈交給背景 outbox 處理，回應不等待頁面建立；以 /publish/{ticket} 查詢結果
         title = request.confluence_title or resolve_confluence_title(result, request.url)
+        publish_ticket = get_outbox().enqueue(
+            title=title,
+            adf_doc=build_confluence_adf(result, request.url),
+            folder_id=request.confluence_folder_id,
+            source_url=request.url,
+        )
+    return result_id, publish_ticket
+
+
+@router.post("/parse", response_model=FigmaParseResponse)
+async def parse_figma_endpoint(
+    request: FigmaParseRequest,
+    response: Response,
+    http_request: Request,
+    x_profile_token: Optional[str] = Header(default=None),
+):
+    # 超過記憶體 / LLM 容量時排隊，佇列已滿或等待逾時回 429
+    # 期限自收到請求起算，排隊時間也計入
+    deadline = request_deadline(request.deadline_seconds)
+    max_wait = deadline.remaining() if deadline else None
+    async with admission("figma", estimate_figma_cost(request.url), max_wait=max_wait):
         try:
-            publisher = ConfluencePublisher()
-            confluence_url = publisher.create_page(
-                title=title,
-                adf_doc=build_confluence_adf(result, request.url),
-                folder_id=request.confluence_folder_id
+            # 摘要為同步阻塞工作，移到 threadpool 執行以免阻塞 event loop；
+            # 用戶端中斷連線時取消下載與 LLM 呼叫
+            result, usage, profile = await run_cancellable(
+                http_request, "figma", _summarize, request, x_profile_token, deadline
             )
+        except RequestCancelled:
+            raise HTTPException(status_code=499, detail="用戶端已中斷連線，已取消處理")
         except Exception as e:
-            # Log error but return summary
-            print(f"Confluence publishing failed: {e}")
-            # We could also raise an error or return a warning, but for now let's just return the summary
-            # and maybe include the error in the response if we change the response model.
-            # For now, just leave confluence_url as None or we could append error to summary.
-            pass
-
-    return FigmaParseResponse(summary=output_text, confluence_url=confluence_url)
+            if deadline is not None and deadline.exceeded:
+                stage = deadline.exceeded_stage or "in_flight"
+                observe_deadline_exceeded("figma", stage)
+                raise HTTPException(
+                    status_code=504, detail=f"超過處理期限 {deadline.seconds:g} 秒，於 {stage} 停止: {e}"
+                )
+            circuit = find_open_circuit(e)
+            if circuit is not None:
+                # 依賴服務的斷路器開啟且沒有既有結果可用
+                raise HTTPException(
+                    status_code=503, detail=str(e), headers={"Retry-After": str(max(1, math.ceil(circuit.retry_after)))}
+                )
+            raise HTTPException(status_code=500, detail=str(e))
+    if profile.profile_id:
+        response.headers["X-Profile-Id"] = profile.profile_id
+
+    output_text = format_output(result)
+    # 結果儲存與 outbox 皆為同步 SQLite / 檔案 I/O，不在 event loop 上執行
+    result_id, publish_ticket = await run_in_threadpool(_store_result, request, result)
+
+    return FigmaParseResponse(
+        summary=output_text,
+        publish_ticket=publish_ticket,
+        result_id=result_id,
+        model=usage.model,
+        usage=usage.summary(),
+    )
+
+
+def _load_index(file_key: str, figma_token: Optional[str]) -> FigmaFileIndex:
+    token = figma_token or figma_settings.access_token
+    if not token:
+        raise HTTPException(status_code=400, detail="Figma金鑰未設定")
+    try:
+        client = FigmaMCPClient(access_token=token, base_url=figma_settings.base_url)
+        return get_file_index(client, file_key)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"無法取得Figma文件: {e}")
+
+
+@router.get("/index/{file_key}")
+def figma_index_stats_endpoint(file_key: str, x_figma_token: Optional[str] = Header(default=None)):
+    """Version, node/text counts and pages of the indexed file."""
+    return _load_index(file_key, x_figma_token).stats()
+
+
+@router.get("/index/{file_key}/nodes")
+def figma_index_nodes_endpoint(
+    file_key: str,
+    name: str = Query(..., description="節點名稱（完全相符）"),
+    x_figma_token: Optional[str] = Header(default=None),
+):
+    """Nodes with the given name, in document order."""
+    index = _load_index(file_key, x_figma_token)
+    return {"nodes": [index.describe(node_id) for node_id in index.names.get(name, [])]}
+
+
+@router.get("/index/{file_key}/nodes/{node_id}")
+def figma_index_node_endpoint(file_key: str, node_id: str, x_figma_token: Optional[str] = Header(default=None)):
+    """One node with its parent chain, page and the text of its subtree."""
+    index = _load_index(file_key, x_figma_token)
+    if node_id not in index.nodes:
+        raise HTTPException(status_code=404, detail="找不到指定的節點")
+    return dict(index.describe(node_id), text=index.subtree_text(node_id))
+
+
+@router.get("/index/{file_key}/search")
+def figma_index_search_endpoint(
+    file_key: str,
+    text: str = Query(..., min_length=1, description="要搜尋的文字片段"),
+    limit: int = Query(20, ge=1, le=200),
+    x_figma_token: Optional[str] = Header(default=None),
+):
+    """TEXT nodes containing ``text`` and the frames that contain them."""
+    return {"matches": _load_index(file_key, x_figma_token).find_text(text, limit)}
@@ -0,0 +1,19 @@
+from fastapi import APIRouter, HTTPException
+
+from modules.publish_outbox import get_outbox
+
+router = APIRouter()
+
+
+@router.get("/{ticket}")
+async def publish_status_endpoint(ticket: str):
+    """
+    Status of a queued Confluence publish.
+
+    ``status`` is ``pending`` / ``publishing`` until the page is created
+    (``published`` with ``page_url``) or retries are exhausted (``failed`` with ``error``).
+    """
+    entry = get_outbox().get(ticket)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="找不到指定的發佈工單")
+    return entry
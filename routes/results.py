@@ -0,0 +1,84 @@
+import gzip
+import json
+from functools import lru_cache
+from typing import Literal, Optional, Tuple
+
+from fastapi import APIRouter, Header, HTTPException, Query, Response
+
+from modules.confluence_agent import build_confluence_adf
+from modules.figma_agent import format_output
+from modules.models import FigmaSummaryResult
+from modules.result_store import get_result_store
+from config.misc import settings as misc_settings
+
+router = APIRouter()
+
+# 輸出格式調整時遞增，讓既有的 ETag 失效
+RENDER_VERSION = 1
+GZIP_MIN_BYTES = 1024
+
+MEDIA_TYPES = {
+    "markdown": "text/markdown; charset=utf-8",
+    "adf": "application/json",
+    "json": "application/json",
+}
+
+
+@lru_cache(maxsize=256)
+def render_result(result_id: str, fmt: str) -> Tuple[bytes, bytes]:
+    """
+    Rendered body and its gzip encoding; results are immutable, so both are cached.
+
+    A missing result raises instead of returning, so the 404 is not cached and
+    the id is served once a summary with that content is saved.
+    """
+    record = get_result_store().get(result_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="找不到指定的結果")
+    result = FigmaSummaryResult.model_validate(record["result"])
+    if fmt == "markdown":
+        body = format_output(result).encode("utf-8")
+    elif fmt == "adf":
+        body = json.dumps(build_confluence_adf(result, record["source_url"]), ensure_ascii=False).encode("utf-8")
+    else:
+        payload = {key: record[key] for key in ("id", "doc_type", "source_url", "created_at")}
+        payload["result"] = record["result"]
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    return body, gzip.compress(body, mtime=0)
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+@router.get("/{result_id}")
+def get_result_endpoint(
+    result_id: str,
+    format: Literal["json", "markdown", "adf"] = Query("json"),  # noqa: A002 - 對外參數名稱
+    accept_encoding: Optional[str] = Header(default=None),
+    if_none_match: Optional[str] = Header(default=None),
+):
+    """
+    A completed summary as JSON, markdown (``format_output``) or Confluence ADF.
+
+    Results are content-addressed and never change, so responses carry a strong
+    ``ETag`` (per format and content encoding) and a long-lived ``Cache-Control``.
+    """
+    body, gzipped = render_result(result_id, format)
+
+    use_gzip = len(body) >= GZIP_MIN_BYTES and "gzip" in (accept_encoding or "").lower()
+    etag = f'"{result_id}-{format}-v{RENDER_VERSION}{"-gz" if use_gzip else ""}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": misc_settings.results_cache_control,
+        "Vary": "Accept-Encoding",
+    }
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+        body = gzipped
+    return Response(content=body, media_type=MEDIA_TYPES[format], headers=headers)
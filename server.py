@@ -1,24 +1,79 @@
-from fastapi import FastAPI
+import threading
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from routes import figma
 from routes import confluence
+from routes import admin
+from routes import publish
+from routes import results
+
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from modules.publish_outbox import OutboxPublisher, get_outbox
+from utils.circuit_breaker import CLOSED, breaker_states
+from utils.log import shutdown_logging
+from utils.metrics import format_server_timing, render_prometheus, start_request_timings
+from utils.static_assets import PrecompressedStaticFiles, ui_directory
+
+
+def preload_llm_stack() -> None:
+    """Import the LangChain / OpenAI modules that the agents load lazily."""
+    import langchain_openai  # noqa: F401
+    import modules.llm_chain  # noqa: F401
+    import modules.confluence_llm_chain  # noqa: F401
+
 
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, JSONResponse
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 在背景預先載入 LLM 套件：服務可立即通過 healthcheck，第一個請求也不必付出完整 import 成本
+    threading.Thread(target=preload_llm_stack, name="preload-llm-stack", daemon=True).start()
+    publisher = OutboxPublisher(get_outbox())
+    publisher.start()
+    yield
+    publisher.stop()
+    shutdown_logging()
 
-app = FastAPI(title="Figma Parser Agent API")
+
+app = FastAPI(title="Figma Parser Agent API", lifespan=lifespan)
 
 app.include_router(figma.router, prefix="/figma", tags=["figma"])
 app.include_router(confluence.router, prefix="/confluence", tags=["confluence"])
+app.include_router(admin.router, prefix="/admin", tags=["admin"])
+app.include_router(publish.router, prefix="/publish", tags=["publish"])
+app.include_router(results.router, prefix="/results", tags=["results"])
+
+# 有執行 `python -m utils.static_assets` 時使用帶雜湊檔名、預先壓縮的 web_ui/dist
+ui_static = PrecompressedStaticFiles(directory=ui_directory())
+app.mount("/ui", ui_static, name="ui")
+
+
+@app.middleware("http")
+async def add_server_timing(request: Request, call_next):
+    timings = start_request_timings()
+    response = await call_next(request)
+    if timings:
+        response.headers["Server-Timing"] = format_server_timing(timings)
+    return response
 
-app.mount("/ui", StaticFiles(directory="web_ui"), name="ui")
 
 @app.get("/")
-async def read_root():
-    return FileResponse('web_ui/index.html')
+async def read_root(request: Request):
+    return await ui_static.get_response("index.html", request.scope)
 
 @app.get("/healthcheck")
 async def health_check():
-    return JSONResponse(content={"message": "ok"}, status_code=200)
+    # 依賴服務的斷路器狀態；服務本身仍可回應（可沿用既有結果），因此一律回 200
+    circuits = breaker_states()
+    degraded = any(circuit["state"] != CLOSED for circuit in circuits.values())
+    return JSONResponse(
+        content={"message": "ok", "status": "degraded" if degraded else "ok", "circuits": circuits},
+        status_code=200,
+    )
+
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
 
 if __name__ == "__main__":
     import uvicorn
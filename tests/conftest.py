@@ -0,0 +1,35 @@
+import shutil
+import tempfile
+
+import pytest
+
+from config.confluence import settings as confluence_settings
+from config.figma import settings as figma_settings
+from config.misc import settings as misc_settings
+
+
+# 模組層級的 logger 在匯入時就綁定 log_dir，需在收集測試模組前改到暫存目錄
+_session_log_dir = tempfile.mkdtemp(prefix="qa-parser-test-logs-")
+misc_settings.log_dir = _session_log_dir
+
+
+def pytest_unconfigure(config):
+    from utils.log import shutdown_logging
+
+    shutdown_logging()
+    shutil.rmtree(_session_log_dir, ignore_errors=True)
+
+
+@pytest.fixture(autouse=True)
+def isolated_storage(mocker, tmp_path):
+    """Point every on-disk store at ``tmp_path`` so tests never write into ``./cache`` or ``./logs``."""
+    mocker.patch.object(misc_settings, "log_dir", str(tmp_path / "logs"))
+    mocker.patch.object(misc_settings, "results_dir", str(tmp_path / "results"))
+    mocker.patch.object(misc_settings, "similarity_dir", str(tmp_path / "similarity"))
+    mocker.patch.object(confluence_settings, "outbox_path", str(tmp_path / "publish_outbox.sqlite3"))
+    mocker.patch.object(figma_settings, "index_dir", str(tmp_path / "figma_index"))
+    mocker.patch.object(figma_settings, "summary_dir", str(tmp_path / "figma_summaries"))
+    # 以設定建立的單例需重新建立
+    mocker.patch("modules.publish_outbox._outbox", None)
+    mocker.patch("modules.figma_index._store", None)
+    mocker.patch("modules.similarity_index._index", None)
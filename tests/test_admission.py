@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from modules.admission import AdmissionController, RequestCost
+from utils.metrics import ADMISSION_DECISIONS
+
+
+MB = 1024 * 1024
+
+
+class TestAdmissionController:
+    def test_queue_then_reject(self):
+        """Test that requests over capacity queue in order and overflow gets 429 with Retry-After."""
+
+        async def scenario():
+            controller = AdmissionController(memory_budget_bytes=100 * MB, llm_slots=1, max_queue=1, queue_timeout=5)
+            order = []
+            first_running = asyncio.Event()
+            release_first = asyncio.Event()
+
+            async def request(name):
+                async with controller.admit("test", RequestCost(10 * MB)):
+                    order.append(name)
+                    if name == "a":
+                        first_running.set()
+                        await release_first.wait()
+
+            first = asyncio.create_task(request("a"))
+            await first_running.wait()
+            second = asyncio.create_task(request("b"))
+            await asyncio.sleep(0)
+            assert controller.queue_depth == 1
+
+            with pytest.raises(HTTPException) as rejected:
+                await request("c")
+            assert rejected.value.status_code == 429
+            assert int(rejected.value.headers["Retry-After"]) >= 1
+
+            release_first.set()
+            await asyncio.gather(first, second)
+            assert order == ["a", "b"]
+            assert (controller.inflight_requests, controller.inflight_bytes, controller.queue_depth) == (0, 0, 0)
+
+        before = ADMISSION_DECISIONS.value(route="test", outcome="rejected")
+        asyncio.run(scenario())
+        assert ADMISSION_DECISIONS.value(route="test", outcome="rejected") == before + 1
+
+    def test_memory_budget_and_timeout(self):
+        """Test that the memory budget limits concurrency and queued requests time out."""
+
+        async def scenario():
+            controller = AdmissionController(memory_budget_bytes=100 * MB, llm_slots=8, max_queue=4, queue_timeout=0.05)
+            async with controller.admit("test", RequestCost(60 * MB)):
+                with pytest.raises(HTTPException) as timed_out:
+                    async with controller.admit("test", RequestCost(60 * MB)):
+                        pass
+                assert timed_out.value.status_code == 429
+                assert controller.queue_depth == 0
+                # 小請求仍可並行
+                async with controller.admit("test", RequestCost(10 * MB)):
+                    assert controller.inflight_requests == 2
+            # 單一超過總預算的請求在閒置時仍會放行
+            async with controller.admit("test", RequestCost(500 * MB)):
+                assert controller.inflight_requests == 1
+
+        asyncio.run(scenario())
+
+    def test_head_timeout_admits_next_waiter(self):
+        """Test that when the head waiter times out, a waiter behind it that fits is admitted at once."""
+
+        async def scenario():
+            controller = AdmissionController(memory_budget_bytes=100 * MB, llm_slots=8, max_queue=4, queue_timeout=5)
+            admitted = asyncio.Event()
+
+            async def large_request():
+                async with controller.admit("test", RequestCost(60 * MB), max_wait=0.05):
+                    pass
+
+            async def small_request():
+                async with controller.admit("test", RequestCost(10 * MB)):
+                    admitted.set()
+
+            async with controller.admit("test", RequestCost(60 * MB)):
+                large = asyncio.create_task(large_request())
+                await asyncio.sleep(0)
+                small = asyncio.create_task(small_request())
+                await asyncio.sleep(0)
+                assert controller.queue_depth == 2
+
+                with pytest.raises(HTTPException):
+                    await large
+                # 不需等到 60MB 的請求結束
+                await asyncio.wait_for(admitted.wait(), 1)
+                await small
+                assert controller.inflight_requests == 1
+
+        asyncio.run(scenario())
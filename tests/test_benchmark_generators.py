@@ -0,0 +1,23 @@
+from benchmarks.generators import count_figma_nodes, generate_confluence_page, generate_figma_file
+from modules.confluence_parser import aggregate_confluence_content
+from modules.figma_parser import find_node_by_names
+
+
+class TestGenerateFigmaFile:
+    def test_node_count_and_target(self):
+        """Test that the requested node count is produced and the target node exists."""
+        figma_json = generate_figma_file(node_count=500, depth=6, fan_out=4)
+        assert count_figma_nodes(figma_json["document"]) == 500
+        assert find_node_by_names(figma_json["document"], ["活動說明"]) is not None
+
+    def test_deterministic_for_seed(self):
+        """Test that the same seed produces the same tree."""
+        assert generate_figma_file(node_count=200, seed=3) == generate_figma_file(node_count=200, seed=3)
+
+
+class TestGenerateConfluencePage:
+    def test_storage_size_and_extraction(self):
+        """Test that the storage body reaches the target size and parses."""
+        page = generate_confluence_page(target_bytes=20_000)
+        assert len(page["body"]["storage"]["value"].encode("utf-8")) >= 20_000
+        assert "=== 文件內容 ===" in aggregate_confluence_content(page)
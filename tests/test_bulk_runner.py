@@ -0,0 +1,52 @@
+import json
+
+from modules import bulk_runner
+from modules.models import FigmaSummaryResult, QAItem
+from utils.usage import record_llm_usage
+
+
+RESULT = FigmaSummaryResult(
+    title="批次摘要測試",
+    plan=["一", "二", "三"],
+    summary=[f"重點 {idx}" for idx in range(5)],
+    qa=[QAItem(question=f"問題 {idx}？", answer="答案") for idx in range(3)],
+)
+FIGMA_URL = "https://www.figma.com/file/BULK1/demo"
+CONFLUENCE_URL = "https://lang.atlassian.net/wiki/spaces/ACS/pages/123/demo"
+
+
+def fake_summary(url, **kwargs):
+    record_llm_usage("figma", "gpt-4.1-mini", {"input_tokens": 10, "output_tokens": 5})
+    if "BROKEN" in url:
+        raise RuntimeError("無法取得有效的Figma文件")
+    return RESULT
+
+
+class TestBulkRunner:
+    def test_jsonl_and_resume(self, mocker, tmp_path):
+        """Test that each URL yields a JSONL record and a rerun skips checkpointed ones."""
+        figma = mocker.patch("modules.bulk_runner.generate_figma_summary", side_effect=fake_summary)
+        mocker.patch("modules.bulk_runner.generate_confluence_summary", side_effect=fake_summary)
+        urls = tmp_path / "urls.txt"
+        urls.write_text(
+            "\n".join(
+                ["# nightly", FIGMA_URL, CONFLUENCE_URL, FIGMA_URL, "https://www.figma.com/file/BROKEN/x", "https://example.com"]
+            )
+        )
+        output = tmp_path / "out.jsonl"
+
+        assert bulk_runner.main([str(urls), "-o", str(output), "--workers", "2"]) == 1
+        records = {record["url"]: record for record in map(json.loads, output.read_text().splitlines())}
+        assert len(records) == 4
+        assert records[FIGMA_URL]["ok"] and records[FIGMA_URL]["title"] == "批次摘要測試"
+        assert records[FIGMA_URL]["usage"]["input_tokens"] == 10
+        assert records[CONFLUENCE_URL]["doc_type"] == "confluence"
+        assert records["https://example.com"]["error"].startswith("不支援的網址")
+        assert not records["https://www.figma.com/file/BROKEN/x"]["ok"]
+        assert set((tmp_path / "out.jsonl.checkpoint").read_text().split()) == {FIGMA_URL, CONFLUENCE_URL}
+
+        figma.reset_mock()
+        bulk_runner.main([str(urls), "-o", str(output), "--workers", "2"])
+        # 已成功的網址不再處理，只重試失敗的
+        assert [call.args[0] for call in figma.call_args_list] == ["https://www.figma.com/file/BROKEN/x"]
+        assert len(output.read_text().splitlines()) == 6
@@ -0,0 +1,90 @@
+import asyncio
+import threading
+
+import pytest
+from langchain_core.messages import AIMessageChunk
+from langchain_core.runnables import RunnableGenerator
+
+from modules.chain_runner import invoke_chain
+from modules.model_router import run_with_model_cascade
+from utils.cancellation import CancelToken, RequestCancelled, cancellation_scope, check_cancelled, run_cancellable
+from utils.metrics import CANCELLATIONS, CANCELLED_TOKENS_SAVED
+
+
+class FakeRequest:
+    """Stand-in for ``fastapi.Request`` that disconnects once ``gone`` is set."""
+
+    def __init__(self):
+        self.gone = threading.Event()
+
+    async def receive(self):
+        while not self.gone.is_set():
+            await asyncio.sleep(0.005)
+        return {"type": "http.disconnect"}
+
+
+class TestCancelToken:
+    def test_check_outside_scope_is_noop(self):
+        """Test that work outside a cancellation scope (e.g. the bulk runner) is never cancelled."""
+        check_cancelled("figma_download")
+
+    def test_cascade_skips_llm_and_counts_tokens(self):
+        """Test that no model attempt starts after cancellation and the prompt tokens count as saved."""
+        token = CancelToken()
+        token.cancel()
+        attempts = []
+        with cancellation_scope(token), pytest.raises(RequestCancelled) as cancelled:
+            run_with_model_cascade("figma", "url", "活動內容" * 10, "gpt-4.1-mini", attempts.append)
+        assert attempts == []
+        assert cancelled.value.stage == "figma_llm"
+        assert token.saved_tokens == 40
+        # BaseException：一般的 except Exception 不會吞掉取消
+        assert not isinstance(cancelled.value, Exception)
+
+    def test_stream_stops_when_cancelled(self):
+        """Test that a streamed LLM response is closed as soon as the request is cancelled."""
+        token = CancelToken()
+        produced = []
+
+        def generate(_):
+            for idx in range(100):
+                produced.append(idx)
+                if idx == 2:
+                    token.cancel()
+                yield AIMessageChunk(content=str(idx))
+
+        with cancellation_scope(token), pytest.raises(RequestCancelled):
+            invoke_chain("figma", RunnableGenerator(generate), {})
+        assert produced == [0, 1, 2]
+
+        with cancellation_scope(CancelToken()):
+            assert invoke_chain("figma", RunnableGenerator(generate), {}).content == "".join(map(str, range(100)))
+
+
+class TestRunCancellable:
+    def test_disconnect_cancels_worker(self):
+        """Test that a client disconnect stops the worker thread at its next check and is counted."""
+        request = FakeRequest()
+        before = CANCELLATIONS.value(route="test", stage="figma_llm")
+        saved_before = CANCELLED_TOKENS_SAVED.value(route="test")
+
+        def work():
+            request.gone.set()
+            while True:
+                check_cancelled("figma_llm", tokens=123)
+                threading.Event().wait(0.005)
+
+        with pytest.raises(RequestCancelled):
+            asyncio.run(run_cancellable(request, "test", work))
+        assert CANCELLATIONS.value(route="test", stage="figma_llm") == before + 1
+        assert CANCELLED_TOKENS_SAVED.value(route="test") == saved_before + 123
+
+    def test_connected_client_gets_result(self):
+        """Test that work finishes normally while the client stays connected."""
+
+        def work(value):
+            threading.Event().wait(0.05)
+            check_cancelled("figma_llm")
+            return value * 2
+
+        assert asyncio.run(run_cancellable(FakeRequest(), "test", work, 21)) == 42
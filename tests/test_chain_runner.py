@@ -0,0 +1,120 @@
+import json
+
+import pytest
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+from config.misc import settings as misc_settings
+from config.openai import settings as openai_settings
+from modules.chain_runner import parse_summary, resolve_output_mode, run_summary_chain
+from utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+from utils.deadline import Deadline, deadline_scope
+
+
+VALID_SUMMARY = {
+    "title": "測試活動標題",
+    "plan": ["步驟一", "步驟二", "步驟三"],
+    "summary": [f"摘要第{idx}條" for idx in range(5)],
+    "qa": [{"question": f"問題{idx}", "answer": "答案"} for idx in range(3)],
+}
+
+
+class FakeLLM:
+    model_name = "gpt-4.1-mini"
+
+
+class TestResolveOutputMode:
+    def test_per_model_override(self, mocker):
+        """Test that the per-model setting wins over the global default."""
+        mocker.patch.object(openai_settings, "output_mode", "parser")
+        mocker.patch.object(openai_settings, "output_mode_by_model", {"gpt-4.1-mini": "json_schema"})
+        assert resolve_output_mode(FakeLLM()) == "json_schema"
+        assert resolve_output_mode(FakeLLM(), "function_calling") == "function_calling"
+
+    def test_unknown_mode(self):
+        """Test that an unknown mode is rejected."""
+        with pytest.raises(ValueError, match="不支援的輸出模式"):
+            resolve_output_mode(FakeLLM(), "xml")
+
+
+class TestParseSummary:
+    def test_parser_mode_with_code_fence(self):
+        """Test parser mode accepts JSON wrapped in a markdown code fence."""
+        message = AIMessage(content=f"```json\n{json.dumps(VALID_SUMMARY, ensure_ascii=False)}\n```")
+        assert parse_summary(message, "parser").title == "測試活動標題"
+
+    def test_json_schema_mode(self):
+        """Test json_schema mode validates the message content."""
+        message = AIMessage(content=json.dumps(VALID_SUMMARY, ensure_ascii=False))
+        assert len(parse_summary(message, "json_schema").qa) == 3
+
+    def test_function_calling_mode(self):
+        """Test function_calling mode validates the first tool call's arguments."""
+        message = AIMessage(
+            content="",
+            tool_calls=[{"name": "FigmaSummaryResult", "args": VALID_SUMMARY, "id": "call_1"}],
+        )
+        assert parse_summary(message, "function_calling").plan[0] == "步驟一"
+
+
+class TestRunSummaryChain:
+    def test_validation_failure_raises_runtime_error(self):
+        """Test that invalid output is reported as an LLM validation failure."""
+        invalid = dict(VALID_SUMMARY, summary=["只有一條"])
+        chain = RunnableLambda(lambda _: AIMessage(content=json.dumps(invalid, ensure_ascii=False)))
+        with pytest.raises(RuntimeError, match="LLM 輸出驗證失敗"):
+            run_summary_chain("figma", chain, {}, "json_schema")
+
+
+class TestRepairSummary:
+    def test_local_fix_strips_bullets_and_truncates(self):
+        """Test that bullet prefixes and too many Q&As are fixed without an LLM call."""
+        broken = dict(
+            VALID_SUMMARY,
+            summary=[f"- 摘要第{idx}條" for idx in range(5)],
+            qa=[{"question": f"問題{idx}", "answer": "答案"} for idx in range(21)],
+        )
+        chain = RunnableLambda(lambda _: AIMessage(content=json.dumps(broken, ensure_ascii=False)))
+        result = run_summary_chain("figma", chain, {}, "json_schema")
+        assert result.summary[0] == "摘要第0條"
+        assert len(result.qa) == 20
+
+    def test_llm_repair_only_failing_fields(self):
+        """Test that the LLM repair call patches only the failing field."""
+        broken = dict(VALID_SUMMARY, summary=["摘要一", "摘要二", "摘要三", "摘要四"])
+        chain = RunnableLambda(lambda _: AIMessage(content=json.dumps(broken, ensure_ascii=False)))
+        repair_inputs = []
+
+        def fake_repair_llm(prompt_value):
+            repair_inputs.append(prompt_value.to_string())
+            patch = {"summary": [f"修正摘要{idx}" for idx in range(5)], "title": "不應被採用"}
+            return AIMessage(content=json.dumps(patch, ensure_ascii=False))
+
+        result = run_summary_chain("figma", chain, {}, "json_schema", llm=RunnableLambda(fake_repair_llm))
+        assert result.summary[0] == "修正摘要0"
+        assert result.title == "測試活動標題"
+        assert "需要修正的欄位: summary" in repair_inputs[0]
+
+    def test_llm_repair_is_guarded_and_bounded_by_deadline(self, mocker):
+        """Test that the repair call gets the remaining deadline and is rejected by an open circuit."""
+        broken = dict(VALID_SUMMARY, summary=["摘要一"])
+        chain = RunnableLambda(lambda _: AIMessage(content=json.dumps(broken, ensure_ascii=False)))
+        timeouts = []
+
+        def fake_repair_llm(prompt_value, timeout=None):
+            timeouts.append(timeout)
+            return AIMessage(content=json.dumps({"summary": [f"修正摘要{idx}" for idx in range(5)]}))
+
+        repair_llm = RunnableLambda(fake_repair_llm)
+        with deadline_scope(Deadline(60)):
+            run_summary_chain("figma", chain, {}, "json_schema", llm=repair_llm)
+        # 未指定重試次數時以 SDK 預設的兩次重試分配剩餘期限
+        assert 15 < timeouts[0] <= 20
+
+        mocker.patch.object(misc_settings, "circuit_enabled", True)
+        opened = CircuitBreaker("test_repair", window_size=1, min_calls=1, open_seconds=60)
+        opened.record(True, 0.0)
+        mocker.patch("modules.output_repair.get_breaker", return_value=opened)
+        with pytest.raises(CircuitOpenError):
+            run_summary_chain("figma", chain, {}, "json_schema", llm=repair_llm)
+        assert len(timeouts) == 1
@@ -0,0 +1,158 @@
+import time
+
+import pytest
+import requests
+from langchain_core.exceptions import OutputParserException
+
+from config.misc import settings as misc_settings
+from modules.publish_outbox import OutboxPublisher, PublishOutbox
+from utils.cancellation import RequestCancelled
+from utils.circuit_breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+    DependencyStatusError,
+    find_open_circuit,
+)
+from utils.deadline import Deadline, deadline_scope
+from utils.metrics import CIRCUIT_REJECTIONS
+
+
+def call(breaker, exc=None, seconds=0.0):
+    """One guarded call that fails with ``exc`` or takes ``seconds``."""
+    with breaker.guard():
+        if seconds:
+            time.sleep(seconds)
+        if exc is not None:
+            raise exc
+
+
+def fail(breaker, exc, seconds=0.0):
+    with pytest.raises(type(exc)):
+        call(breaker, exc, seconds)
+
+
+class TestCircuitBreaker:
+    def test_opens_on_error_rate_and_fails_fast(self, mocker):
+        """Test that the breaker opens once the failure rate is reached and then rejects calls."""
+        mocker.patch.object(misc_settings, "circuit_enabled", True)
+        breaker = CircuitBreaker("test_errors", window_size=4, min_calls=4, failure_rate=0.5, open_seconds=60)
+        call(breaker)
+        call(breaker)
+        fail(breaker, ConnectionError("連線逾時"))
+        assert breaker.state == CLOSED
+        fail(breaker, DependencyStatusError("回傳狀態碼 503", 503))
+        assert breaker.state == OPEN
+
+        rejected = CIRCUIT_REJECTIONS.value(dependency="test_errors")
+        with pytest.raises(CircuitOpenError) as opened:
+            call(breaker)
+        assert 0 < opened.value.retry_after <= 60
+        assert CIRCUIT_REJECTIONS.value(dependency="test_errors") == rejected + 1
+        assert breaker.snapshot()["state"] == OPEN
+
+    def test_client_errors_do_not_count(self, mocker):
+        """Test that 4xx answers (e.g. page not found) are not dependency failures."""
+        mocker.patch.object(misc_settings, "circuit_enabled", True)
+        breaker = CircuitBreaker("test_4xx", window_size=4, min_calls=4, failure_rate=0.5)
+        for _ in range(4):
+            fail(breaker, DependencyStatusError("回傳狀態碼 404", 404))
+        assert breaker.state == CLOSED
+        fail(breaker, DependencyStatusError("回傳狀態碼 429", 429))
+        fail(breaker, DependencyStatusError("回傳狀態碼 500", 500))
+        assert breaker.state == OPEN
+
+    def test_output_errors_do_not_count(self, mocker):
+        """Test that errors about the answer itself (empty or unparsable output) are not failures."""
+        mocker.patch.object(misc_settings, "circuit_enabled", True)
+        breaker = CircuitBreaker("test_output", window_size=4, min_calls=4, failure_rate=0.5)
+        for _ in range(4):
+            fail(breaker, OutputParserException("LLM 未回傳任何內容"))
+            fail(breaker, ValueError("LLM 修正結果不是 JSON 物件"))
+        assert breaker.state == CLOSED
+        fail(breaker, requests.ConnectionError("連線被拒"))
+        fail(breaker, requests.exceptions.ChunkedEncodingError("連線中斷"))
+        assert breaker.state == OPEN
+
+    def test_opens_on_slow_calls(self, mocker):
+        """Test that successful but slow calls open the breaker too."""
+        mocker.patch.object(misc_settings, "circuit_enabled", True)
+        breaker = CircuitBreaker("test_slow", window_size=2, min_calls=2, slow_call_seconds=0.01, slow_rate=1.0)
+        call(breaker, seconds=0.02)
+        call(breaker, seconds=0.02)
+        assert breaker.state == OPEN
+
+    def test_half_open_probe(self, mocker):
+        """Test that one probe is let through after the open period; it closes or reopens the breaker."""
+        mocker.patch.object(misc_settings, "circuit_enabled", True)
+        breaker = CircuitBreaker("test_probe", window_size=1, min_calls=1, open_seconds=0.02)
+        fail(breaker, ConnectionError("down"))
+        time.sleep(0.03)
+
+        # 試探期間的其他呼叫仍直接失敗；取消的試探不影響狀態
+        with pytest.raises(RequestCancelled):
+            with breaker.guard():
+                assert breaker.state == HALF_OPEN
+                with pytest.raises(CircuitOpenError):
+                    call(breaker)
+                raise RequestCancelled("figma_download")
+        assert breaker.state == HALF_OPEN
+
+        fail(breaker, ConnectionError("still down"))
+        assert breaker.state == OPEN
+        time.sleep(0.03)
+        call(breaker)
+        assert breaker.state == CLOSED
+        assert breaker.snapshot()["recent_calls"] == 0
+
+    def test_timeouts_from_short_deadlines_do_not_count(self, mocker):
+        """Test that a timeout cut short by the caller's deadline is not a dependency failure."""
+        mocker.patch.object(misc_settings, "circuit_enabled", True)
+        breaker = CircuitBreaker("test_deadline", window_size=2, min_calls=2, failure_rate=0.5)
+        for _ in range(4):
+            with deadline_scope(Deadline(0.01)):
+                fail(breaker, requests.Timeout("讀取逾時"), seconds=0.02)
+        assert breaker.state == CLOSED
+        assert breaker.snapshot()["recent_calls"] == 0
+
+        # 期限內就逾時：依賴服務確實沒有回應
+        with deadline_scope(Deadline(60)):
+            fail(breaker, requests.Timeout("讀取逾時"))
+            fail(breaker, requests.Timeout("讀取逾時"))
+        assert breaker.state == OPEN
+
+    def test_disabled_breaker_never_opens(self, mocker):
+        """Test that with CIRCUIT_ENABLED off calls are neither recorded nor rejected."""
+        mocker.patch.object(misc_settings, "circuit_enabled", False)
+        breaker = CircuitBreaker("test_disabled", window_size=1, min_calls=1)
+        fail(breaker, ConnectionError("down"))
+        fail(breaker, ConnectionError("down"))
+        assert breaker.state == CLOSED
+
+    def test_find_open_circuit_follows_causes(self):
+        """Test that a wrapped CircuitOpenError is found for the 503 response."""
+        opened = CircuitOpenError("openai", 12)
+        try:
+            try:
+                raise opened
+            except CircuitOpenError as exc:
+                raise RuntimeError("產生摘要與問答失敗") from exc
+        except RuntimeError as wrapped:
+            assert find_open_circuit(wrapped) is opened
+        assert find_open_circuit(RuntimeError("其他錯誤")) is None
+
+
+class TestOpenCircuitFallbacks:
+    def test_publish_is_deferred_without_using_an_attempt(self, mocker, tmp_path):
+        """Test that a publish rejected by an open breaker is retried later without counting an attempt."""
+        outbox = PublishOutbox(str(tmp_path / "outbox.sqlite3"))
+        publisher_cls = mocker.patch("modules.publish_outbox.ConfluencePublisher")
+        publisher_cls.return_value.create_page.side_effect = CircuitOpenError("confluence", 20)
+        ticket = outbox.enqueue("頁面", {"type": "doc", "content": []}, None, "https://www.figma.com/file/A/x")
+
+        OutboxPublisher(outbox).drain_once()
+        entry = outbox.get(ticket)
+        assert (entry["status"], entry["attempts"]) == ("pending", 0)
+        assert OutboxPublisher(outbox).drain_once() == 0
@@ -0,0 +1,55 @@
+import threading
+from unittest import mock
+
+from config.confluence import settings as confluence_settings
+from modules.confluence_client import ConfluenceAPIClient, ConfluencePageBatcher
+
+
+def search_response(ids):
+    response = mock.Mock(status_code=200, content=b"{}")
+    response.json.return_value = {"results": [{"id": page_id, "title": f"頁面 {page_id}"} for page_id in ids]}
+    return response
+
+
+class TestFetchPages:
+    def test_cql_search_in_chunks(self, mocker):
+        """Test that page IDs are fetched with CQL id-in searches of at most the bulk limit."""
+        mocker.patch.object(confluence_settings, "bulk_fetch_limit", 2)
+        client = ConfluenceAPIClient(username="user", api_token="token")
+        get = mocker.patch.object(
+            client.session, "get", side_effect=lambda url, params, timeout: search_response(params["cql"][7:-1].split(","))
+        )
+
+        pages = client.fetch_pages(["11", "12", "11", "13", "bad"])
+
+        assert sorted(pages) == ["11", "12", "13"]
+        assert [call.kwargs["params"]["cql"] for call in get.call_args_list] == ["id in (11,12)", "id in (13)"]
+        assert get.call_args.kwargs["params"]["expand"] == "body.storage,body.view,version,space"
+
+
+class TestConfluencePageBatcher:
+    def test_one_request_per_batch(self):
+        """Test that concurrent pipelines share one fetch per batch and missing pages fall back."""
+        client = mock.Mock()
+        client.fetch_pages.side_effect = lambda ids: {page_id: {"id": page_id} for page_id in ids if page_id != "3"}
+        batcher = ConfluencePageBatcher(["1", "2", "3", "4"], client_factory=lambda: client, batch_size=3)
+        results = {}
+
+        def pipeline(page_id):
+            results[page_id] = batcher.get(page_id)
+
+        threads = [threading.Thread(target=pipeline, args=(page_id,)) for page_id in ["1", "2", "3", "4"]]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+
+        assert [call.args[0] for call in client.fetch_pages.call_args_list] == [["1", "2", "3"], ["4"]]
+        assert results["1"] == {"id": "1"} and results["4"] == {"id": "4"}
+        assert results["3"] is None
+        assert batcher.get("99") is None
+
+    def test_failed_batch_falls_back(self):
+        """Test that a failing bulk request leaves each page to its own fetch."""
+        batcher = ConfluencePageBatcher(["1"], client_factory=mock.Mock(side_effect=ValueError("認證資訊不足")))
+        assert batcher.get("1") is None
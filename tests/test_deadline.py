@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from config.misc import settings as misc_settings
+from config.openai import settings as openai_settings
+from modules.admission import AdmissionController, RequestCost
+from modules.model_router import plan_models, run_with_model_cascade
+from utils.deadline import (
+    Deadline,
+    DeadlineExceeded,
+    deadline_scope,
+    llm_request_options,
+    stage_timeout,
+)
+
+
+TIERS = [
+    {"model": "small", "max_input_tokens": 100},
+    {"model": "large", "max_input_tokens": None},
+]
+
+
+class TestStageBudgets:
+    def test_no_deadline_keeps_defaults(self):
+        """Test that without a deadline stages use their usual timeouts and the SDK retries."""
+        assert stage_timeout("figma_download", 30) == 30
+        assert llm_request_options("figma_llm") == {}
+
+    def test_timeouts_are_capped_by_remaining_budget(self, mocker):
+        """Test that HTTP and LLM timeouts never exceed the time left, retries included."""
+        mocker.patch.object(misc_settings, "deadline_min_llm_seconds", 5.0)
+        with deadline_scope(Deadline(10)):
+            assert 9 < stage_timeout("figma_download", 30) <= 10
+            assert stage_timeout("figma_version", 2) == 2
+            options = llm_request_options("figma_llm")
+        assert options["timeout"] * (options["max_retries"] + 1) <= 10
+        assert options["timeout"] >= 4.5
+
+    def test_llm_retries_fit_in_budget(self, mocker):
+        """Test that a normal request keeps the SDK retries and a tight one drops them."""
+        mocker.patch.object(misc_settings, "deadline_min_llm_seconds", 5.0)
+        with deadline_scope(Deadline(120)):
+            options = llm_request_options("figma_llm")
+        # 每次嘗試分到三分之一的預算，含重試仍不超過期限
+        assert options["max_retries"] == 2
+        assert 39 < options["timeout"] <= 40
+        with deadline_scope(Deadline(12)):
+            assert llm_request_options("figma_llm")["max_retries"] == 1
+        with deadline_scope(Deadline(8)):
+            options = llm_request_options("figma_llm")
+        assert options["max_retries"] == 0
+        assert 7 < options["timeout"] <= 8
+
+    def test_fails_fast_when_budget_is_too_small(self, mocker):
+        """Test that a stage is not started with less than its minimum and the stage is recorded."""
+        mocker.patch.object(misc_settings, "deadline_min_llm_seconds", 5.0)
+        deadline = Deadline(3)
+        with deadline_scope(deadline):
+            assert stage_timeout("figma_download", 30) <= 3
+            with pytest.raises(DeadlineExceeded) as exceeded:
+                llm_request_options("figma_llm")
+        assert exceeded.value.stage == "figma_llm"
+        assert deadline.exceeded_stage == "figma_llm"
+        assert deadline.exceeded
+
+    def test_report_sums_stages(self):
+        """Test that the budget report adds up repeated stages."""
+        report = Deadline(60).report([("figma_download", 1.0), ("figma_llm", 2.5), ("figma_llm", 0.5)])
+        assert report["budget_seconds"] == 60
+        assert report["stages"] == {"figma_download": 1.0, "figma_llm": 3.0}
+        assert report["exceeded_stage"] is None
+
+
+class TestDegradation:
+    def test_auto_uses_smallest_model_when_time_is_short(self, mocker):
+        """Test that auto routing drops to the smallest tier without escalations near the deadline."""
+        mocker.patch.object(openai_settings, "model_tiers", TIERS)
+        mocker.patch.object(openai_settings, "model_max_escalations", 1)
+        mocker.patch.object(misc_settings, "deadline_small_model_seconds", 30.0)
+        content = "活動" * 3000
+        with deadline_scope(Deadline(120)):
+            assert plan_models(content, "auto") == [("large", "size")]
+        with deadline_scope(Deadline(20)):
+            assert plan_models(content, "auto") == [("small", "deadline")]
+            assert plan_models(content, "gpt-4.1-mini") == [("gpt-4.1-mini", "requested")]
+
+    def test_cascade_does_not_call_llm_without_budget(self, mocker):
+        """Test that no model attempt starts when the deadline is nearly spent."""
+        mocker.patch.object(misc_settings, "deadline_min_llm_seconds", 5.0)
+        attempts = []
+        with deadline_scope(Deadline(1)), pytest.raises(DeadlineExceeded):
+            run_with_model_cascade("figma", "url", "活動內容", "gpt-4.1-mini", attempts.append)
+        assert attempts == []
+
+    def test_queue_wait_is_bounded_by_deadline(self):
+        """Test that a queued request gives up at its deadline, not the full queue timeout."""
+        controller = AdmissionController(memory_budget_bytes=100, llm_slots=1, max_queue=4, queue_timeout=30)
+
+        async def scenario():
+            async with controller.admit("test", RequestCost(10, 1)):
+                started = asyncio.get_running_loop().time()
+                with pytest.raises(HTTPException) as rejected:
+                    async with controller.admit("test", RequestCost(10, 1), max_wait=0.05):
+                        pass
+                return rejected.value, asyncio.get_running_loop().time() - started
+
+        rejected, waited = asyncio.run(scenario())
+        assert rejected.status_code == 429
+        assert waited < 1
@@ -83,9 +83,7 @@ class TestFigmaMCPClient:
         """Test successful file fetch."""
         mock_response = mocker.Mock()
         mock_response.status_code = 200
-        mock_response.json.return_value = {
-            "document": {"type": "DOCUMENT", "name": "Test"}
-        }
+        mock_response.iter_content.return_value = [b'{"document": {"type": "DOCUMENT", ', b'"name": "Test"}}']
         
         mock_session = mocker.Mock()
         mock_session.get.return_value = mock_response
@@ -97,7 +95,8 @@ class TestFigmaMCPClient:
         
         mock_session.get.assert_called_once_with(
             "https://api.figma.com/v1/files/ABC123",
-            timeout=30
+            timeout=30,
+            stream=True
         )
         assert result == {"document": {"type": "DOCUMENT", "name": "Test"}}
 
@@ -120,7 +119,7 @@ class TestFigmaMCPClient:
         """Test file fetch with custom base URL."""
         mock_response = mocker.Mock()
         mock_response.status_code = 200
-        mock_response.json.return_value = {"document": {}}
+        mock_response.iter_content.return_value = [b'{"document": {}}']
         
         mock_session = mocker.Mock()
         mock_session.get.return_value = mock_response
@@ -135,5 +134,6 @@ class TestFigmaMCPClient:
         
         mock_session.get.assert_called_once_with(
             "https://custom.api.com/files/XYZ789",
-            timeout=30
+            timeout=30,
+            stream=True
         )
@@ -0,0 +1,77 @@
+import copy
+
+from config.figma import settings as figma_settings
+from config.misc import settings as misc_settings
+from modules.figma_agent import generate_figma_summary
+from modules.figma_incremental import diff_text_nodes, format_changes, plan_update, SummaryRecord
+from modules.figma_index import FigmaFileIndex
+from modules.models import FigmaSummaryResult, QAItem
+
+from tests.test_figma_index import FIGMA_FILE
+
+
+SUMMARY = FigmaSummaryResult(
+    title="週年慶活動摘要",
+    plan=["步驟一", "步驟二", "步驟三"],
+    summary=[f"摘要第{idx}條" for idx in range(5)],
+    qa=[QAItem(question=f"問題{idx}", answer="答案") for idx in range(3)],
+)
+
+
+def _record(text_nodes):
+    return SummaryRecord("KEY", "1", "fp", "3:1", text_nodes, [], SUMMARY.model_dump())
+
+
+class TestPlanUpdate:
+    def test_modes(self, mocker):
+        """Test reuse on identical text, update on small diffs and full on large ones."""
+        mocker.patch.object(figma_settings, "incremental_max_change_ratio", 0.2)
+        old = {f"n{idx}": f"文字{idx}" for idx in range(10)}
+        assert plan_update(None, "fp", "3:1", old, [])[:2] == ("full", "no_previous")
+        assert plan_update(_record(old), "other", "3:1", old, [])[:2] == ("full", "settings_changed")
+        assert plan_update(_record(old), "fp", "3:1", dict(old), [])[:2] == ("reuse", "unchanged")
+
+        small = dict(old, n1="文字一改")
+        mode, _, diff = plan_update(_record(old), "fp", "3:1", small, [])
+        assert mode == "update"
+        assert format_changes(diff) == "[修改] 原: 文字1 → 新: 文字一改"
+
+        large = {f"m{idx}": "新內容" for idx in range(10)}
+        assert plan_update(_record(old), "fp", "3:1", large, [])[:2] == ("full", "large_diff")
+
+    def test_diff_text_nodes(self):
+        """Test added, removed and changed node detection."""
+        diff = diff_text_nodes({"a": "1", "b": "2"}, {"b": "3", "c": "4"})
+        assert diff.added == {"c": "4"}
+        assert diff.removed == {"a": "1"}
+        assert diff.changed == {"b": ("2", "3")}
+
+
+class TestIncrementalSummary:
+    def test_reuse_then_update(self, mocker, tmp_path):
+        """Test full summary, reuse of an unchanged version and an incremental update."""
+        mocker.patch.object(figma_settings, "summary_dir", str(tmp_path))
+        mocker.patch.object(figma_settings, "incremental_summary", True)
+        mocker.patch.object(figma_settings, "incremental_max_change_ratio", 0.5)
+        mocker.patch.object(misc_settings, "similarity_enabled", False)
+        figma_file = copy.deepcopy(FIGMA_FILE)
+        mocker.patch(
+            "modules.figma_agent.get_file_index",
+            side_effect=lambda client, key: FigmaFileIndex.build(key, figma_file),
+        )
+        run_chain = mocker.patch("modules.llm_chain.run_chain", return_value=SUMMARY)
+        run_update = mocker.patch("modules.llm_chain.run_update_chain", return_value=SUMMARY)
+        url = "https://www.figma.com/file/KEY/x"
+
+        generate_figma_summary(url, access_token="t", api_key="k")
+        generate_figma_summary(url, access_token="t", api_key="k")
+        assert run_chain.call_count == 1
+        assert run_update.call_count == 0
+
+        figma_file["version"] = "43"
+        group = figma_file["document"]["children"][0]["children"][0]["children"][0]
+        group["children"][1]["characters"] = "滿千送兩百"
+        generate_figma_summary(url, access_token="t", api_key="k")
+        assert run_chain.call_count == 1
+        changes = run_update.call_args.args[2]
+        assert changes == "[修改] 原: 滿千送百 → 新: 滿千送兩百"
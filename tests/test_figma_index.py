@@ -0,0 +1,237 @@
+import time
+
+import pytest
+
+from benchmarks.generators import generate_figma_file
+from config.figma import settings as figma_settings
+from modules.figma_index import FigmaFileIndex, FigmaIndexStore, get_file_index
+from modules.figma_parser import aggregate_figma_content, collapse_text_nodes, find_node_by_names
+from utils.circuit_breaker import CircuitOpenError, DependencyStatusError
+from utils.metrics import CACHE_LOOKUPS
+
+
+FIGMA_FILE = {
+    "version": "42",
+    "document": {
+        "id": "0:0",
+        "name": "Document",
+        "type": "DOCUMENT",
+        "children": [
+            {
+                "id": "1:1",
+                "name": "Page 1",
+                "type": "CANVAS",
+                "children": [
+                    {
+                        "id": "2:1",
+                        "name": "Landing",
+                        "type": "FRAME",
+                        "children": [
+                            {
+                                "id": "3:1",
+                                "name": "活動說明",
+                                "type": "GROUP",
+                                "children": [
+                                    {"id": "4:1", "name": "標題", "type": "TEXT", "characters": "週年慶活動"},
+                                    {"id": "4:2", "name": "", "type": "TEXT", "characters": "滿千送百"},
+                                ],
+                            },
+                            {"id": "3:2", "name": "備註", "type": "TEXT", "characters": "活動期間至月底"},
+                        ],
+                    }
+                ],
+            }
+        ],
+    },
+    "components": {"C:1": {"name": "Button"}},
+    "styles": {},
+}
+
+
+class FakeClient:
+    def __init__(self, figma_json, access_token="token", allowed=True):
+        self.figma_json = figma_json
+        self.access_token = access_token
+        self.allowed = allowed
+        self.full_fetches = 0
+        self.version_checks = 0
+
+    def fetch_file_version(self, file_key):
+        self.version_checks += 1
+        if not self.allowed:
+            raise DependencyStatusError("Figma API 回傳狀態碼 403", 403)
+        return self.figma_json["version"]
+
+    def fetch_file(self, file_key):
+        self.full_fetches += 1
+        return self.figma_json
+
+
+class TestFigmaFileIndex:
+    def test_matches_tree_functions(self):
+        """Test that indexed lookups return the same results as the tree walkers."""
+        figma_json = generate_figma_file(node_count=2000, depth=8)
+        index = FigmaFileIndex.build("KEY", figma_json)
+        target = find_node_by_names(figma_json["document"], ["活動說明"])
+        node_id = index.find_by_names(["活動說明"])
+        assert node_id == target["id"]
+        expected = []
+        collapse_text_nodes(target, expected)
+        assert index.subtree_text(node_id) == expected
+        assert index.content() == aggregate_figma_content(figma_json)
+
+    def test_parent_chain_and_frame_search(self):
+        """Test ancestors, page and the frames containing a text match."""
+        index = FigmaFileIndex.build("KEY", FIGMA_FILE)
+        assert index.ancestors("4:1") == ["3:1", "2:1", "1:1", "0:0"]
+        [match] = index.find_text("滿千")
+        assert match["node"]["page"] == {"id": "1:1", "name": "Page 1"}
+        assert match["frame"]["id"] == "2:1"
+        assert match["top_frame"]["name"] == "Landing"
+        assert index.subtree_text("3:1") == ["標題: 週年慶活動", "滿千送百"]
+
+
+class TestFigmaIndexStore:
+    def test_reuses_stored_version(self, tmp_path, mocker):
+        """Test that a stored index for the current version skips the full download."""
+        mocker.patch.object(figma_settings, "index_fresh_seconds", 0)
+        store = FigmaIndexStore(str(tmp_path))
+        mocker.patch("modules.figma_index.get_index_store", return_value=store)
+        client = FakeClient(FIGMA_FILE)
+        get_file_index(client, "KEY")
+        get_file_index(client, "KEY")
+        assert client.full_fetches == 1
+
+        # 新的 store 只能從磁碟讀取
+        reloaded = FigmaIndexStore(str(tmp_path)).load("KEY", "42")
+        assert reloaded.subtree_text("3:1") == ["標題: 週年慶活動", "滿千送百"]
+
+        client.figma_json = dict(FIGMA_FILE, version="43")
+        get_file_index(client, "KEY")
+        assert client.full_fetches == 2
+
+    def test_recently_confirmed_index_skips_version_check(self, tmp_path, mocker):
+        """Test that a warm index is used without asking Figma for the version until it ages out."""
+        mocker.patch.object(figma_settings, "index_fresh_seconds", 60)
+        store = FigmaIndexStore(str(tmp_path))
+        mocker.patch("modules.figma_index.get_index_store", return_value=store)
+        client = FakeClient(FIGMA_FILE)
+        get_file_index(client, "KEY")
+        get_file_index(client, "KEY")
+        assert (client.version_checks, client.full_fetches) == (1, 1)
+
+        # 從磁碟讀回的索引仍需先確認版本
+        cold = FigmaIndexStore(str(tmp_path))
+        mocker.patch("modules.figma_index.get_index_store", return_value=cold)
+        get_file_index(client, "KEY")
+        assert (client.version_checks, client.full_fetches) == (2, 1)
+
+        mocker.patch.object(figma_settings, "index_fresh_seconds", 0.01)
+        time.sleep(0.02)
+        get_file_index(client, "KEY")
+        assert client.version_checks == 3
+
+    def test_fresh_index_is_not_shared_across_tokens(self, tmp_path, mocker):
+        """Test that another token is checked with Figma before getting a warm index."""
+        mocker.patch.object(figma_settings, "index_fresh_seconds", 60)
+        store = FigmaIndexStore(str(tmp_path))
+        mocker.patch("modules.figma_index.get_index_store", return_value=store)
+        get_file_index(FakeClient(FIGMA_FILE), "KEY")
+
+        denied = FakeClient(FIGMA_FILE, access_token="someone-else", allowed=False)
+        with pytest.raises(DependencyStatusError):
+            get_file_index(denied, "KEY")
+        assert denied.version_checks == 1
+        other = FakeClient(FIGMA_FILE, access_token="teammate")
+        get_file_index(other, "KEY")
+        get_file_index(other, "KEY")
+        assert (other.version_checks, other.full_fetches) == (1, 0)
+
+    def test_serves_stale_index_while_circuit_open(self, tmp_path, mocker):
+        """Test that the last stored index is used when Figma's circuit breaker is open."""
+        mocker.patch.object(figma_settings, "index_fresh_seconds", 0)
+        store = FigmaIndexStore(str(tmp_path))
+        mocker.patch("modules.figma_index.get_index_store", return_value=store)
+        client = FakeClient(FIGMA_FILE)
+        get_file_index(client, "KEY")
+
+        stale_before = CACHE_LOOKUPS.value(cache="figma_index", outcome="stale")
+        probe = mocker.patch.object(client, "fetch_file_version", side_effect=CircuitOpenError("figma", 30))
+        assert get_file_index(client, "KEY").version == "42"
+        assert probe.call_count == 1
+        assert CACHE_LOOKUPS.value(cache="figma_index", outcome="stale") == stale_before + 1
+        assert client.full_fetches == 1
+        with pytest.raises(CircuitOpenError):
+            get_file_index(client, "OTHER")
+
+        # 未曾被 Figma 允許讀取此檔案的 token 拿不到舊索引
+        stranger = FakeClient(FIGMA_FILE, access_token="stranger")
+        mocker.patch.object(stranger, "fetch_file_version", side_effect=CircuitOpenError("figma", 30))
+        with pytest.raises(CircuitOpenError):
+            get_file_index(stranger, "KEY")
+
+
+def prize_card(card_id, decoration):
+    return {
+        "id": f"card:{card_id}",
+        "name": "Prize Card",
+        "type": "INSTANCE",
+        "children": [
+            {"id": f"bg:{card_id}", "name": decoration, "type": "RECTANGLE"},
+            {"id": f"t1:{card_id}", "name": "獎項", "type": "TEXT", "characters": "頭獎 iPhone 一支，限量十名"},
+            {"id": f"t2:{card_id}", "name": "說明", "type": "TEXT", "characters": "得獎者將於活動結束後七日內公布"},
+        ],
+    }
+
+
+DEDUP_FILE = {
+    "version": "7",
+    "document": {
+        "id": "0:0",
+        "name": "Document",
+        "type": "DOCUMENT",
+        "children": [
+            {
+                "id": "1:1",
+                "name": "Page 1",
+                "type": "CANVAS",
+                "children": [
+                    {"id": "h:1", "name": "標題", "type": "TEXT", "characters": "抽獎活動"},
+                    *[prize_card(idx, f"Background {idx}") for idx in range(3)],
+                    {"id": "f:1", "name": "注意事項", "type": "TEXT", "characters": "本公司保留修改活動內容之權利"},
+                    {"id": "f:2", "name": "注意事項", "type": "TEXT", "characters": "本公司保留修改活動內容之權利"},
+                ],
+            }
+        ],
+    },
+}
+
+
+class TestSubtreeDeduplication:
+    def test_repeated_instances_emitted_once(self):
+        """Test that identical subtrees are collapsed with a count and the savings reported."""
+        index = FigmaFileIndex.build("DEDUP", DEDUP_FILE)
+        # 裝飾圖層名稱不同不影響文字結構
+        assert index.hashes["card:0"] == index.hashes["card:2"]
+        fragments, stats = index.deduplicated_text(index.root)
+
+        assert fragments == [
+            "標題: 抽獎活動",
+            "【以下區塊重複 3 次】",
+            "獎項: 頭獎 iPhone 一支，限量十名",
+            "說明: 得獎者將於活動結束後七日內公布",
+            "【區塊結束】",
+            "注意事項: 本公司保留修改活動內容之權利（重複 2 次）",
+        ]
+        assert (stats.repeated_blocks, stats.skipped_occurrences) == (2, 3)
+        full = "\n".join(index.subtree_text(index.root))
+        assert stats.saved_bytes == len(full.encode("utf-8")) - len("\n".join(fragments).encode("utf-8"))
+
+    def test_hashes_survive_serialization_and_memo(self, mocker):
+        """Test that a reloaded index dedupes the same way, reusing memoized subtree text."""
+        index = FigmaFileIndex.build("DEDUP", DEDUP_FILE)
+        expected, _ = index.deduplicated_text(index.root)
+        reloaded = FigmaFileIndex.from_dict(index.to_dict())
+        subtree_text = mocker.spy(reloaded, "subtree_text")
+        assert reloaded.deduplicated_text(reloaded.root)[0] == expected
+        subtree_text.assert_not_called()
@@ -0,0 +1,104 @@
+import itertools
+import threading
+
+import pytest
+
+from config.openai import settings as openai_settings
+from modules.hedging import HedgeBudget, LatencyWindow, hedge_delay, run_hedged
+from utils.cancellation import RequestCancelled, check_cancelled
+from utils.metrics import LLM_HEDGES
+
+
+def _slow_until_cancelled(started: threading.Event):
+    started.set()
+    while True:
+        check_cancelled("test_llm")
+        threading.Event().wait(0.005)
+
+
+@pytest.fixture
+def short_delay(mocker):
+    mocker.patch.object(openai_settings, "hedge_min_delay_seconds", 0.05)
+    mocker.patch.object(openai_settings, "hedge_default_delay_seconds", 0.05)
+    mocker.patch.object(openai_settings, "hedge_min_samples", 3)
+    mocker.patch.object(openai_settings, "hedge_percentile", 50.0)
+
+
+class TestHedgeDelay:
+    def test_percentile_of_recent_calls(self, short_delay):
+        """Test that the delay uses the default until enough samples exist, then the percentile."""
+        window = LatencyWindow()
+        window.add("k", 0.2)
+        assert hedge_delay("k", window) == 0.05
+        for seconds in (0.4, 9.0):
+            window.add("k", seconds)
+        assert hedge_delay("k", window) == 0.4
+        assert hedge_delay("other", window) == 0.05
+
+    def test_budget_per_minute(self):
+        """Test that at most N hedges are allowed in any 60 second window."""
+        budget = HedgeBudget(2)
+        assert budget.try_acquire(now=0) and budget.try_acquire(now=10)
+        assert not budget.try_acquire(now=59)
+        assert budget.try_acquire(now=60.5)
+
+
+class TestRunHedged:
+    def test_hedge_wins_and_primary_is_cancelled(self, short_delay):
+        """Test that a stalled first call is hedged, the hedge result wins and the first call is cancelled."""
+        primary_started = threading.Event()
+        primary_outcome = []
+        calls = itertools.count()
+
+        def attempt():
+            if next(calls) == 0:
+                try:
+                    _slow_until_cancelled(primary_started)
+                except RequestCancelled:
+                    primary_outcome.append("cancelled")
+                    raise
+            return "hedge result"
+
+        before = LLM_HEDGES.value(stage="hedge_test", event="hedge_won")
+        assert run_hedged("hedge_test", "k", attempt, LatencyWindow(), HedgeBudget(5)) == "hedge result"
+        assert LLM_HEDGES.value(stage="hedge_test", event="hedge_won") == before + 1
+        for _ in range(200):
+            if primary_outcome:
+                break
+            threading.Event().wait(0.01)
+        assert primary_outcome == ["cancelled"]
+
+    def test_fast_call_and_exhausted_budget_are_not_hedged(self, short_delay):
+        """Test that fast calls never hedge and an exhausted budget waits for the first call."""
+        calls = []
+
+        def attempt():
+            calls.append(1)
+            threading.Event().wait(0.1 if len(calls) > 1 else 0)
+            return len(calls)
+
+        assert run_hedged("hedge_test", "k", attempt, LatencyWindow(), HedgeBudget(5)) == 1
+        assert run_hedged("hedge_test", "k", attempt, LatencyWindow(), HedgeBudget(0)) == 2
+        assert len(calls) == 2
+
+    def test_failed_first_call_waits_for_hedge(self, short_delay):
+        """Test that an error from one call does not win while the other can still succeed."""
+        calls = itertools.count()
+
+        def attempt():
+            if next(calls) == 0:
+                threading.Event().wait(0.1)
+                raise RuntimeError("invalid output")
+            threading.Event().wait(0.2)
+            return "valid"
+
+        assert run_hedged("hedge_test", "k", attempt, LatencyWindow(), HedgeBudget(5)) == "valid"
+
+        failing = itertools.count()
+
+        def always_fails():
+            threading.Event().wait(0.1)
+            raise RuntimeError(f"failure {next(failing)}")
+
+        with pytest.raises(RuntimeError, match="failure 0"):
+            run_hedged("hedge_test", "k", always_fails, LatencyWindow(), HedgeBudget(5))
@@ -0,0 +1,73 @@
+import threading
+
+from config.confluence import settings as confluence_settings
+from config.misc import settings as misc_settings
+from modules import confluence_doc_agent
+from modules.confluence_parser import find_figma_file_keys
+from modules.models import FigmaSummaryResult, QAItem
+
+
+PAGE = {
+    "title": "活動規格",
+    "body": {
+        "storage": {
+            "value": (
+                '<p>設計稿 <a href="https://www.figma.com/file/AAA111/Landing?node-id=1%3A2">Landing</a></p>'
+                '<ac:structured-macro ac:name="widget"><ac:parameter ac:name="url">'
+                "https://www.figma.com/design/BBB222/Popup</ac:parameter></ac:structured-macro>"
+                '<p><a href="https://www.figma.com/file/AAA111/Landing">重複連結</a>'
+                ' <a href="https://www.figma.com/design/CCC333/Extra">第三個</a></p>'
+            )
+        }
+    },
+}
+
+
+class TestFindFigmaFileKeys:
+    def test_links_and_embeds_deduplicated(self):
+        """Test that anchors and macro parameters are found once each, in order."""
+        assert find_figma_file_keys(PAGE) == ["AAA111", "BBB222", "CCC333"]
+
+    def test_encoded_embed_url(self):
+        """Test that percent-encoded and HTML-escaped embed URLs are found."""
+        markup = (
+            '<ac:structured-macro ac:name="figma"><ac:parameter ac:name="url">'
+            "https%3A%2F%2Fwww.figma.com%2Ffile%2FDDD444%2FPromo%3Fnode-id%3D1%253A2</ac:parameter>"
+            '</ac:structured-macro><iframe src="https://www.figma.com/embed?embed_host=confluence&amp;'
+            'url=https%3A%2F%2Fwww.figma.com%2Fdesign%2FEEE555%2FBanner"></iframe>'
+        )
+        page = {"body": {"storage": {"value": markup}}}
+        assert find_figma_file_keys(page) == ["DDD444", "EEE555"]
+
+
+class TestLinkedFigmaFanOut:
+    def test_combined_content_capped_and_concurrent(self, mocker):
+        """Test that linked files are fetched concurrently, capped and merged into one LLM input."""
+        mocker.patch.object(confluence_settings, "linked_figma_max_files", 2)
+        mocker.patch.object(misc_settings, "similarity_enabled", False)
+        mocker.patch("modules.confluence_doc_agent.ConfluenceAPIClient").return_value.fetch_page.return_value = PAGE
+        both_started = threading.Barrier(2, timeout=5)
+
+        def fake_fetch(file_key):
+            both_started.wait()
+            if file_key == "BBB222":
+                raise RuntimeError("403")
+            return f"{file_key} 的設計文字"
+
+        fetch = mocker.patch("modules.confluence_doc_agent.fetch_figma_content", side_effect=fake_fetch)
+        summary = FigmaSummaryResult(
+            title="活動規格摘要",
+            plan=["步驟一", "步驟二", "步驟三"],
+            summary=[f"摘要第{idx}條" for idx in range(5)],
+            qa=[QAItem(question=f"問題{idx}", answer="答案") for idx in range(3)],
+        )
+        run_chain = mocker.patch("modules.confluence_llm_chain.run_confluence_chain", return_value=summary)
+
+        confluence_doc_agent.generate_confluence_summary(
+            "https://lang.atlassian.net/wiki/spaces/ACS/pages/123/x", api_key="k", include_linked_figma=True
+        )
+        assert sorted(call.args[0] for call in fetch.call_args_list) == ["AAA111", "BBB222"]
+        content = run_chain.call_args.args[1]
+        assert "活動規格" in content
+        assert "=== 連結的 Figma 文件 AAA111 ===\nAAA111 的設計文字" in content
+        assert "=== 連結的 Figma 文件 BBB222" not in content
@@ -0,0 +1,63 @@
+import json
+import logging
+import os
+
+from utils.log import DailyFileHandler, JSONFormatter, get_logger, shutdown_logging
+
+
+class TestJSONFormatter:
+    def test_dict_message_not_mutated(self):
+        """Test that formatting a dict message leaves record.msg untouched."""
+        payload = {"status": "info", "content": {"url": "u", "message": "活動"}}
+        record = logging.LogRecord("t", logging.INFO, __file__, 1, payload, None, None)
+        output = JSONFormatter().format(record)
+        assert json.loads(output) == payload
+        assert record.msg is payload
+
+
+class TestDailyFileHandler:
+    def test_rotates_on_date_change(self, tmp_path):
+        """Test that records are written to the file of their own day."""
+        handler = DailyFileHandler(str(tmp_path))
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        record = logging.LogRecord("t", logging.INFO, __file__, 1, "first", None, None)
+        record.created = 1767139200.0  # 2025-12-31 00:00 UTC
+        handler.emit(record)
+        first_path = handler.baseFilename
+        record = logging.LogRecord("t", logging.INFO, __file__, 1, "second", None, None)
+        record.created = 1767139200.0 + 2 * 86400
+        handler.emit(record)
+        handler.close()
+        assert handler.baseFilename != first_path
+        assert len(os.listdir(tmp_path)) == 2
+
+
+class TestGetLogger:
+    def test_per_module_loggers(self, tmp_path):
+        """Test that each name gets its own logger and records reach the file."""
+        first = get_logger("test_log_a", log_dir=str(tmp_path))
+        second = get_logger("test_log_b", log_dir=str(tmp_path))
+        assert first is not second
+        assert first is get_logger("test_log_a", log_dir=str(tmp_path))
+        assert second.logger.name == "test_log_b"
+
+        first.info(status="info", url="u", message="哈囉")
+        shutdown_logging()
+
+        (log_file,) = tmp_path.iterdir()
+        line = log_file.read_text(encoding="utf-8").strip()
+        assert json.loads(line)["content"]["message"] == "哈囉"
+
+    def test_existing_logger_writes_after_shutdown(self, tmp_path):
+        """Test that a logger created before shutdown still writes once logging is used again."""
+        logger = get_logger("test_log_restart", log_dir=str(tmp_path))
+        logger.info(status="info", url="u", message="第一次")
+        shutdown_logging()
+
+        assert get_logger("test_log_restart", log_dir=str(tmp_path)) is logger
+        logger.info(status="info", url="u", message="重新啟動後")
+        shutdown_logging()
+
+        (log_file,) = tmp_path.iterdir()
+        lines = log_file.read_text(encoding="utf-8").splitlines()
+        assert [json.loads(line)["content"]["message"] for line in lines] == ["第一次", "重新啟動後"]
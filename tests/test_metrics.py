@@ -0,0 +1,52 @@
+from fastapi.testclient import TestClient
+
+from utils.metrics import Histogram, format_server_timing, track_stage, start_request_timings
+
+
+class TestHistogram:
+    def test_render_cumulative_buckets(self):
+        """Test Prometheus rendering of cumulative buckets, sum and count."""
+        histogram = Histogram("test_seconds", "Test histogram.", (0.1, 1))
+        histogram.observe(0.05, stage="fetch")
+        histogram.observe(0.5, stage="fetch")
+        histogram.observe(5, stage="fetch")
+        lines = histogram.render()
+        assert 'test_seconds_bucket{stage="fetch",le="0.1"} 1' in lines
+        assert 'test_seconds_bucket{stage="fetch",le="1"} 2' in lines
+        assert 'test_seconds_bucket{stage="fetch",le="+Inf"} 3' in lines
+        assert 'test_seconds_sum{stage="fetch"} 5.55' in lines
+        assert 'test_seconds_count{stage="fetch"} 3' in lines
+
+
+class TestServerTiming:
+    def test_stages_collected_per_request(self):
+        """Test that tracked stages are collected for the current request."""
+        timings = start_request_timings()
+        with track_stage("figma_download"):
+            pass
+        assert [stage for stage, _ in timings] == ["figma_download"]
+        assert format_server_timing([("llm", 1.5)]) == "llm;dur=1500.0"
+
+    def test_header_and_metrics_endpoint(self, mocker):
+        """Test the Server-Timing header on parse and the /metrics exposition."""
+        from server import app
+        from modules.models import FigmaSummaryResult, QAItem
+
+        def fake_summary(url, **kwargs):
+            with track_stage("figma_llm"):
+                pass
+            return FigmaSummaryResult(
+                title="測試活動標題",
+                plan=["步驟一", "步驟二", "步驟三"],
+                summary=[f"摘要第{idx}條" for idx in range(5)],
+                qa=[QAItem(question=f"問題{idx}", answer="答案") for idx in range(3)],
+            )
+
+        mocker.patch("routes.figma.generate_figma_summary", side_effect=fake_summary)
+        client = TestClient(app)
+        response = client.post("/figma/parse", json={"url": "https://www.figma.com/file/ABC/x"})
+        assert response.status_code == 200
+        assert response.headers["Server-Timing"].startswith("figma_llm;dur=")
+
+        metrics = client.get("/metrics")
+        assert "qa_parser_stage_duration_seconds_count{stage=\"figma_llm\"}" in metrics.text
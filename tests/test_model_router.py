@@ -0,0 +1,51 @@
+import pytest
+
+from config.openai import settings as openai_settings
+from modules.chain_runner import OutputValidationError
+from modules.model_router import estimate_tokens, plan_models, run_with_model_cascade
+from utils.metrics import MODEL_SELECTIONS
+
+
+TIERS = [
+    {"model": "small", "max_input_tokens": 100},
+    {"model": "medium", "max_input_tokens": 1000},
+    {"model": "large", "max_input_tokens": None},
+]
+
+
+class TestPlanModels:
+    def test_explicit_model_is_not_routed(self):
+        """Test that an explicit model is used as the only attempt."""
+        assert plan_models("x" * 100000, "gpt-4.1-mini") == [("gpt-4.1-mini", "requested")]
+
+    def test_auto_picks_tier_by_size(self, mocker):
+        """Test that auto routing starts at the smallest tier that fits the content."""
+        mocker.patch.object(openai_settings, "model_tiers", TIERS)
+        mocker.patch.object(openai_settings, "model_max_escalations", 1)
+        assert estimate_tokens("活動" * 50) == 100
+        assert plan_models("活動" * 50, "auto") == [("small", "size"), ("medium", "escalation")]
+        assert plan_models("活動" * 300, "auto") == [("medium", "size"), ("large", "escalation")]
+        assert plan_models("活動" * 3000, "auto") == [("large", "size")]
+
+
+class TestModelCascade:
+    def test_escalates_only_on_validation_failure(self, mocker):
+        """Test that a validation failure retries on the next tier and reports the model used."""
+        mocker.patch.object(openai_settings, "model_tiers", TIERS)
+        mocker.patch.object(openai_settings, "model_max_escalations", 1)
+        before = MODEL_SELECTIONS.value(doc_type="test", model="medium", reason="escalation")
+
+        def attempt(model):
+            if model == "small":
+                raise OutputValidationError("LLM 輸出驗證失敗")
+            return f"result from {model}"
+
+        result, model = run_with_model_cascade("test", "url", "短內容", "auto", attempt)
+        assert (result, model) == ("result from medium", "medium")
+        assert MODEL_SELECTIONS.value(doc_type="test", model="medium", reason="escalation") == before + 1
+
+        def network_error(model):
+            raise ConnectionError("timeout")
+
+        with pytest.raises(ConnectionError):
+            run_with_model_cascade("test", "url", "短內容", "auto", network_error)
@@ -0,0 +1,52 @@
+from fastapi.testclient import TestClient
+
+from config.misc import settings as misc_settings
+from utils import profiling
+
+
+class TestMaybeProfile:
+    def test_disabled_without_token(self, mocker, tmp_path):
+        """Test that nothing is profiled when no admin token is configured."""
+        mocker.patch.object(misc_settings, "log_dir", str(tmp_path))
+        mocker.patch.object(misc_settings, "profiling_admin_token", "")
+        with profiling.maybe_profile("test", "anything") as profile:
+            sum(range(100))
+        assert profile.profile_id is None
+        assert profiling.list_profiles() == []
+
+    def test_sampling_requires_admin_token(self, mocker, tmp_path):
+        """Test that sampled requests are not profiled unless an admin token is configured."""
+        mocker.patch.object(misc_settings, "log_dir", str(tmp_path))
+        mocker.patch.object(misc_settings, "profiling_sample_rate", 1.0)
+        mocker.patch.object(misc_settings, "profiling_admin_token", "")
+        assert not profiling.should_profile(None)
+        mocker.patch.object(misc_settings, "profiling_admin_token", "secret")
+        assert profiling.should_profile(None)
+
+    def test_writes_artifacts_with_admin_token(self, mocker, tmp_path):
+        """Test that the admin token triggers profiling and artifacts are listed."""
+        mocker.patch.object(misc_settings, "log_dir", str(tmp_path))
+        mocker.patch.object(misc_settings, "profiling_admin_token", "secret")
+        with profiling.maybe_profile("test", "secret") as profile:
+            [str(idx) for idx in range(1000)]
+        assert profile.profile_id
+        names = {entry["name"] for entry in profiling.list_profiles()}
+        assert names == {f"{profile.profile_id}.prof", f"{profile.profile_id}.txt"}
+        assert profiling.resolve_profile_path("../secret.txt") is None
+
+
+class TestAdminRoutes:
+    def test_requires_admin_token(self, mocker, tmp_path):
+        """Test that admin routes reject missing or wrong tokens."""
+        from server import app
+
+        mocker.patch.object(misc_settings, "log_dir", str(tmp_path))
+        mocker.patch.object(misc_settings, "profiling_admin_token", "secret")
+        client = TestClient(app)
+        assert client.get("/admin/profiles").status_code == 403
+        assert client.get("/admin/profiles", headers={"X-Admin-Token": "wrong"}).status_code == 403
+        non_ascii = "sécret".encode("latin-1")
+        assert client.get("/admin/profiles", headers={"X-Admin-Token": non_ascii}).status_code == 403
+        response = client.get("/admin/profiles", headers={"X-Admin-Token": "secret"})
+        assert response.status_code == 200
+        assert response.json() == {"profiles": []}
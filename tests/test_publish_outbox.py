@@ -0,0 +1,98 @@
+from fastapi.testclient import TestClient
+
+from config.confluence import settings as confluence_settings
+from modules.publish_outbox import OutboxPublisher, PublishOutbox, ticket_label
+
+
+ADF = {"version": 1, "type": "doc", "content": []}
+
+
+class TestPublishOutbox:
+    def test_batch_shares_one_publisher(self, mocker, tmp_path):
+        """Test that queued pages are published in one batch and report their URL."""
+        outbox = PublishOutbox(str(tmp_path / "outbox.sqlite3"))
+        publisher_cls = mocker.patch("modules.publish_outbox.ConfluencePublisher")
+        publisher_cls.return_value.create_page.side_effect = lambda title, **kwargs: f"https://wiki/{title}"
+        tickets = [outbox.enqueue(f"頁面{idx}", ADF, None, "https://www.figma.com/file/A/x") for idx in range(3)]
+        assert outbox.get(tickets[0])["status"] == "pending"
+
+        assert OutboxPublisher(outbox).drain_once() == 3
+        assert publisher_cls.call_count == 1
+        entry = outbox.get(tickets[2])
+        assert entry["status"] == "published"
+        assert entry["page_url"] == "https://wiki/頁面2"
+
+    def test_retries_then_fails(self, mocker, tmp_path):
+        """Test that failures are retried with backoff until the attempt limit."""
+        mocker.patch.object(confluence_settings, "publish_max_attempts", 2)
+        mocker.patch.object(confluence_settings, "publish_retry_base_seconds", 0)
+        outbox = PublishOutbox(str(tmp_path / "outbox.sqlite3"))
+        publisher_cls = mocker.patch("modules.publish_outbox.ConfluencePublisher")
+        publisher_cls.return_value.create_page.side_effect = RuntimeError("Confluence 建立頁面失敗: 503")
+        publisher_cls.return_value.find_page.return_value = None
+        ticket = outbox.enqueue("頁面", ADF, None, "https://www.figma.com/file/A/x")
+        publisher = OutboxPublisher(outbox)
+
+        publisher.drain_once()
+        entry = outbox.get(ticket)
+        assert (entry["status"], entry["attempts"]) == ("pending", 1)
+        publisher.drain_once()
+        entry = outbox.get(ticket)
+        assert (entry["status"], entry["attempts"]) == ("failed", 2)
+        assert "503" in entry["error"]
+        assert publisher.drain_once() == 0
+
+    def test_retry_finds_page_created_by_failed_attempt(self, mocker, tmp_path):
+        """Test that a page created before the attempt timed out is found on retry, not created twice."""
+        mocker.patch.object(confluence_settings, "publish_retry_base_seconds", 0)
+        outbox = PublishOutbox(str(tmp_path / "outbox.sqlite3"))
+        publisher_cls = mocker.patch("modules.publish_outbox.ConfluencePublisher")
+        publisher = publisher_cls.return_value
+        created = []
+
+        def create_then_time_out(title, **kwargs):
+            created.append(title)
+            raise TimeoutError("讀取逾時")
+
+        publisher.create_page.side_effect = create_then_time_out
+        ticket = outbox.enqueue("頁面", ADF, None, "https://www.figma.com/file/A/x")
+        publisher.find_page.side_effect = lambda title: (
+            {"url": f"https://wiki/{title}", "labels": [ticket_label(ticket)]} if title in created else None
+        )
+
+        OutboxPublisher(outbox).drain_once()
+        assert outbox.get(ticket)["status"] == "pending"
+        publisher.find_page.assert_not_called()
+        OutboxPublisher(outbox).drain_once()
+        entry = outbox.get(ticket)
+        assert (entry["status"], entry["page_url"]) == ("published", "https://wiki/頁面")
+        assert publisher.create_page.call_count == 1
+        assert publisher.create_page.call_args.kwargs["labels"] == [ticket_label(ticket)]
+
+    def test_page_of_another_publish_is_a_collision(self, mocker, tmp_path):
+        """Test that an existing page with the same title but without the ticket's label fails the entry."""
+        mocker.patch.object(confluence_settings, "publish_retry_base_seconds", 0)
+        outbox = PublishOutbox(str(tmp_path / "outbox.sqlite3"))
+        publisher_cls = mocker.patch("modules.publish_outbox.ConfluencePublisher")
+        publisher = publisher_cls.return_value
+        publisher.create_page.side_effect = RuntimeError("Confluence 建立頁面失敗: 400 duplicate title")
+        publisher.find_page.return_value = {"url": "https://wiki/old", "labels": ["qa-parser-earlier"]}
+        ticket = outbox.enqueue("頁面", ADF, None, "https://www.figma.com/file/A/x")
+
+        OutboxPublisher(outbox).drain_once()
+        OutboxPublisher(outbox).drain_once()
+        entry = outbox.get(ticket)
+        assert (entry["status"], entry["page_url"]) == ("failed", None)
+        assert "同名頁面" in entry["error"]
+        assert publisher.create_page.call_count == 1
+
+    def test_status_endpoint(self, mocker, tmp_path):
+        """Test that /publish/{ticket} reports the entry and 404s on unknown tickets."""
+        from server import app
+
+        outbox = PublishOutbox(str(tmp_path / "outbox.sqlite3"))
+        mocker.patch("routes.publish.get_outbox", return_value=outbox)
+        ticket = outbox.enqueue("頁面", ADF, "123", "https://www.figma.com/file/A/x")
+        client = TestClient(app)
+        assert client.get(f"/publish/{ticket}").json()["status"] == "pending"
+        assert client.get("/publish/unknown").status_code == 404
@@ -0,0 +1,76 @@
+import gzip
+
+from fastapi.testclient import TestClient
+
+from modules.models import FigmaSummaryResult
+from modules.result_store import ResultStore, result_id_for
+
+
+URL = "https://www.figma.com/file/RESULTS1/demo"
+
+
+def make_result(extra: str = "") -> FigmaSummaryResult:
+    return FigmaSummaryResult(
+        title="活動摘要測試" + extra,
+        plan=["確認活動", "整理規則", "產生問答"],
+        summary=[f"重點 {idx} " + "說明文字" * 40 for idx in range(6)],
+        qa=[{"question": f"問題 {idx}？", "answer": f"答案 {idx}"} for idx in range(3)],
+    )
+
+
+class TestResultStore:
+    def test_content_addressed(self, tmp_path):
+        """Test that identical results share an id and different ones do not."""
+        store = ResultStore(str(tmp_path))
+        first = store.save(make_result(), URL, "figma")
+        assert store.save(make_result(), URL, "figma") == first
+        assert store.save(make_result("二"), URL, "figma") != first
+        assert store.save(make_result(), URL, "confluence") != first
+        assert store.get(first)["source_url"] == URL
+        assert store.get("../../etc/passwd") is None
+
+
+class TestResultsEndpoint:
+    def test_formats_etag_and_gzip(self, mocker, tmp_path):
+        """Test the three formats, conditional requests and gzip negotiation."""
+        from server import app
+
+        store = ResultStore(str(tmp_path))
+        mocker.patch("routes.results.get_result_store", return_value=store)
+        result_id = store.save(make_result(), URL, "figma")
+        client = TestClient(app)
+
+        response = client.get(f"/results/{result_id}", headers={"Accept-Encoding": "identity"})
+        assert response.status_code == 200
+        assert response.json()["result"]["title"] == "活動摘要測試"
+        assert "immutable" in response.headers["cache-control"]
+        etag = response.headers["etag"]
+
+        cached = client.get(f"/results/{result_id}", headers={"If-None-Match": etag, "Accept-Encoding": "identity"})
+        assert cached.status_code == 304
+
+        markdown = client.get(f"/results/{result_id}?format=markdown", headers={"Accept-Encoding": "gzip"})
+        assert markdown.headers["content-type"].startswith("text/markdown")
+        assert markdown.headers["content-encoding"] == "gzip"
+        assert markdown.headers["etag"] != etag
+        assert markdown.text.startswith("## 活動內容")
+
+        adf = client.get(f"/results/{result_id}?format=adf", headers={"Accept-Encoding": "identity"})
+        assert adf.json()["type"] == "doc"
+
+        assert client.get(f"/results/{'0' * 32}").status_code == 404
+        assert client.get(f"/results/{result_id}?format=html").status_code == 422
+
+    def test_missing_result_is_not_cached(self, mocker, tmp_path):
+        """Test that an id that 404s is served once the result is saved."""
+        from server import app
+
+        store = ResultStore(str(tmp_path))
+        mocker.patch("routes.results.get_result_store", return_value=store)
+        result = make_result("稍後保存")
+        result_id = result_id_for(result, URL, "figma")
+        client = TestClient(app)
+
+        assert client.get(f"/results/{result_id}").status_code == 404
+        store.save(result, URL, "figma")
+        assert client.get(f"/results/{result_id}").status_code == 200
@@ -0,0 +1,117 @@
+import time
+
+from config.misc import settings as misc_settings
+from modules import confluence_doc_agent, similarity_index
+from modules.models import FigmaSummaryResult, QAItem
+from modules.similarity_index import SimilarityIndex, content_sketch, diff_lines, estimate_similarity
+
+
+SUMMARY = FigmaSummaryResult(
+    title="春節活動摘要",
+    plan=["步驟一", "步驟二", "步驟三"],
+    summary=[f"摘要第{idx}條" for idx in range(5)],
+    qa=[QAItem(question=f"問題{idx}", answer="答案") for idx in range(3)],
+)
+
+CAMPAIGN = "\n".join(
+    [f"春節活動第{idx}條規則：活動期間單筆消費滿{idx}千元即可獲得{idx}百點回饋。" for idx in range(1, 30)]
+    + ["活動期間：2026/01/20 - 2026/02/10", "注意事項：每人限參加一次，名額共五百名。"]
+)
+CLONE = CAMPAIGN.replace("春節", "端午").replace("2026/01/20 - 2026/02/10", "2026/06/01 - 2026/06/20")
+UNRELATED = "\n".join(f"會員等級第{idx}級說明：累積消費達{idx}萬元升級並享有專屬客服。" for idx in range(1, 30))
+
+
+class TestSketch:
+    def test_similarity_of_clone_and_unrelated_text(self):
+        """Test that a cloned campaign scores high and unrelated text scores low."""
+        original = content_sketch(CAMPAIGN, 5, 128)
+        assert estimate_similarity(original, original) == 1.0
+        assert estimate_similarity(original, content_sketch(CLONE.replace("端午", "春節"), 5, 128)) > 0.9
+        assert estimate_similarity(original, content_sketch(UNRELATED, 5, 128)) < 0.2
+        assert estimate_similarity(original, []) == 0.0
+
+    def test_diff_lines(self):
+        """Test that replaced, removed and added lines are reported by position."""
+        diff = diff_lines("a\nb\nc\nd", "a\nB\nc\ne\nf")
+        assert diff.changed == {"1": ("b", "B"), "3": ("d", "e")}
+        assert diff.added == {"4": "f"}
+        assert diff.removed == {}
+        assert diff_lines("a\nb", "a").removed == {"1": "b"}
+
+
+class TestSimilarityIndex:
+    def test_find_and_add(self, tmp_path):
+        """Test threshold, skipping the same key, fingerprint isolation and the changed-line limit."""
+        index = SimilarityIndex(str(tmp_path), threshold=0.3, max_changed_lines=60)
+        index.add("figma", "figma:A", "fp", "https://www.figma.com/file/A/x", CAMPAIGN, SUMMARY.model_dump())
+
+        match = index.find("figma", "figma:B", "fp", CLONE)
+        assert match.key == "figma:A"
+        assert match.source_url == "https://www.figma.com/file/A/x"
+        assert match.result["title"] == "春節活動摘要"
+        assert match.change_count == 30
+        assert "[修改] 原: 活動期間：2026/01/20 - 2026/02/10 → 新: 活動期間：2026/06/01 - 2026/06/20" in match.changes
+
+        assert index.find("figma", "figma:A", "fp", CLONE) is None
+        assert index.find("figma", "figma:B", "other", CLONE) is None
+        assert index.find("confluence", "confluence:1", "fp", CLONE) is None
+        assert index.find("figma", "figma:B", "fp", UNRELATED) is None
+
+        strict = SimilarityIndex(str(tmp_path), threshold=0.3, max_changed_lines=10)
+        assert strict.find("figma", "figma:B", "fp", CLONE) is None
+        small_change = CAMPAIGN.replace("名額共五百名", "名額共一千名")
+        assert strict.find("figma", "figma:B", "fp", small_change).change_count == 1
+
+    def test_retention_limits(self, tmp_path, mocker):
+        """Test that the oldest entries beyond the limit and expired entries are removed."""
+        index = SimilarityIndex(str(tmp_path), threshold=0.3, max_entries=2)
+        for name in "ABC":
+            url = f"https://www.figma.com/file/{name}/x"
+            index.add("figma", f"figma:{name}", "fp", url, CAMPAIGN, SUMMARY.model_dump())
+        assert len(list(tmp_path.iterdir())) == 2
+        assert index.get("figma:A") is None
+        assert index.get("figma:C")["title"] == "春節活動摘要"
+
+        mocker.patch("modules.similarity_index.time.time", return_value=time.time() + 31 * 86400)
+        expiring = SimilarityIndex(str(tmp_path), threshold=0.3, max_age_seconds=30 * 86400)
+        assert expiring.get("figma:C") is None
+        assert expiring.find("figma", "figma:D", "fp", CLONE) is None
+        assert list(tmp_path.iterdir()) == []
+
+    def test_long_content_keeps_only_the_summary(self, tmp_path):
+        """Test that documents above the content limit are served by key but never matched."""
+        index = SimilarityIndex(str(tmp_path), threshold=0.3, max_content_chars=100)
+        index.add("figma", "figma:A", "fp", "https://www.figma.com/file/A/x", CAMPAIGN, SUMMARY.model_dump())
+        assert index.get("figma:A")["title"] == "春節活動摘要"
+        assert index.find("figma", "figma:B", "fp", CLONE) is None
+
+    def test_sees_entries_added_by_other_workers(self, tmp_path):
+        """Test that sketches are rescanned from the shared directory after the refresh interval."""
+        reader = SimilarityIndex(str(tmp_path), threshold=0.3, refresh_seconds=3600)
+        assert reader.find("figma", "figma:B", "fp", CLONE) is None
+        SimilarityIndex(str(tmp_path)).add(
+            "figma", "figma:A", "fp", "https://www.figma.com/file/A/x", CAMPAIGN, SUMMARY.model_dump()
+        )
+        assert reader.find("figma", "figma:B", "fp", CLONE) is None
+        reader.refresh_seconds = 0
+        assert reader.find("figma", "figma:B", "fp", CLONE).key == "figma:A"
+
+    def test_confluence_clone_updates_previous_summary(self, mocker, tmp_path):
+        """Test that a cloned page is summarized by updating the stored summary with the line diff."""
+        mocker.patch.object(misc_settings, "similarity_enabled", True)
+        mocker.patch.object(
+            similarity_index, "get_similarity_index", return_value=SimilarityIndex(str(tmp_path), threshold=0.5)
+        )
+        mocker.patch("modules.confluence_doc_agent.ConfluenceAPIClient")
+        contents = iter([CAMPAIGN, CAMPAIGN.replace("名額共五百名", "名額共一千名")])
+        mocker.patch("modules.confluence_doc_agent.aggregate_confluence_content", side_effect=lambda page: next(contents))
+        run_chain = mocker.patch("modules.confluence_llm_chain.run_confluence_chain", return_value=SUMMARY)
+        run_update = mocker.patch("modules.llm_chain.run_update_chain", return_value=SUMMARY)
+
+        base = "https://lang.atlassian.net/wiki/spaces/ACS/pages/{}/x"
+        confluence_doc_agent.generate_confluence_summary(base.format(1), api_key="k")
+        confluence_doc_agent.generate_confluence_summary(base.format(2), api_key="k")
+        assert run_chain.call_count == 1
+        changes = run_update.call_args.args[2]
+        assert changes == "[修改] 原: 注意事項：每人限參加一次，名額共五百名。 → 新: 注意事項：每人限參加一次，名額共一千名。"
+        assert run_update.call_args.kwargs["stage"] == "confluence_near_duplicate"
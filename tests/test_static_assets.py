@@ -0,0 +1,68 @@
+import gzip
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from utils.static_assets import (
+    IMMUTABLE_CACHE_CONTROL,
+    PrecompressedStaticFiles,
+    accepted_encodings,
+    build_assets,
+)
+
+
+def make_source(tmp_path):
+    source = tmp_path / "web_ui"
+    source.mkdir()
+    (source / "style.css").write_text("body { color: red; }\n" * 40)
+    (source / "script.js").write_text("console.log('hi');\n" * 40)
+    (source / "index.html").write_text(
+        '<link rel="stylesheet" href="/ui/style.css">\n<script src="/ui/script.js"></script>\n'
+    )
+    return source
+
+
+class TestStaticAssets:
+    def test_build_fingerprints_and_rewrites_index(self, tmp_path):
+        """Test that assets get content-hashed names referenced from index.html."""
+        source = make_source(tmp_path)
+        output = tmp_path / "dist"
+        manifest = build_assets(str(source), str(output))
+
+        assert manifest["style.css"].startswith("style.") and manifest["style.css"].endswith(".css")
+        html = (output / "index.html").read_text()
+        assert f'/ui/{manifest["style.css"]}' in html and "/ui/script.js" not in html
+        compressed = (output / (manifest["style.css"] + ".gz")).read_bytes()
+        assert gzip.decompress(compressed) == (source / "style.css").read_bytes()
+
+        (source / "style.css").write_text("body { color: blue; }\n" * 40)
+        assert build_assets(str(source), str(output))["style.css"] != manifest["style.css"]
+
+    def test_serves_precompressed_variant(self, tmp_path):
+        """Test gzip negotiation and immutable caching for hashed assets."""
+        source = make_source(tmp_path)
+        output = tmp_path / "dist"
+        manifest = build_assets(str(source), str(output))
+        app = FastAPI()
+        app.mount("/ui", PrecompressedStaticFiles(directory=str(output)), name="ui")
+        client = TestClient(app)
+
+        response = client.get(f"/ui/{manifest['style.css']}", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["content-type"].startswith("text/css")
+        assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+        assert response.text == (source / "style.css").read_text()
+
+        plain = client.get(f"/ui/{manifest['style.css']}", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in plain.headers
+
+        index = client.get("/ui/index.html", headers={"Accept-Encoding": "gzip"})
+        assert index.headers["cache-control"] == "no-cache"
+        revalidated = client.get(
+            "/ui/index.html", headers={"Accept-Encoding": "gzip", "If-None-Match": index.headers["etag"]}
+        )
+        assert revalidated.status_code == 304
+
+    def test_accepted_encodings(self):
+        """Test that q=0 codings are not treated as accepted."""
+        assert accepted_encodings("gzip, deflate, br;q=0") == ["gzip", "deflate"]
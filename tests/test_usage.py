@@ -0,0 +1,54 @@
+from fastapi.testclient import TestClient
+
+from config.misc import settings as misc_settings
+from utils.usage import collect_usage, estimate_cost, record_llm_usage, usage_report
+
+
+PRICES = {"gpt-4.1-mini": {"input": 0.4, "cached_input": 0.1, "output": 1.6}}
+
+
+class TestEstimateCost:
+    def test_cached_tokens_use_cached_price(self):
+        """Test that cached input tokens are billed at the cached rate."""
+        usage = {"input_tokens": 1_000_000, "cached_input_tokens": 500_000, "output_tokens": 1_000_000}
+        assert estimate_cost("gpt-4.1-mini", usage, PRICES) == 0.2 + 0.05 + 1.6
+
+    def test_unknown_model_has_no_cost(self):
+        """Test that a model without a configured price returns None."""
+        assert estimate_cost("unknown-model", {"input_tokens": 10}, PRICES) is None
+
+
+class TestCollectUsage:
+    def test_nested_collectors_and_report(self):
+        """Test that nested collectors share calls and the process report aggregates them."""
+        metadata = {
+            "input_tokens": 1000,
+            "output_tokens": 200,
+            "total_tokens": 1200,
+            "input_token_details": {"cache_read": 400},
+        }
+        with collect_usage() as outer:
+            with collect_usage() as inner:
+                record_llm_usage("usage_test", "gpt-4.1-mini", metadata)
+                record_llm_usage("usage_test", "gpt-4.1-mini", metadata, purpose="repair")
+            record_llm_usage("usage_test", "gpt-4.1-mini", None)
+
+        summary = inner.summary()
+        assert summary["calls"] == 2
+        assert summary["cached_input_tokens"] == 800
+        assert summary["cost_usd"] == estimate_cost("gpt-4.1-mini", summary, PRICES)
+        assert outer.summary()["calls"] == 2
+
+        report = usage_report()
+        assert report["by_doc_type"]["usage_test"]["output_tokens"] >= 400
+
+    def test_admin_usage_endpoint(self, mocker):
+        """Test that /admin/usage requires the admin token."""
+        from server import app
+
+        mocker.patch.object(misc_settings, "profiling_admin_token", "secret")
+        client = TestClient(app)
+        assert client.get("/admin/usage").status_code == 403
+        response = client.get("/admin/usage", headers={"X-Admin-Token": "secret"})
+        assert response.status_code == 200
+        assert "by_doc_type" in response.json()
@@ -0,0 +1,168 @@
+"""
+Cooperative cancellation of parse work whose client has gone away.
+
+The parse routes run the summary on a worker thread inside a cancellation
+scope. The HTTP downloads, the LLM calls and the threads they fan out to
+(which copy the context) check the scope's ``CancelToken`` and raise
+``RequestCancelled`` once the client disconnects.
+"""
+
+import asyncio
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator, Optional, TypeVar
+
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+import requests
+
+from utils.deadline import check_deadline
+from utils.log import get_logger
+from utils.metrics import observe_cancellation
+
+
+logger = get_logger("cancellation")
+
+T = TypeVar("T")
+
+DOWNLOAD_CHUNK_BYTES = 64 * 1024
+
+
+class RequestCancelled(BaseException):
+    """
+    The client of the current request disconnected.
+
+    Derives from ``BaseException`` (like ``asyncio.CancelledError``) so the
+    ``except Exception`` blocks that turn failures into error messages do not
+    swallow it.
+    """
+
+    def __init__(self, stage: str):
+        super().__init__(f"請求已取消（{stage}）")
+        self.stage = stage
+
+
+class CancelToken:
+    """
+    Thread-safe cancellation flag shared by all work of one request.
+
+    A token with a ``parent`` (e.g. one of several hedged LLM calls) is also
+    cancelled with its parent, but cancelling it leaves the parent running.
+    """
+
+    def __init__(self, parent: Optional["CancelToken"] = None) -> None:
+        self.parent = parent
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self.stage: Optional[str] = None
+        # 因取消而未送出的 LLM 呼叫，其估計輸入 token 數
+        self.saved_tokens = 0
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set() or (self.parent is not None and self.parent.cancelled)
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    def check(self, stage: str, tokens: int = 0) -> None:
+        """Raise ``RequestCancelled`` when cancelled; ``tokens`` counts as saved."""
+        if self.parent is not None:
+            # 請求本身被取消時，階段與省下的 token 記在請求的 token 上
+            self.parent.check(stage, tokens)
+        if not self._event.is_set():
+            return
+        with self._lock:
+            self.stage = self.stage or stage
+            self.saved_tokens += tokens
+        raise RequestCancelled(stage)
+
+
+_token: ContextVar[Optional[CancelToken]] = ContextVar("cancel_token", default=None)
+
+
+@contextmanager
+def cancellation_scope(token: CancelToken) -> Iterator[CancelToken]:
+    reset = _token.set(token)
+    try:
+        yield token
+    finally:
+        _token.reset(reset)
+
+
+def current_token() -> Optional[CancelToken]:
+    return _token.get()
+
+
+def check_cancelled(stage: str, tokens: int = 0) -> None:
+    """Raise ``RequestCancelled`` if the current request was cancelled; no-op outside a scope."""
+    token = _token.get()
+    if token is not None:
+        token.check(stage, tokens)
+
+
+def read_body(response: requests.Response, stage: str) -> bytes:
+    """
+    Read a ``stream=True`` response in chunks, stopping when the request is cancelled.
+
+    Closing the response drops the connection, so a large Figma file stops
+    downloading as soon as the client is gone or the request's deadline has
+    passed (the ``requests`` timeout only bounds each read, not the download).
+    """
+    chunks = []
+    try:
+        for chunk in response.iter_content(DOWNLOAD_CHUNK_BYTES):
+            check_cancelled(stage)
+            check_deadline(stage)
+            chunks.append(chunk)
+    finally:
+        response.close()
+    return b"".join(chunks)
+
+
+async def wait_for_disconnect(request: Request) -> None:
+    """Return once the client of ``request`` has disconnected (its body must already be read)."""
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def run_cancellable(request: Request, route: str, func: Callable[..., T], *args: Any) -> T:
+    """
+    Run ``func(*args)`` on the threadpool and cancel it when the client disconnects.
+
+    After a disconnect this still waits for the worker thread to stop (at its
+    next check), so admission capacity is only released once the work has
+    ended.
+    """
+    token = CancelToken()
+
+    def work() -> T:
+        with cancellation_scope(token):
+            return func(*args)
+
+    task = asyncio.ensure_future(run_in_threadpool(work))
+    # 不用 request.is_disconnected()：經過 http middleware 時輪詢不到中斷，改為等待 disconnect 訊息
+    watcher = asyncio.ensure_future(wait_for_disconnect(request))
+    try:
+        done, _ = await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+        if watcher in done:
+            token.cancel()
+        return await task
+    except asyncio.CancelledError:
+        # 伺服器關閉等情況下 handler 本身被取消，也一併停止背景工作
+        token.cancel()
+        raise
+    except RequestCancelled as exc:
+        stage = token.stage or exc.stage
+        observe_cancellation(route, stage, token.saved_tokens)
+        logger.info(
+            status="info",
+            url="",
+            message=f"用戶端已中斷連線，於 {stage} 取消 {route} 請求，省下約 {token.saved_tokens} tokens",
+        )
+        raise
+    finally:
+        watcher.cancel()
@@ -0,0 +1,266 @@
+"""
+Circuit breakers for the external dependencies (Figma, Confluence, OpenAI).
+
+Each dependency has one ``CircuitBreaker`` shared by all its clients. Calls
+run inside ``guard()``, which records the outcome and duration in a sliding
+window of recent calls. When too many of them failed or were slow, the
+breaker opens and further calls fail fast with ``CircuitOpenError`` instead
+of each waiting out its timeout. After ``CIRCUIT_OPEN_SECONDS`` one probe
+call is let through (half-open): its success closes the breaker, its
+failure opens it again.
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, Optional, Tuple
+
+from config.misc import settings as misc_settings
+from utils.deadline import DeadlineExceeded, remaining_seconds
+from utils.log import get_logger
+from utils.metrics import observe_circuit_rejection, observe_circuit_state
+
+
+logger = get_logger("circuit_breaker")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# 依賴服務名稱；Confluence 的讀取與發佈共用同一個斷路器
+FIGMA = "figma"
+CONFLUENCE = "confluence"
+OPENAI = "openai"
+
+# 連線層級的錯誤類別名稱（requests、openai、httpx 與內建例外）
+TRANSPORT_ERRORS = frozenset({"ConnectionError", "ChunkedEncodingError", "APIConnectionError", "TransportError"})
+
+
+class CircuitOpenError(RuntimeError):
+    """The dependency's breaker is open; the call was not made."""
+
+    def __init__(self, dependency: str, retry_after: float):
+        super().__init__(f"{dependency} 服務暫時無法使用（斷路器開啟），約 {retry_after:.0f} 秒後重試")
+        self.dependency = dependency
+        self.retry_after = retry_after
+
+
+class DependencyStatusError(RuntimeError):
+    """A dependency answered with an unexpected HTTP status."""
+
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def find_open_circuit(exc: BaseException) -> Optional[CircuitOpenError]:
+    """The ``CircuitOpenError`` behind ``exc`` (following ``raise ... from``), if any."""
+    while exc is not None:
+        if isinstance(exc, CircuitOpenError):
+            return exc
+        exc = exc.__cause__
+    return None
+
+
+def is_dependency_failure(exc: BaseException) -> bool:
+    """
+    Whether ``exc`` says the dependency is unhealthy.
+
+    Network errors and timeouts count, as do 5xx and 429 answers. Other 4xx
+    answers (page not found, bad request) are the caller's problem, and so are
+    errors raised while handling an answer (unparsable or empty LLM output).
+    """
+    status = getattr(exc, "status_code", None)
+    if status is not None:
+        return status >= 500 or status == 429
+    return is_timeout(exc) or is_transport_error(exc)
+
+
+def is_transport_error(exc: BaseException) -> bool:
+    """
+    Whether ``exc`` is a connection failure of any client.
+
+    Matched by class name so no client library has to be imported:
+    ``requests.ConnectionError`` / ``ChunkedEncodingError``,
+    ``openai.APIConnectionError``, ``httpx.TransportError`` and the builtin
+    ``ConnectionError``.
+    """
+    return any(cls.__name__ in TRANSPORT_ERRORS for cls in type(exc).__mro__)
+
+
+def is_timeout(exc: BaseException) -> bool:
+    """Whether ``exc`` is a timeout of any client (``requests.Timeout``, ``openai.APITimeoutError``, ...)."""
+    return isinstance(exc, TimeoutError) or any("Timeout" in cls.__name__ for cls in type(exc).__mro__)
+
+
+def hit_request_deadline(exc: BaseException) -> bool:
+    """
+    Whether ``exc`` is a timeout cut short by the request's deadline.
+
+    Timeouts are capped at the time left, so such a timeout fires once the
+    deadline has passed; one that fires earlier hit the configured timeout.
+    """
+    remaining = remaining_seconds()
+    return remaining is not None and remaining <= 0 and is_timeout(exc)
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        window_size: int = 20,
+        min_calls: int = 10,
+        failure_rate: float = 0.5,
+        slow_call_seconds: float = 20.0,
+        slow_rate: float = 0.8,
+        open_seconds: float = 30.0,
+    ):
+        self.name = name
+        self.window_size = window_size
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_rate = slow_rate
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        self.opened_at = 0.0
+        # (failed, slow) of recent calls while closed
+        self._calls: Deque[Tuple[bool, bool]] = deque(maxlen=window_size)
+        self._probing = False
+        self._lock = threading.Lock()
+        observe_circuit_state(name, CLOSED, transition=False)
+
+    def _set_state(self, state: str, reason: str = "") -> None:
+        previous, self.state = self.state, state
+        if state == OPEN:
+            self.opened_at = time.monotonic()
+        if state == CLOSED:
+            self._calls.clear()
+        observe_circuit_state(self.name, state)
+        logger.warning(
+            status="warning",
+            url="",
+            message=f"{self.name} 斷路器 {previous} -> {state}" + (f"：{reason}" if reason else ""),
+        )
+
+    def acquire(self) -> bool:
+        """Allow one call, or raise ``CircuitOpenError``; True when the call is the half-open probe."""
+        with self._lock:
+            if self.state == CLOSED:
+                return False
+            retry_after = self.opened_at + self.open_seconds - time.monotonic()
+            if self.state == OPEN and retry_after <= 0:
+                self._set_state(HALF_OPEN)
+            if self.state == HALF_OPEN and not self._probing:
+                # 半開時只放行一個試探呼叫
+                self._probing = True
+                return True
+        observe_circuit_rejection(self.name)
+        raise CircuitOpenError(self.name, max(retry_after, 0.0))
+
+    def release(self, probe: bool) -> None:
+        """Give back a call without recording an outcome."""
+        if probe:
+            with self._lock:
+                self._probing = False
+
+    def record(self, failed: bool, seconds: float, probe: bool = False) -> None:
+        slow = seconds >= self.slow_call_seconds
+        with self._lock:
+            if probe:
+                self._probing = False
+                if failed or slow:
+                    self._set_state(OPEN, "試探呼叫" + ("失敗" if failed else f"耗時 {seconds:.1f} 秒"))
+                else:
+                    self._set_state(CLOSED)
+                return
+            if self.state != CLOSED:
+                # 開啟前已放行、稍後才完成的呼叫不影響狀態
+                return
+            self._calls.append((failed, slow))
+            if len(self._calls) < self.min_calls:
+                return
+            failures = sum(1 for call_failed, _ in self._calls if call_failed) / len(self._calls)
+            slow_calls = sum(1 for _, call_slow in self._calls if call_slow) / len(self._calls)
+            if failures >= self.failure_rate:
+                self._set_state(OPEN, f"最近 {len(self._calls)} 次呼叫失敗率 {failures:.0%}")
+            elif slow_calls >= self.slow_rate:
+                self._set_state(OPEN, f"最近 {len(self._calls)} 次呼叫慢速比例 {slow_calls:.0%}")
+
+    @contextmanager
+    def guard(self) -> Iterator[None]:
+        """
+        Run one call of the dependency, recording whether it failed and how long it took.
+
+        Raises ``CircuitOpenError`` without running the block when open; with
+        ``CIRCUIT_ENABLED`` off the block always runs and nothing is recorded.
+        """
+        if not misc_settings.circuit_enabled:
+            yield
+            return
+        probe = self.acquire()
+        started = time.monotonic()
+        try:
+            yield
+        except DeadlineExceeded:
+            # 期限不足而未送出的呼叫
+            self.release(probe)
+            raise
+        except Exception as exc:
+            if hit_request_deadline(exc):
+                # 逾時來自呼叫端較短的期限，不代表依賴服務變慢或故障
+                self.release(probe)
+                raise
+            # 呼叫端錯誤（4xx）或回應內容無法解析，仍代表服務有正常回應
+            self.record(is_dependency_failure(exc), time.monotonic() - started, probe)
+            raise
+        except BaseException:
+            # 請求取消：不代表依賴服務的狀況
+            self.release(probe)
+            raise
+        self.record(False, time.monotonic() - started, probe)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            calls = list(self._calls)
+            state = self.state
+            retry_after = self.opened_at + self.open_seconds - time.monotonic()
+        snapshot: Dict[str, Any] = {
+            "state": state,
+            "recent_calls": len(calls),
+            "recent_failures": sum(1 for failed, _ in calls if failed),
+            "recent_slow_calls": sum(1 for _, slow in calls if slow),
+        }
+        if state == OPEN:
+            snapshot["retry_after_seconds"] = round(max(retry_after, 0.0), 1)
+        return snapshot
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Process-wide breaker of one dependency."""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            slow_call_seconds = (
+                misc_settings.circuit_llm_slow_seconds if name == OPENAI else misc_settings.circuit_http_slow_seconds
+            )
+            breaker = _breakers[name] = CircuitBreaker(
+                name,
+                window_size=misc_settings.circuit_window_size,
+                min_calls=misc_settings.circuit_min_calls,
+                failure_rate=misc_settings.circuit_failure_rate,
+                slow_call_seconds=slow_call_seconds,
+                slow_rate=misc_settings.circuit_slow_rate,
+                open_seconds=misc_settings.circuit_open_seconds,
+            )
+        return breaker
+
+
+def breaker_states() -> Dict[str, Dict[str, Any]]:
+    """State of every dependency's breaker, for ``/healthcheck``."""
+    return {name: get_breaker(name).snapshot() for name in (FIGMA, CONFLUENCE, OPENAI)}
@@ -0,0 +1,170 @@
+"""
+Per-request deadlines shared by every stage of the parse pipeline.
+
+A ``Deadline`` is set for the request (``deadline_seconds`` on the parse
+request, or ``REQUEST_DEADLINE_SECONDS``) and carried in a context variable,
+so worker threads that copy the context see it too. Stages ask for their
+timeout with ``stage_timeout`` / ``llm_timeout``, which cap the usual
+timeout at the remaining budget and raise ``DeadlineExceeded`` up front when
+too little time is left to be worth starting.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from config.misc import settings as misc_settings
+from utils.log import get_logger
+from utils.metrics import current_request_timings
+
+
+logger = get_logger("deadline")
+
+# OpenAI SDK 預設的重試次數（429、5xx、連線中斷）
+SDK_MAX_RETRIES = 2
+
+
+class DeadlineExceeded(TimeoutError):
+    """Too little of the request's time budget is left for ``stage``."""
+
+    def __init__(self, stage: str, remaining: float):
+        super().__init__(f"處理期限不足，無法執行 {stage}（剩餘 {max(remaining, 0):.1f} 秒）")
+        self.stage = stage
+        self.remaining = remaining
+
+
+class Deadline:
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+        # 第一個因期限不足而未執行的階段
+        self.exceeded_stage: Optional[str] = None
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+    @property
+    def exceeded(self) -> bool:
+        """A stage failed fast, or the budget ran out (e.g. a call hit its capped timeout)."""
+        return self.exceeded_stage is not None or self.remaining() <= 0
+
+    def check(self, stage: str, needed: float = 0.0) -> float:
+        """Remaining seconds; raises ``DeadlineExceeded`` when not more than ``needed`` are left."""
+        remaining = self.remaining()
+        if remaining <= needed:
+            self.exceeded_stage = self.exceeded_stage or stage
+            raise DeadlineExceeded(stage, remaining)
+        return remaining
+
+    def report(self, timings: List[Tuple[str, float]]) -> Dict[str, object]:
+        """Budget, time left and seconds spent per stage, for the request log."""
+        stages: Dict[str, float] = {}
+        for stage, elapsed in timings:
+            stages[stage] = round(stages.get(stage, 0.0) + elapsed, 3)
+        return {
+            "budget_seconds": self.seconds,
+            # 含排隊等待等未計入階段的時間
+            "elapsed_seconds": round(self.seconds - self.remaining(), 3),
+            "remaining_seconds": round(self.remaining(), 3),
+            "exceeded_stage": self.exceeded_stage,
+            "stages": stages,
+        }
+
+
+_deadline: ContextVar[Optional[Deadline]] = ContextVar("deadline", default=None)
+
+
+@contextmanager
+def deadline_scope(deadline: Optional[Deadline]) -> Iterator[Optional[Deadline]]:
+    reset = _deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _deadline.reset(reset)
+
+
+def request_deadline(seconds: Optional[float]) -> Optional[Deadline]:
+    """Deadline for a parse request: the caller's value, else the server default (0 = none)."""
+    seconds = seconds or misc_settings.request_deadline_seconds
+    return Deadline(seconds) if seconds and seconds > 0 else None
+
+
+def log_budget(deadline: Optional[Deadline], url: str) -> None:
+    """Log how the request's budget was spent, per stage recorded with ``track_stage``."""
+    if deadline is not None:
+        logger.info(status="deadline", url=url, message=deadline.report(current_request_timings()))
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _deadline.get()
+
+
+def remaining_seconds() -> Optional[float]:
+    deadline = _deadline.get()
+    return deadline.remaining() if deadline is not None else None
+
+
+def check_deadline(stage: str, needed: float = 0.0) -> None:
+    """Raise ``DeadlineExceeded`` if not more than ``needed`` seconds are left; no-op without a deadline."""
+    deadline = _deadline.get()
+    if deadline is not None:
+        deadline.check(stage, needed)
+
+
+def stage_timeout(stage: str, default: float) -> float:
+    """
+    Timeout for one network call: ``default`` capped at the remaining budget.
+
+    Fails fast when less than ``DEADLINE_MIN_STAGE_SECONDS`` is left.
+    """
+    deadline = _deadline.get()
+    if deadline is None:
+        return default
+    return min(default, deadline.check(stage, misc_settings.deadline_min_stage_seconds))
+
+
+def llm_timeout(stage: str) -> Optional[float]:
+    """
+    Timeout for one LLM call: the remaining budget, or None without a deadline.
+
+    Fails fast when less than ``DEADLINE_MIN_LLM_SECONDS`` is left, since a
+    summary cannot be generated in that time.
+    """
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline.check(stage, misc_settings.deadline_min_llm_seconds)
+
+
+def llm_attempt_timeout(stage: str, max_retries: Optional[int]) -> Optional[float]:
+    """
+    Per-attempt timeout for a call on an existing ``ChatOpenAI``.
+
+    The client's retries were fixed when it was built, so the budget left now
+    is split across them; ``None`` retries means the SDK default.
+    """
+    remaining = llm_timeout(stage)
+    if remaining is None:
+        return None
+    return remaining / ((SDK_MAX_RETRIES if max_retries is None else max_retries) + 1)
+
+
+def llm_request_options(stage: str) -> Dict[str, Any]:
+    """
+    ``ChatOpenAI`` keyword arguments bounding one call by the deadline.
+
+    The SDK keeps retrying 429, 5xx, dropped connections and timeouts, but
+    only as many times as attempts of at least ``DEADLINE_MIN_LLM_SECONDS``
+    fit in the remaining budget, and the budget is split across the attempts:
+    the timeout applies to each attempt, so a stalled call retried with the
+    whole budget would run several times past the deadline.
+    """
+    remaining = llm_timeout(stage)
+    if remaining is None:
+        return {}
+    retries = SDK_MAX_RETRIES
+    if misc_settings.deadline_min_llm_seconds > 0:
+        # 第一次呼叫之外還放得下幾次最短的呼叫
+        retries = max(0, min(retries, int(remaining // misc_settings.deadline_min_llm_seconds) - 1))
+    return {"timeout": remaining / (retries + 1), "max_retries": retries}
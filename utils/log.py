@@ -1,7 +1,12 @@
 import os
+import atexit
+import copy
 import logging
+import logging.handlers
 import json
+import queue
 import threading
+from datetime import datetime
 
 ENV = os.getenv("ENV_PRESET", "prod")
 
@@ -11,37 +16,160 @@ class JSONFormatter(logging.Formatter):
         super().__init__()
 
     def format(self, record):
-        # 確保 msg 是 dict，不要二次 json.dumps()
+        # dict 訊息在此序列化，不回寫 record.msg，避免影響其他 handler
         if isinstance(record.msg, dict):
+            record = copy.copy(record)
             record.msg = json.dumps(record.msg, ensure_ascii=False)  # 確保能輸出 emoji & 中文
         return super().format(record)
 
 
+class DailyFileHandler(logging.FileHandler):
+    """每日切換檔案的 handler，檔名為 ``YYYYMMDD.log``。"""
+
+    def __init__(self, log_dir: str, encoding: str = "utf-8"):
+        self.log_dir = log_dir
+        self.current_date = datetime.now().strftime("%Y%m%d")
+        super().__init__(self._path_for(self.current_date), encoding=encoding, delay=True)
+
+    def _path_for(self, date_str: str) -> str:
+        return os.path.join(self.log_dir, f"{date_str}.log")
+
+    def _open(self):
+        os.makedirs(self.log_dir, exist_ok=True)
+        return super()._open()
+
+    def emit(self, record):
+        date_str = datetime.fromtimestamp(record.created).strftime("%Y%m%d")
+        if date_str != self.current_date:
+            self.acquire()
+            try:
+                if self.stream:
+                    self.stream.flush()
+                    self.stream.close()
+                    self.stream = None
+                self.current_date = date_str
+                self.baseFilename = os.path.abspath(self._path_for(date_str))
+            finally:
+                self.release()
+        super().emit(record)
+
+
+class SerializingQueueHandler(logging.handlers.QueueHandler):
+    """在呼叫端先完成序列化，listener 執行緒只負責寫出。"""
+
+    def __init__(self, log_queue, log_dir: str):
+        super().__init__(log_queue)
+        self.log_dir = log_dir
+        self.listening = False
+
+    def emit(self, record):
+        # shutdown_logging 之後的第一筆紀錄重新啟動 listener
+        if not self.listening:
+            _QueueBackend.start(self)
+        super().emit(record)
+
+    def prepare(self, record):
+        if isinstance(record.msg, dict):
+            # 與 JSONFormatter 相同的輸出，但省去額外的 record 複製
+            msg = json.dumps(record.msg, ensure_ascii=False)
+        else:
+            msg = self.format(record)
+        record = copy.copy(record)
+        record.message = msg
+        record.msg = msg
+        record.args = None
+        record.exc_info = None
+        record.exc_text = None
+        record.stack_info = None
+        return record
+
+
+class _QueueBackend:
+    """
+    所有 Logger 共用一組 queue 與 listener，依 log_dir 區分檔案 handler。
+
+    Queue handler 在 shutdown 後仍掛在各 logger 上，下一筆紀錄時重新啟動 listener。
+    """
+
+    _lock = threading.RLock()
+    _queue_handlers = {}
+    _listeners = {}
+    _atexit_registered = False
+
+    @classmethod
+    def handler_for(cls, log_dir: str) -> logging.Handler:
+        with cls._lock:
+            handler = cls._queue_handlers.get(log_dir)
+            if handler is None:
+                handler = SerializingQueueHandler(queue.SimpleQueue(), log_dir)
+                handler.setFormatter(JSONFormatter())
+                cls._queue_handlers[log_dir] = handler
+                cls.start(handler)
+            return handler
+
+    @classmethod
+    def start(cls, handler: SerializingQueueHandler) -> None:
+        with cls._lock:
+            if handler.listening:
+                return
+            plain = logging.Formatter("%(message)s")
+            stream_handler = logging.StreamHandler()
+            stream_handler.setFormatter(plain)
+            file_handler = DailyFileHandler(handler.log_dir)
+            file_handler.setFormatter(plain)
+
+            listener = logging.handlers.QueueListener(
+                handler.queue, stream_handler, file_handler, respect_handler_level=False
+            )
+            listener.start()
+            if not cls._atexit_registered:
+                atexit.register(shutdown_logging)
+                cls._atexit_registered = True
+            cls._listeners[handler.log_dir] = listener
+            handler.listening = True
+
+    @classmethod
+    def shutdown(cls) -> None:
+        """停止 listener 並寫出 queue 中剩餘的紀錄。"""
+        with cls._lock:
+            for log_dir, listener in cls._listeners.items():
+                cls._queue_handlers[log_dir].listening = False
+                listener.stop()
+                for handler in listener.handlers:
+                    handler.close()
+            cls._listeners.clear()
+
+
 class Logger(object):
-    # Singleton
-    _instance = None
+    # 每個 name 一個實例
+    _instances = {}
     _lock = threading.Lock()
 
-    def __new__(cls, class_name: str, log_path: str):
-        if cls._instance is None:
+    def __new__(cls, class_name: str, log_dir: str):
+        key = (class_name, log_dir)
+        instance = cls._instances.get(key)
+        if instance is None:
             with cls._lock:
-                if cls._instance is None:
-                    cls._instance = super().__new__(cls)
-                    cls._instance._initialize(class_name, log_path)
-        return cls._instance
-
-    def _initialize(self, class_name: str, log_path: str):
-        """ 初始化 Logger，確保只執行一次 """
-        logging.basicConfig(filename=log_path, format='%(message)s', encoding='utf-8')
+                instance = cls._instances.get(key)
+                if instance is None:
+                    instance = super().__new__(cls)
+                    instance._initialize(class_name, log_dir)
+                    cls._instances[key] = instance
+        return instance
+
+    def _initialize(self, class_name: str, log_dir: str):
+        """ 初始化 Logger，確保同一 name 只執行一次 """
+        self.name = class_name
         self.logger = logging.getLogger(class_name)
         self.logger.setLevel("INFO" if (ENV == "prod" or ENV == "test") else "DEBUG")
+        # 紀錄只經由 queue 寫出，不再傳遞到 root logger
+        self.logger.propagate = False
 
+        handler = _QueueBackend.handler_for(log_dir)
         # 避免重複添加 handler
-        if not self.logger.handlers:
-            loggingStreamHandler = logging.StreamHandler()
-            loggingStreamHandler.setFormatter(JSONFormatter())
-            self.logger.addHandler(loggingStreamHandler)
-    
+        if handler not in self.logger.handlers:
+            self.logger.addHandler(handler)
+
     def _log(self, level, status, url, message):
         msg = {
             "status": status,
@@ -74,29 +202,36 @@ class Logger(object):
     def debug(self, status, url, message):
         self._log("debug", status, url, message)
 
+
+def shutdown_logging() -> None:
+    """
+    Flush queued records and stop the background listener.
+
+    Loggers keep their handlers, so ``get_logger`` instances created earlier
+    (e.g. at module level) keep working: the next record starts the listener again.
+    """
+    _QueueBackend.shutdown()
+
+
 def get_logger(name: str, log_dir: str = None) -> Logger:
     """
     Factory function to create or retrieve a logger instance.
-    
+
     Args:
         name: Logger name (typically module name)
         log_dir: Optional log directory override
-        
+
     Returns:
         Logger instance
     """
-    from datetime import datetime
     from config.misc import settings as misc_settings
-    import os
-    
+
     if log_dir is None:
         log_dir = misc_settings.log_dir
-    
-    os.makedirs(log_dir, exist_ok=True)
-    log_path = os.path.join(log_dir, f"{datetime.now().strftime('%Y%m%d')}.log")
-    
-    return Logger(name, log_path)
+
+    # 目錄由 DailyFileHandler 在第一次寫檔時建立，import 階段不觸碰檔案系統
+    return Logger(name, log_dir)
 
 
 if __name__ == "__main__":
-    pass
\ No newline at end of file
+    pass
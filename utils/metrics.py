@@ -0,0 +1,412 @@
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+BYTES_BUCKETS = tuple(1024 * 4 ** i for i in range(10))  # 1KB ~ 256MB
+CHARS_BUCKETS = (100, 500, 1000, 5000, 10000, 50000, 100000, 500000, 1000000)
+TOKENS_BUCKETS = (100, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000, 128000)
+
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Thread-safe cumulative histogram rendered in Prometheus text format."""
+
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float]):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._series: Dict[LabelKey, List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key: LabelKey = tuple(sorted(labels.items()))
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # 每個 bucket 的計數 + (+Inf, sum)
+                series = [0.0] * (len(self.buckets) + 2)
+                self._series[key] = series
+            series[index] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self._lock:
+            snapshot = {key: list(values) for key, values in self._series.items()}
+        for key, values in sorted(snapshot.items()):
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(key, le=_format_value(bound))} "
+                    f"{_format_value(cumulative)}"
+                )
+            cumulative += values[len(self.buckets)]
+            lines.append(f"{self.name}_bucket{_format_labels(key, le='+Inf')} {_format_value(cumulative)}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(values[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {_format_value(cumulative)}")
+        return lines
+
+
+class Counter:
+    """Thread-safe monotonically increasing counter rendered in Prometheus text format."""
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._lock = threading.Lock()
+        self._series: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key: LabelKey = tuple(sorted(labels.items()))
+        with self._lock:
+            self._series[key] = self._series.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._series.get(tuple(sorted(labels.items())), 0.0)
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} counter",
+        ]
+        with self._lock:
+            snapshot = dict(self._series)
+        for key, value in sorted(snapshot.items()):
+            lines.append(f"{self.name}{_format_labels(key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge:
+    """Thread-safe value that can go up and down, rendered in Prometheus text format."""
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._lock = threading.Lock()
+        self._series: Dict[LabelKey, float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._series[tuple(sorted(labels.items()))] = value
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._series.get(tuple(sorted(labels.items())), 0.0)
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} gauge",
+        ]
+        with self._lock:
+            snapshot = dict(self._series)
+        for key, value in sorted(snapshot.items()):
+            lines.append(f"{self.name}{_format_labels(key)} {_format_value(value)}")
+        return lines
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: LabelKey, **extra: str) -> str:
+    pairs = list(key) + list(extra.items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class MetricsRegistry:
+    """Holds every metric exposed on ``/metrics``."""
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str, documentation: str, buckets: Sequence[float]) -> Histogram:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = Histogram(name, documentation, buckets)
+                self._metrics[name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str) -> Counter:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = Counter(name, documentation)
+                self._metrics[name] = metric
+            return metric
+
+    def gauge(self, name: str, documentation: str) -> Gauge:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = Gauge(name, documentation)
+                self._metrics[name] = metric
+            return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+STAGE_DURATION = registry.histogram(
+    "qa_parser_stage_duration_seconds", "Time spent in each pipeline stage.", DURATION_BUCKETS
+)
+STAGE_PAYLOAD_BYTES = registry.histogram(
+    "qa_parser_stage_payload_bytes", "Raw payload size handled by a stage.", BYTES_BUCKETS
+)
+STAGE_CONTENT_LENGTH = registry.histogram(
+    "qa_parser_stage_content_length_chars", "Extracted content length in characters.", CHARS_BUCKETS
+)
+LLM_TOKENS = registry.histogram(
+    "qa_parser_llm_tokens", "Tokens reported by the LLM provider per call.", TOKENS_BUCKETS
+)
+LLM_VALIDATIONS = registry.counter(
+    "qa_parser_llm_validations_total", "LLM output validation outcomes per stage and output mode."
+)
+LLM_REPAIRS = registry.counter(
+    "qa_parser_llm_repairs_total", "Repair attempts on outputs that failed validation, by method and outcome."
+)
+MODEL_SELECTIONS = registry.counter(
+    "qa_parser_model_selections_total", "LLM attempts per document type, model and selection reason."
+)
+SUMMARY_DURATION = registry.histogram(
+    "qa_parser_summary_duration_seconds",
+    "End-to-end time to summarize one document, by document type and the model that produced it.",
+    DURATION_BUCKETS,
+)
+SUMMARY_MODES = registry.counter(
+    "qa_parser_summary_modes_total",
+    "How each document was summarized (full / update / reuse) and why.",
+)
+PUBLISH_EVENTS = registry.counter(
+    "qa_parser_publish_events_total", "Confluence publishing outbox events (enqueued, published, retry, deferred, failed)."
+)
+CACHE_LOOKUPS = registry.counter(
+    "qa_parser_cache_lookups_total", "Cache lookups by cache name and outcome (hit / miss)."
+)
+DEDUP_SAVED_BYTES = registry.histogram(
+    "qa_parser_dedup_saved_bytes",
+    "LLM input bytes saved per document by collapsing repeated Figma subtrees.",
+    BYTES_BUCKETS,
+)
+DEDUP_SAVED_TOKENS = registry.histogram(
+    "qa_parser_dedup_saved_tokens",
+    "Estimated LLM input tokens saved per document by collapsing repeated Figma subtrees.",
+    TOKENS_BUCKETS,
+)
+SIMILARITY_SCORES = registry.histogram(
+    "qa_parser_similarity_score",
+    "Estimated similarity of each new document to its closest previously summarized document.",
+    (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95, 0.99),
+)
+LLM_HEDGES = registry.counter(
+    "qa_parser_llm_hedges_total",
+    "Hedging of slow LLM calls per stage: call, hedged, budget_exhausted, deadline, primary_won, hedge_won.",
+)
+LLM_HEDGE_LATENCY = registry.histogram(
+    "qa_parser_llm_hedge_latency_seconds",
+    "Latency of hedge-eligible LLM calls: effective (with hedging) and primary (first call alone; "
+    "a lower bound when it lost and was cancelled).",
+    DURATION_BUCKETS,
+)
+CANCELLATIONS = registry.counter(
+    "qa_parser_cancelled_requests_total",
+    "Parse requests cancelled because the client disconnected, by route and the stage that stopped.",
+)
+CANCELLED_TOKENS_SAVED = registry.counter(
+    "qa_parser_cancelled_tokens_saved_total",
+    "Estimated input tokens of LLM calls skipped because the client disconnected.",
+)
+DEADLINE_EXCEEDED = registry.counter(
+    "qa_parser_deadline_exceeded_total",
+    "Parse requests that ran out of their deadline, by route and the stage that could not run.",
+)
+CIRCUIT_STATE = registry.gauge(
+    "qa_parser_circuit_state", "Circuit breaker state per dependency: 0 closed, 1 half-open, 2 open."
+)
+CIRCUIT_TRANSITIONS = registry.counter(
+    "qa_parser_circuit_transitions_total", "Circuit breaker state changes per dependency and new state."
+)
+CIRCUIT_REJECTIONS = registry.counter(
+    "qa_parser_circuit_rejections_total", "Calls failed fast because the dependency's circuit breaker was open."
+)
+ADMISSION_DECISIONS = registry.counter(
+    "qa_parser_admission_total",
+    "Parse requests by route and admission outcome (admitted / queued / rejected / timeout).",
+)
+ADMISSION_WAIT = registry.histogram(
+    "qa_parser_admission_wait_seconds", "Time parse requests spent queued before admission.", DURATION_BUCKETS
+)
+ADMISSION_QUEUE_DEPTH = registry.gauge(
+    "qa_parser_admission_queue_depth", "Parse requests currently waiting for capacity."
+)
+ADMISSION_INFLIGHT = registry.gauge(
+    "qa_parser_admission_inflight", "Admitted parse requests (requests) and their estimated memory (bytes)."
+)
+
+
+# 單一請求內各階段耗時，供 Server-Timing header 使用
+_request_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar(
+    "request_timings", default=None
+)
+
+
+def start_request_timings() -> List[Tuple[str, float]]:
+    """Begin collecting stage timings for the current request context."""
+    timings: List[Tuple[str, float]] = []
+    _request_timings.set(timings)
+    return timings
+
+
+def current_request_timings() -> List[Tuple[str, float]]:
+    """Stage timings recorded so far for the current request (empty outside one)."""
+    return list(_request_timings.get() or [])
+
+
+@contextmanager
+def track_stage(stage: str) -> Iterator[None]:
+    """Record the duration of ``stage`` in the histogram and the current request."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_DURATION.observe(elapsed, stage=stage)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((stage, elapsed))
+
+
+def observe_payload_bytes(stage: str, size: int) -> None:
+    STAGE_PAYLOAD_BYTES.observe(size, stage=stage)
+
+
+def observe_content_length(stage: str, length: int) -> None:
+    STAGE_CONTENT_LENGTH.observe(length, stage=stage)
+
+
+def observe_llm_usage(stage: str, usage: Optional[Dict[str, int]], **labels: str) -> None:
+    """Record input/output token counts from a LangChain ``usage_metadata`` dict."""
+    if not usage:
+        return
+    for kind in ("input_tokens", "output_tokens"):
+        if usage.get(kind) is not None:
+            LLM_TOKENS.observe(usage[kind], stage=stage, kind=kind.replace("_tokens", ""), **labels)
+
+
+def observe_validation(stage: str, outcome: str, **labels: str) -> None:
+    LLM_VALIDATIONS.inc(stage=stage, outcome=outcome, **labels)
+
+
+def observe_repair(stage: str, method: str, outcome: str) -> None:
+    LLM_REPAIRS.inc(stage=stage, method=method, outcome=outcome)
+
+
+def observe_model_selection(doc_type: str, model: str, reason: str) -> None:
+    MODEL_SELECTIONS.inc(doc_type=doc_type, model=model, reason=reason)
+
+
+def observe_summary_duration(doc_type: str, model: str, seconds: float) -> None:
+    SUMMARY_DURATION.observe(seconds, doc_type=doc_type, model=model)
+
+
+def observe_summary_mode(doc_type: str, mode: str, reason: str) -> None:
+    SUMMARY_MODES.inc(doc_type=doc_type, mode=mode, reason=reason)
+
+
+def observe_publish(event: str) -> None:
+    PUBLISH_EVENTS.inc(event=event)
+
+
+def observe_cache_lookup(cache: str, outcome: str) -> None:
+    CACHE_LOOKUPS.inc(cache=cache, outcome=outcome)
+
+
+def observe_dedup_savings(saved_bytes: int, saved_tokens: int) -> None:
+    DEDUP_SAVED_BYTES.observe(saved_bytes)
+    DEDUP_SAVED_TOKENS.observe(saved_tokens)
+
+
+def observe_similarity(doc_type: str, score: float) -> None:
+    SIMILARITY_SCORES.observe(score, doc_type=doc_type)
+
+
+def observe_hedge(stage: str, event: str) -> None:
+    LLM_HEDGES.inc(stage=stage, event=event)
+
+
+def observe_hedge_latency(stage: str, path: str, seconds: float) -> None:
+    LLM_HEDGE_LATENCY.observe(seconds, stage=stage, path=path)
+
+
+def observe_cancellation(route: str, stage: str, saved_tokens: int) -> None:
+    CANCELLATIONS.inc(route=route, stage=stage)
+    if saved_tokens:
+        CANCELLED_TOKENS_SAVED.inc(saved_tokens, route=route)
+
+
+def observe_deadline_exceeded(route: str, stage: str) -> None:
+    DEADLINE_EXCEEDED.inc(route=route, stage=stage)
+
+
+_CIRCUIT_STATE_VALUES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+def observe_circuit_state(dependency: str, state: str, transition: bool = True) -> None:
+    CIRCUIT_STATE.set(_CIRCUIT_STATE_VALUES[state], dependency=dependency)
+    if transition:
+        CIRCUIT_TRANSITIONS.inc(dependency=dependency, state=state)
+
+
+def observe_circuit_rejection(dependency: str) -> None:
+    CIRCUIT_REJECTIONS.inc(dependency=dependency)
+
+
+def observe_admission(route: str, outcome: str) -> None:
+    ADMISSION_DECISIONS.inc(route=route, outcome=outcome)
+
+
+def observe_admission_wait(route: str, seconds: float) -> None:
+    ADMISSION_WAIT.observe(seconds, route=route)
+
+
+def set_admission_state(queue_depth: int, inflight_requests: int, inflight_bytes: int) -> None:
+    ADMISSION_QUEUE_DEPTH.set(queue_depth)
+    ADMISSION_INFLIGHT.set(inflight_requests, resource="requests")
+    ADMISSION_INFLIGHT.set(inflight_bytes, resource="bytes")
+
+
+def format_server_timing(timings: List[Tuple[str, float]]) -> str:
+    """Render timings as a ``Server-Timing`` header value (durations in ms)."""
+    return ", ".join(f"{stage};dur={elapsed * 1000:.1f}" for stage, elapsed in timings)
+
+
+def render_prometheus() -> str:
+    return registry.render()
@@ -0,0 +1,143 @@
+import cProfile
+import hmac
+import io
+import os
+import pstats
+import random
+import re
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from config.misc import settings as misc_settings
+
+
+PROFILE_SUBDIR = "profiles"
+PROFILE_NAME_RE = re.compile(r"^[A-Za-z0-9_.-]+\.(?:prof|txt)$")
+
+# cProfile 與 tracemalloc 皆為行程層級狀態，同時間只剖析一個請求
+_profile_lock = threading.Lock()
+
+
+def profile_dir() -> str:
+    return os.path.join(misc_settings.log_dir, PROFILE_SUBDIR)
+
+
+def is_admin_token(token: Optional[str]) -> bool:
+    """Check ``token`` against the configured admin token (disabled when unset)."""
+    expected = misc_settings.profiling_admin_token
+    if not expected or not token:
+        return False
+    # 以位元組比較：header 可能含非 ASCII 字元，compare_digest 對這類 str 會拋出 TypeError
+    return hmac.compare_digest(token.encode("utf-8"), expected.encode("utf-8"))
+
+
+def should_profile(token: Optional[str]) -> bool:
+    """
+    Profile when the caller sent the admin token or the request is sampled.
+
+    Both need a configured admin token; without one profiling is off entirely.
+    """
+    if not misc_settings.profiling_admin_token:
+        return False
+    if is_admin_token(token):
+        return True
+    rate = misc_settings.profiling_sample_rate
+    return rate > 0 and random.random() < rate
+
+
+class ProfileResult:
+    """Holds the artifact ID once a profiled block has finished."""
+
+    def __init__(self):
+        self.profile_id: Optional[str] = None
+
+
+@contextmanager
+def maybe_profile(name: str, token: Optional[str] = None) -> Iterator[ProfileResult]:
+    """
+    Wrap a block with cProfile and tracemalloc when profiling is requested.
+
+    Artifacts are written to ``{log_dir}/profiles``:
+    ``<id>.prof`` (pstats dump) and ``<id>.txt`` (CPU and memory summary).
+
+    cProfile only sees the thread that runs the block, so work handed to other
+    threads (threadpool fan-out, hedged LLM calls) is missing from the CPU
+    profile; ``tracemalloc`` covers all threads.
+    """
+    result = ProfileResult()
+    if not should_profile(token) or not _profile_lock.acquire(blocking=False):
+        yield result
+        return
+
+    started_tracing = not tracemalloc.is_tracing()
+    profiler = cProfile.Profile()
+    try:
+        if started_tracing:
+            tracemalloc.start(25)
+        tracemalloc.reset_peak()
+        before = tracemalloc.take_snapshot()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            yield result
+        finally:
+            profiler.disable()
+            elapsed = time.perf_counter() - start
+            after = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            result.profile_id = _write_artifacts(name, profiler, before, after, peak, elapsed)
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+        _profile_lock.release()
+
+
+def _write_artifacts(
+    name: str,
+    profiler: cProfile.Profile,
+    before: tracemalloc.Snapshot,
+    after: tracemalloc.Snapshot,
+    peak: int,
+    elapsed: float,
+) -> str:
+    directory = profile_dir()
+    os.makedirs(directory, exist_ok=True)
+    profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}_{name}_{uuid.uuid4().hex[:8]}"
+
+    profiler.dump_stats(os.path.join(directory, f"{profile_id}.prof"))
+
+    buffer = io.StringIO()
+    buffer.write(f"profile: {profile_id}\nwall_time: {elapsed:.3f}s\npeak_traced_memory: {peak} bytes\n\n")
+    buffer.write("=== CPU (top 40 by cumulative time) ===\n")
+    pstats.Stats(profiler, stream=buffer).sort_stats("cumulative").print_stats(40)
+    buffer.write("\n=== Memory (top 25 allocation growth by line) ===\n")
+    for stat in after.compare_to(before, "lineno")[:25]:
+        buffer.write(f"{stat}\n")
+    with open(os.path.join(directory, f"{profile_id}.txt"), "w", encoding="utf-8") as f:
+        f.write(buffer.getvalue())
+    return profile_id
+
+
+def list_profiles() -> List[Dict[str, Any]]:
+    directory = profile_dir()
+    if not os.path.isdir(directory):
+        return []
+    entries = []
+    for filename in sorted(os.listdir(directory), reverse=True):
+        if not PROFILE_NAME_RE.match(filename):
+            continue
+        stat = os.stat(os.path.join(directory, filename))
+        entries.append({"name": filename, "size": stat.st_size, "modified": stat.st_mtime})
+    return entries
+
+
+def resolve_profile_path(filename: str) -> Optional[str]:
+    """Return the artifact path, rejecting anything outside the profile directory."""
+    if not PROFILE_NAME_RE.match(filename):
+        return None
+    path = os.path.join(profile_dir(), filename)
+    return path if os.path.isfile(path) else None
@@ -0,0 +1,194 @@
+"""
+Build and serve the web UI assets.
+
+``python -m utils.static_assets`` copies ``web_ui/`` to ``web_ui/dist/`` with
+content-hashed file names (``style.<hash>.css``), rewrites ``index.html`` to
+reference them and writes gzip / brotli variants next to each file.
+``PrecompressedStaticFiles`` serves the best variant the client accepts;
+hashed files never change, so they are cached as immutable.
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+import stat
+from typing import Dict, List, Optional, Tuple
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+try:
+    import brotli
+except ImportError:  # brotli 為選用套件，未安裝時只產生 gzip
+    brotli = None
+
+
+SOURCE_DIR = "web_ui"
+DIST_DIR = os.path.join(SOURCE_DIR, "dist")
+MANIFEST_NAME = "manifest.json"
+URL_PREFIX = "/ui/"
+
+# 需加上內容雜湊的檔案；index.html 本身維持固定名稱
+HASHED_EXTENSIONS = (".css", ".js")
+# 太小的檔案壓縮後反而沒有效益
+MIN_COMPRESS_BYTES = 256
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# (Accept-Encoding token, 副檔名)，依偏好排序
+ENCODINGS: List[Tuple[str, str]] = [("br", ".br"), ("gzip", ".gz")]
+
+
+def hashed_name(name: str, content: bytes) -> str:
+    root, ext = os.path.splitext(name)
+    return f"{root}.{hashlib.sha256(content).hexdigest()[:12]}{ext}"
+
+
+def _write_compressed(path: str, content: bytes) -> List[str]:
+    """Write ``.gz`` (and ``.br`` when available) variants that are smaller than ``content``."""
+    if len(content) < MIN_COMPRESS_BYTES:
+        return []
+    variants = {".gz": gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants[".br"] = brotli.compress(content, quality=11)
+    written = []
+    for suffix, data in variants.items():
+        if len(data) < len(content):
+            with open(path + suffix, "wb") as handle:
+                handle.write(data)
+            written.append(suffix)
+    return written
+
+
+def build_assets(source: str = SOURCE_DIR, output: str = DIST_DIR) -> Dict[str, str]:
+    """
+    Build the fingerprinted, precompressed copy of ``source`` into ``output``.
+
+    Returns the manifest (original name -> hashed name), also written to
+    ``output/manifest.json``. The output directory is rebuilt from scratch.
+    """
+    if os.path.isdir(output):
+        shutil.rmtree(output)
+    os.makedirs(output)
+
+    manifest: Dict[str, str] = {}
+    for name in sorted(os.listdir(source)):
+        path = os.path.join(source, name)
+        if not os.path.isfile(path) or not name.endswith(HASHED_EXTENSIONS):
+            continue
+        with open(path, "rb") as handle:
+            content = handle.read()
+        manifest[name] = hashed_name(name, content)
+        target = os.path.join(output, manifest[name])
+        with open(target, "wb") as handle:
+            handle.write(content)
+        _write_compressed(target, content)
+
+    with open(os.path.join(source, "index.html"), encoding="utf-8") as handle:
+        html = handle.read()
+    for name, hashed in manifest.items():
+        html = html.replace(f'"{URL_PREFIX}{name}"', f'"{URL_PREFIX}{hashed}"')
+    index_path = os.path.join(output, "index.html")
+    with open(index_path, "w", encoding="utf-8") as handle:
+        handle.write(html)
+    _write_compressed(index_path, html.encode("utf-8"))
+
+    with open(os.path.join(output, MANIFEST_NAME), "w", encoding="utf-8") as handle:
+        json.dump(manifest, handle, ensure_ascii=False, indent=2)
+    return manifest
+
+
+def load_manifest(directory: str) -> Optional[Dict[str, str]]:
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME), encoding="utf-8") as handle:
+            manifest = json.load(handle)
+    except (OSError, ValueError):
+        return None
+    return manifest if isinstance(manifest, dict) else None
+
+
+def accepted_encodings(accept_encoding: str) -> List[str]:
+    """Content codings the client accepts (``q=0`` excluded)."""
+    accepted = []
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        params = params.replace(" ", "")
+        if token and params not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            accepted.append(token.strip().lower())
+    return accepted
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    ``StaticFiles`` that serves ``.br`` / ``.gz`` siblings when accepted.
+
+    Files listed in the build manifest are content-hashed and served with an
+    immutable ``Cache-Control``; everything else (``index.html``, or the raw
+    ``web_ui/`` when no build exists) must be revalidated.
+    """
+
+    def __init__(self, directory: str, **kwargs):
+        super().__init__(directory=directory, **kwargs)
+        manifest = load_manifest(directory) or {}
+        self.immutable_names = set(manifest.values())
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        request_headers = Headers(scope=scope)
+        response: Optional[Response] = None
+        if scope["method"] in ("GET", "HEAD"):
+            for encoding, suffix in ENCODINGS:
+                if encoding not in accepted_encodings(request_headers.get("accept-encoding", "")):
+                    continue
+                full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path + suffix)
+                if stat_result is None or not stat.S_ISREG(stat_result.st_mode):
+                    continue
+                # Content-Type 依原始檔名判斷，而非 .gz / .br
+                response = FileResponse(
+                    full_path,
+                    stat_result=stat_result,
+                    media_type=mimetypes.guess_type(path)[0] or "text/plain",
+                    headers={"Content-Encoding": encoding},
+                )
+                if self.is_not_modified(response.headers, request_headers):
+                    response = NotModifiedResponse(response.headers)
+                break
+        if response is None:
+            response = await super().get_response(path, scope)
+
+        if response.status_code in (200, 304):
+            response.headers["Vary"] = "Accept-Encoding"
+            response.headers["Cache-Control"] = (
+                IMMUTABLE_CACHE_CONTROL
+                if os.path.basename(path) in self.immutable_names
+                else REVALIDATE_CACHE_CONTROL
+            )
+        return response
+
+
+def ui_directory(source: str = SOURCE_DIR, output: str = DIST_DIR) -> str:
+    """Built asset directory when a build exists, otherwise the raw sources."""
+    return output if load_manifest(output) is not None else source
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fingerprint and precompress the web UI assets")
+    parser.add_argument("--source", default=SOURCE_DIR)
+    parser.add_argument("--output", default=DIST_DIR)
+    args = parser.parse_args()
+    manifest = build_assets(args.source, args.output)
+    for name, hashed in manifest.items():
+        print(f"{name} -> {hashed}")
+    if brotli is None:
+        print("brotli 未安裝，只產生 gzip 版本")
+
+
+if __name__ == "__main__":
+    main()
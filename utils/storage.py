@@ -0,0 +1,33 @@
+import json
+import os
+import tempfile
+from typing import Any, Optional
+
+
+def write_json_atomic(path: str, data: Any) -> None:
+    """
+    Write ``data`` as JSON to ``path`` without ever exposing a partial file.
+
+    The JSON is written to a temporary file in the same directory and then
+    renamed over ``path``, so concurrent readers see the old or the new file.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            json.dump(data, handle, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def read_json(path: str) -> Optional[Any]:
+    """Parsed JSON from ``path``, or None when it is missing or unreadable."""
+    try:
+        with open(path, encoding="utf-8") as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return None
@@ -0,0 +1,154 @@
+import re
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+TOKEN_KEYS = ("input_tokens", "cached_input_tokens", "output_tokens", "total_tokens")
+
+# 中日韓文字約一字一個 token，其餘文字約四個字元一個 token
+CJK_RE = re.compile(r"[\u3040-\u30ff\u3400-\u9fff\uac00-\ud7af\uff00-\uffef]")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count of ``text`` without loading a tokenizer."""
+    cjk = len(CJK_RE.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def estimate_cost(model: str, usage: Dict[str, int], prices: Dict[str, Dict[str, float]]) -> Optional[float]:
+    """Estimated USD cost, or None when the model has no configured price."""
+    price = prices.get(model)
+    if not price:
+        return None
+    cached = usage.get("cached_input_tokens", 0)
+    uncached = max(0, usage.get("input_tokens", 0) - cached)
+    cost = (
+        uncached * price.get("input", 0)
+        + cached * price.get("cached_input", price.get("input", 0))
+        + usage.get("output_tokens", 0) * price.get("output", 0)
+    )
+    return round(cost / 1_000_000, 6)
+
+
+def _prices() -> Dict[str, Dict[str, float]]:
+    from config.openai import settings as openai_settings
+
+    return openai_settings.model_prices
+
+
+def _empty_totals() -> Dict[str, int]:
+    return {key: 0 for key in TOKEN_KEYS + ("calls",)}
+
+
+def summarize_calls(calls: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Totals, estimated cost and a per-model breakdown for a list of call records."""
+    totals = _empty_totals()
+    by_model: Dict[str, Dict[str, Any]] = {}
+    for call in calls:
+        model_totals = by_model.setdefault(call["model"], _empty_totals())
+        for key in TOKEN_KEYS:
+            totals[key] += call[key]
+            model_totals[key] += call[key]
+        totals["calls"] += 1
+        model_totals["calls"] += 1
+
+    prices = _prices()
+    cost = 0.0
+    priced = True
+    for model, model_totals in by_model.items():
+        model_totals["cost_usd"] = estimate_cost(model, model_totals, prices)
+        if model_totals["cost_usd"] is None:
+            priced = False
+        else:
+            cost += model_totals["cost_usd"]
+    return dict(totals, cost_usd=round(cost, 6) if priced else None, by_model=by_model)
+
+
+class UsageCollector:
+    """LLM calls made while this collector is active in the current context."""
+
+    def __init__(self):
+        self.calls: List[Dict[str, Any]] = []
+
+    @property
+    def model(self) -> Optional[str]:
+        """Model of the last summary call, i.e. the one that produced the result."""
+        for call in reversed(self.calls):
+            if call["purpose"] == "summary":
+                return call["model"]
+        return None
+
+    def summary(self) -> Dict[str, Any]:
+        return summarize_calls(self.calls)
+
+
+_current_collector: ContextVar[Optional[UsageCollector]] = ContextVar("usage_collector", default=None)
+
+# 行程內依 (model, doc_type) 累計，供 admin 端點查詢
+_aggregate_lock = threading.Lock()
+_aggregate: Dict[Tuple[str, str], Dict[str, int]] = {}
+
+
+@contextmanager
+def collect_usage() -> Iterator[UsageCollector]:
+    """
+    Collect LLM usage recorded inside the block.
+
+    Collectors nest: on exit, the calls are also added to the enclosing
+    collector, so an agent and its caller can both read the same calls.
+    """
+    parent = _current_collector.get()
+    collector = UsageCollector()
+    token = _current_collector.set(collector)
+    try:
+        yield collector
+    finally:
+        _current_collector.reset(token)
+        if parent is not None:
+            parent.calls.extend(collector.calls)
+
+
+def record_llm_usage(doc_type: str, model: str, usage_metadata: Optional[Dict[str, Any]], purpose: str = "summary") -> None:
+    """Record one LLM call from a LangChain ``usage_metadata`` dict."""
+    if not usage_metadata:
+        return
+    details = usage_metadata.get("input_token_details") or {}
+    call = {
+        "doc_type": doc_type,
+        "model": model or "unknown",
+        "purpose": purpose,
+        "input_tokens": usage_metadata.get("input_tokens", 0) or 0,
+        "cached_input_tokens": details.get("cache_read", 0) or 0,
+        "output_tokens": usage_metadata.get("output_tokens", 0) or 0,
+        "total_tokens": usage_metadata.get("total_tokens", 0) or 0,
+    }
+    with _aggregate_lock:
+        totals = _aggregate.setdefault((call["model"], doc_type), _empty_totals())
+        for key in TOKEN_KEYS:
+            totals[key] += call[key]
+        totals["calls"] += 1
+    collector = _current_collector.get()
+    if collector is not None:
+        collector.calls.append(call)
+
+
+def usage_report() -> Dict[str, Any]:
+    """Process-wide usage per model and per doc type, with estimated cost."""
+    prices = _prices()
+    with _aggregate_lock:
+        snapshot = {key: dict(value) for key, value in _aggregate.items()}
+    entries = []
+    by_doc_type: Dict[str, Dict[str, Any]] = {}
+    for (model, doc_type), totals in sorted(snapshot.items()):
+        cost = estimate_cost(model, totals, prices)
+        entries.append(dict(totals, model=model, doc_type=doc_type, cost_usd=cost))
+        doc_totals = by_doc_type.setdefault(doc_type, dict(_empty_totals(), cost_usd=0.0))
+        for key in TOKEN_KEYS + ("calls",):
+            doc_totals[key] += totals[key]
+        if cost is None or doc_totals["cost_usd"] is None:
+            doc_totals["cost_usd"] = None
+        else:
+            doc_totals["cost_usd"] = round(doc_totals["cost_usd"] + cost, 6)
+    return {"by_model_and_doc_type": entries, "by_doc_type": by_doc_type}
@@ -14,6 +14,8 @@ document.addEventListener("DOMContentLoaded", () => {
   const themeToggle = document.getElementById("theme-toggle");
 
   let currentMarkdown = "";
+  // 進行中的解析請求；重新解析時中斷舊請求，伺服器端會一併取消處理
+  let parseController = null;
 
   // ─────────────────────────────────────────────────────────────
   // THEME TOGGLE FUNCTIONALITY
@@ -97,6 +99,51 @@ document.addEventListener("DOMContentLoaded", () => {
     return url.includes("figma.com");
   }
 
+  function showConfluenceBanner(label, url) {
+    let banner = resultContent.querySelector(".confluence-link-banner");
+    if (!banner) {
+      banner = document.createElement("div");
+      banner.className = "confluence-link-banner";
+      resultContent.prepend(banner);
+    }
+    banner.innerHTML = `
+      <svg width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
+        <path d="M10 13a5 5 0 0 0 7.54.54l3-3a5 5 0 0 0-7.07-7.07l-1.72 1.71"></path>
+        <path d="M14 11a5 5 0 0 0-7.54-.54l-3 3a5 5 0 0 0 7.07 7.07l1.71-1.71"></path>
+      </svg>
+      <div>
+        <span class="confluence-label"></span>
+        ${url ? `<a href="${url}" target="_blank" rel="noopener">${url}</a>` : ""}
+      </div>
+    `;
+    banner.querySelector(".confluence-label").textContent = label;
+  }
+
+  // 發佈在背景進行，輪詢直到頁面建立或重試用盡
+  async function pollPublishStatus(ticket) {
+    try {
+      const response = await fetch(`/publish/${ticket}`);
+      if (!response.ok) {
+        throw new Error("無法取得發佈狀態");
+      }
+      const status = await response.json();
+      if (status.status === "published") {
+        showConfluenceBanner("已上傳到 Confluence", status.page_url);
+        return;
+      }
+      if (status.status === "failed") {
+        showConfluenceBanner(`Confluence 上傳失敗：${status.error || "未知錯誤"}`);
+        return;
+      }
+      if (status.error) {
+        showConfluenceBanner(`Confluence 上傳重試中（第 ${status.attempts} 次失敗）…`);
+      }
+    } catch (error) {
+      console.warn(error);
+    }
+    setTimeout(() => pollPublishStatus(ticket), 2000);
+  }
+
   async function handleParse() {
     const url = urlInput.value.trim();
     if (!url) {
@@ -148,6 +195,12 @@ document.addEventListener("DOMContentLoaded", () => {
     parseBtn.disabled = true;
     currentMarkdown = ""; // Reset stored markdown
 
+    if (parseController) {
+      parseController.abort();
+    }
+    const controller = new AbortController();
+    parseController = controller;
+
     try {
       const response = await fetch(endpoint, {
         method: "POST",
@@ -155,6 +208,7 @@ document.addEventListener("DOMContentLoaded", () => {
           "Content-Type": "application/json",
         },
         body: JSON.stringify(requestBody),
+        signal: controller.signal,
       });
 
       if (!response.ok) {
@@ -169,19 +223,15 @@ document.addEventListener("DOMContentLoaded", () => {
       resultContent.innerHTML = marked.parse(data.summary);
 
       if (data.confluence_url) {
-        const linkContainer = document.createElement("div");
-        linkContainer.className = "confluence-link-banner";
-        linkContainer.innerHTML = `
-          <svg width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
-            <path d="M10 13a5 5 0 0 0 7.54.54l3-3a5 5 0 0 0-7.07-7.07l-1.72 1.71"></path>
-            <path d="M14 11a5 5 0 0 0-7.54-.54l-3 3a5 5 0 0 0 7.07 7.07l1.71-1.71"></path>
-          </svg>
-          <div>
-            <span class="confluence-label">已上傳到 Confluence</span>
-            <a href="${data.confluence_url}" target="_blank" rel="noopener">${data.confluence_url}</a>
-          </div>
-        `;
-        resultContent.prepend(linkContainer);
+        showConfluenceBanner("已上傳到 Confluence", data.confluence_url);
+      } else if (data.publish_ticket) {
+        showConfluenceBanner("正在上傳到 Confluence…");
+        pollPublishStatus(data.publish_ticket);
+      }
+
+      if (data.result_id) {
+        // 網址帶上結果 id，重新整理或分享時可直接從 /results 讀取
+        history.replaceState(null, "", `#result=${data.result_id}`);
       }
 
       resultContainer.classList.remove("hidden");
@@ -189,13 +239,37 @@ document.addEventListener("DOMContentLoaded", () => {
       // Scroll to result
       resultContainer.scrollIntoView({ behavior: "smooth", block: "start" });
     } catch (error) {
+      if (error.name === "AbortError") return;
       alert(`Error: ${error.message}`);
     } finally {
-      loadingDiv.classList.add("hidden");
-      parseBtn.disabled = false;
+      if (parseController === controller) {
+        parseController = null;
+        loadingDiv.classList.add("hidden");
+        parseBtn.disabled = false;
+      }
+    }
+  }
+
+  async function loadStoredResult() {
+    const match = location.hash.match(/^#result=([0-9a-f]{32})$/);
+    if (!match) {
+      return;
+    }
+    try {
+      const response = await fetch(`/results/${match[1]}?format=markdown`);
+      if (!response.ok) {
+        throw new Error("找不到指定的結果");
+      }
+      currentMarkdown = await response.text();
+      resultContent.innerHTML = marked.parse(currentMarkdown);
+      resultContainer.classList.remove("hidden");
+    } catch (error) {
+      console.warn(error);
     }
   }
 
+  loadStoredResult();
+
   // Add shake keyframes dynamically if not present
   if (!document.getElementById("shake-style")) {
     const style = document.createElement("style");